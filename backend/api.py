@@ -1,6 +1,5 @@
-from fastapi import APIRouter, Depends
-from auth import get_api_key
-from routers import youtube, tts, stt, video_text, text_image, llm, google, outlook
+from fastapi import APIRouter
+from routers import youtube, tts, stt, video_text, text_image, llm, google, outlook, jobs
 
 router = APIRouter()
 
@@ -12,3 +11,4 @@ router.include_router(text_image.router, prefix="/text-image", tags=["text-image
 router.include_router(llm.router, tags=["llm"])
 router.include_router(google.router, prefix="/google", tags=["google"])
 router.include_router(outlook.router, prefix="/outlook", tags=["outlook"])
+router.include_router(jobs.router, prefix="/jobs", tags=["jobs"])
@@ -1,22 +1,92 @@
 from fastapi import Security, HTTPException, status
 from fastapi.security import APIKeyHeader
-import pandas as pd
+import csv
+import time
+import hashlib
 import logging
+import threading
 
 import os
 
+logger = logging.getLogger(__name__)
+
 script_dir = os.path.dirname(__file__)
-file_path = os.path.join(script_dir, 'keys.csv')
-API_KEYS = pd.read_csv(file_path, header=None).iloc[:, 0].tolist()
+KEYS_FILE = os.getenv("KEYS_FILE", os.path.join(script_dir, 'keys.csv'))
+# How often (seconds) the keys file is checked for changes
+KEYS_RELOAD_INTERVAL = float(os.getenv("KEYS_RELOAD_INTERVAL", "5"))
+
+def key_digest(api_key: str) -> str:
+    return hashlib.sha256(api_key.encode()).hexdigest()
+
+def key_fingerprint(api_key: str) -> str:
+    """Short, non-reversible key identifier for logs."""
+    return key_digest(api_key)[:12]
+
+class KeyRegistry:
+    """
+    Valid API keys, held as a set of SHA-256 digests so lookups are O(1)
+    and raw keys are not kept in memory. The first column of every row in
+    the CSV file is a key. The file is re-read when its mtime or size
+    changes (checked at most every `reload_interval` seconds); a new set
+    is built and swapped in whole, so requests never see a partial one.
+    """
+
+    def __init__(self, path: str, reload_interval: float = KEYS_RELOAD_INTERVAL):
+        self.path = path
+        self.reload_interval = reload_interval
+        self._lock = threading.Lock()
+        self._digests = frozenset()
+        self._signature = None
+        self._next_check = 0.0
+        self.reloads = 0
+        self.load()
+
+    def _read(self) -> frozenset:
+        with open(self.path, newline="", encoding="utf-8") as f:
+            return frozenset(key_digest(row[0].strip()) for row in csv.reader(f) if row and row[0].strip())
+
+    def load(self):
+        """Reads the keys file. Raises if it can't be read."""
+        stat = os.stat(self.path)
+        self._digests = self._read()
+        self._signature = (stat.st_mtime_ns, stat.st_size)
+        self._next_check = time.monotonic() + self.reload_interval
+        logger.info(f"Loaded {len(self._digests)} API keys from {self.path}")
+
+    def _maybe_reload(self):
+        now = time.monotonic()
+        if now < self._next_check or not self._lock.acquire(blocking=False):
+            return
+        try:
+            self._next_check = now + self.reload_interval
+            stat = os.stat(self.path)
+            if (stat.st_mtime_ns, stat.st_size) == self._signature:
+                return
+            self.load()
+            self.reloads += 1
+        except Exception as e:
+            # Keep serving the previous keys
+            logger.error(f"Failed to reload API keys from {self.path}: {str(e)}")
+        finally:
+            self._lock.release()
+
+    def is_valid(self, api_key: str) -> bool:
+        self._maybe_reload()
+        return key_digest(api_key) in self._digests
+
+    def __len__(self) -> int:
+        return len(self._digests)
+
+key_registry = KeyRegistry(KEYS_FILE)
 
 api_key_header = APIKeyHeader(name="X-API-Key")
 
 async def get_api_key(api_key: str = Security(api_key_header)):
-    if api_key in API_KEYS:
-        logging.info(f"API key validation successful for key: {api_key}")
+    if key_registry.is_valid(api_key):
+        logger.debug(f"API key validation successful for key {key_fingerprint(api_key)}")
         return api_key
     else:
-        logging.warning(f"Invalid API key: {api_key}")
+        logger.warning(f"Invalid API key {key_fingerprint(api_key)}")
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid API Key",
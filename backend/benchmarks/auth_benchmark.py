@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Per-request API-key validation overhead with a large keys file.
+
+Writes --keys random keys to a temporary CSV and compares the old
+get_api_key (pandas-loaded list, linear `in` scan, raw key logged at
+INFO) with the digest-set KeyRegistry, for the first key, the last key
+and an unknown key. Logging goes to a file handler at INFO, as in the
+service. Load time covers reading the file (and importing pandas for
+the legacy path, if it is installed).
+
+Usage:
+    python benchmarks/auth_benchmark.py
+    python benchmarks/auth_benchmark.py --keys 100000 --calls 20000
+"""
+
+import argparse
+import logging
+import os
+import secrets
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def legacy_load(path: str) -> list:
+    import pandas as pd
+    return pd.read_csv(path, header=None).iloc[:, 0].tolist()
+
+def legacy_check(api_keys: list, api_key: str) -> bool:
+    if api_key in api_keys:
+        logging.info(f"API key validation successful for key: {api_key}")
+        return True
+    logging.warning(f"Invalid API key: {api_key}")
+    return False
+
+def time_calls(fn, api_key: str, calls: int) -> float:
+    """Median microseconds per call, over batches of 100."""
+    timings = []
+    for _ in range(max(1, calls // 100)):
+        start = time.perf_counter()
+        for _ in range(100):
+            fn(api_key)
+        timings.append((time.perf_counter() - start) / 100 * 1e6)
+    return statistics.median(timings)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--keys", type=int, default=10000, help="Number of keys in the file")
+    parser.add_argument("--calls", type=int, default=10000, help="Validations per measurement")
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix="auth_benchmark_")
+    path = os.path.join(work_dir, "keys.csv")
+    keys = [secrets.token_urlsafe(24) for _ in range(args.keys)]
+    with open(path, "w") as f:
+        f.write("\n".join(keys) + "\n")
+    logging.basicConfig(level=logging.INFO, filename=os.path.join(work_dir, "auth.log"))
+
+    os.environ["KEYS_FILE"] = path
+    from fastapi import HTTPException
+    start = time.perf_counter()
+    import auth
+    registry_load = time.perf_counter() - start
+
+    def registry_check(api_key: str) -> bool:
+        # The dependency is a coroutine without awaits, so drive it directly
+        try:
+            auth.get_api_key(api_key).send(None)
+        except StopIteration:
+            return True
+        except HTTPException:
+            return False
+
+    try:
+        start = time.perf_counter()
+        legacy_keys = legacy_load(path)
+        legacy_load_time = time.perf_counter() - start
+    except ImportError:
+        legacy_keys, legacy_load_time = keys, None
+
+    print(f"{args.keys} keys")
+    legacy_load_label = f"{legacy_load_time * 1000:.0f} ms" if legacy_load_time is not None else "n/a (pandas not installed)"
+    print(f"load: legacy {legacy_load_label}, registry {registry_load * 1000:.0f} ms")
+    print(f"{'key':<10}{'legacy us':>12}{'registry us':>14}{'speedup':>10}")
+    for label, api_key in (("first", keys[0]), ("last", keys[-1]), ("unknown", "not-a-key")):
+        legacy = time_calls(lambda k: legacy_check(legacy_keys, k), api_key, args.calls)
+        registry = time_calls(registry_check, api_key, args.calls)
+        print(f"{label:<10}{legacy:>12.2f}{registry:>14.2f}{legacy / registry:>10.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Images/sec per core for generated-image post-processing.
+
+For every ASPECT_RATIOS preset, times the old path (crop, LANCZOS resize,
+PNG optimize=True) against crop_and_resize with each output format, on
+one core. A large JPEG source shows the draft/reduce fast path. Without
+--source a 1024x1024 PNG (typical model output) and a 4000x3000 JPEG
+are generated.
+
+Usage:
+    python benchmarks/image_processing_benchmark.py
+    python benchmarks/image_processing_benchmark.py --source photo.jpg --seconds 5
+"""
+
+import argparse
+import io
+import os
+import sys
+import time
+
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.image_processing import crop_and_resize, FORMATS
+from services.text_image_service import ASPECT_RATIOS
+
+def synthetic_image(width: int, height: int, fmt: str) -> bytes:
+    """Smooth gradients plus noise, so encoders have realistic work."""
+    y, x = np.mgrid[0:height, 0:width]
+    noise = np.random.default_rng(0).integers(0, 24, (height, width, 3))
+    pixels = np.stack([x * 255 // width, y * 255 // height, (x + y) * 255 // (width + height)], axis=-1) + noise
+    buffer = io.BytesIO()
+    Image.fromarray(np.clip(pixels, 0, 255).astype(np.uint8)).save(buffer, format=fmt, quality=90)
+    return buffer.getvalue()
+
+def legacy_process(image_bytes: bytes, width: int, height: int) -> bytes:
+    img = Image.open(io.BytesIO(image_bytes))
+    original_width, original_height = img.size
+    target_ratio = width / height
+    if original_width / original_height > target_ratio:
+        new_width, new_height = int(original_height * target_ratio), original_height
+        left, top = (original_width - new_width) // 2, 0
+    else:
+        new_width, new_height = original_width, int(original_width / target_ratio)
+        left, top = 0, (original_height - new_height) // 2
+    img = img.crop((left, top, left + new_width, top + new_height)).resize((width, height), Image.Resampling.LANCZOS)
+    buffer = io.BytesIO()
+    img.save(buffer, format='PNG', optimize=True)
+    return buffer.getvalue()
+
+def rate(fn, seconds: float) -> tuple:
+    """(images/sec, output KB) over at least `seconds` of repeated calls."""
+    count, size = 0, 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < seconds or count == 0:
+        size = len(fn())
+        count += 1
+    return count / (time.perf_counter() - start), size / 1024
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--source", help="Image file to process instead of the generated ones")
+    parser.add_argument("--seconds", type=float, default=2, help="Time budget per measurement")
+    args = parser.parse_args()
+
+    if args.source:
+        with open(args.source, "rb") as f:
+            sources = [(os.path.basename(args.source), f.read())]
+    else:
+        sources = [("1024x1024 png", synthetic_image(1024, 1024, "PNG")), ("4000x3000 jpeg", synthetic_image(4000, 3000, "JPEG"))]
+
+    columns = ["legacy png"] + list(FORMATS)
+    for label, image_bytes in sources:
+        print(f"\nSource: {label} ({len(image_bytes) / 1024:.0f} KB) - images/sec per core (output KB)")
+        print(f"{'preset':<12}" + "".join(f"{name:>18}" for name in columns))
+        for preset, config in ASPECT_RATIOS.items():
+            width, height = config["width"], config["height"]
+            cells = [rate(lambda: legacy_process(image_bytes, width, height), args.seconds)]
+            for fmt in FORMATS:
+                cells.append(rate(lambda: crop_and_resize(image_bytes, width, height, fmt)[0], args.seconds))
+            print(f"{preset:<12}" + "".join(f"{per_sec:>10.2f} ({size:>4.0f})" for per_sec, size in cells))
+
+if __name__ == "__main__":
+    main()
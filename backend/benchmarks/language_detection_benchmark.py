@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Per-call latency of language detection on 1 KB, 100 KB and 1 MB inputs.
+
+Compares the old call (langdetect.detect on the full text, unseeded)
+with language_service.detect_language, cold (cache cleared before every
+call) and warm (same text again). The configured LANGUAGE_DETECTOR is
+used, so set LANGUAGE_DETECTOR=fasttext to measure that backend.
+
+Usage:
+    python benchmarks/language_detection_benchmark.py
+    python benchmarks/language_detection_benchmark.py --repeat 20 --source article.md
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services import language_service
+
+SAMPLE = (
+    "The quick brown fox jumps over the lazy dog while the committee reviews the annual report. "
+    "Researchers found that most readers skim long documents, so summaries matter more than ever. "
+    "In the afternoon the weather changed and everyone went back inside to finish their work. "
+)
+
+SIZES = [("1 KB", 1024), ("100 KB", 100 * 1024), ("1 MB", 1024 * 1024)]
+
+def make_text(source: str, size: int) -> str:
+    return (source * (size // len(source) + 1))[:size]
+
+def time_calls(fn, text: str, repeat: int, before=None) -> float:
+    """Median milliseconds per call."""
+    timings = []
+    for _ in range(repeat):
+        if before:
+            before()
+        start = time.perf_counter()
+        fn(text)
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5, help="Calls per measurement (median is reported)")
+    parser.add_argument("--source", help="Text file to repeat instead of the built-in English sample")
+    args = parser.parse_args()
+
+    source = SAMPLE
+    if args.source:
+        with open(args.source, encoding="utf-8") as f:
+            source = f.read()
+
+    from langdetect import detect
+    from langdetect.detector_factory import init_factory
+
+    start = time.perf_counter()
+    init_factory()
+    language_service.load()
+    print(f"Detector: {language_service.detector.name}, profiles loaded in {time.perf_counter() - start:.2f} s")
+    print(f"{'input':<10}{'legacy ms':>12}{'cold ms':>12}{'warm ms':>12}{'speedup':>10}")
+
+    for label, size in SIZES:
+        text = make_text(source, size)
+        legacy = time_calls(detect, text, args.repeat)
+        cold = time_calls(language_service.detect_language, text, args.repeat, before=language_service.language_cache.clear)
+        warm = time_calls(language_service.detect_language, text, args.repeat)
+        print(f"{label:<10}{legacy:>12.2f}{cold:>12.2f}{warm:>12.3f}{legacy / cold:>10.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Load test for the OpenRouter client against a local stub server.
+
+Compares the old blocking path (requests.post per call, run in a
+threadpool the size of Starlette's default) with the shared async client
+used by /api/llm.
+
+Usage:
+    python benchmarks/llm_load_test.py --requests 400 --delay 2
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import multiprocessing
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+COMPLETION = json.dumps({"choices": [{"message": {"content": "stub response"}}]}).encode()
+
+async def handle_connection(reader, writer, delay: float):
+    """Minimal keep-alive HTTP/1.1 handler that answers every request with a completion."""
+    try:
+        while True:
+            head = await reader.readuntil(b"\r\n\r\n")
+            length = 0
+            for line in head.split(b"\r\n"):
+                if line.lower().startswith(b"content-length:"):
+                    length = int(line.split(b":", 1)[1])
+            await reader.readexactly(length)
+            await asyncio.sleep(delay)  # Simulated generation time
+            writer.write(
+                b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                + f"Content-Length: {len(COMPLETION)}\r\n\r\n".encode()
+                + COMPLETION
+            )
+            await writer.drain()
+    except (asyncio.IncompleteReadError, ConnectionError):
+        pass
+    finally:
+        writer.close()
+
+def serve_stub(delay: float, port_queue):
+    async def run():
+        server = await asyncio.start_server(
+            lambda r, w: handle_connection(r, w, delay), "127.0.0.1", 0, backlog=4096
+        )
+        port_queue.put(server.sockets[0].getsockname()[1])
+        await server.serve_forever()
+
+    asyncio.run(run())
+
+def start_stub_server(delay: float):
+    """Runs the stub in its own process so it does not compete for the client's GIL."""
+    port_queue = multiprocessing.Queue()
+    process = multiprocessing.Process(target=serve_stub, args=(delay, port_queue), daemon=True)
+    process.start()
+    return process, port_queue.get(timeout=10)
+
+def run_threadpool(base_url: str, total: int, threads: int) -> float:
+    import requests
+
+    def call(_):
+        response = requests.post(
+            f"{base_url}/chat/completions",
+            json={"model": "stub", "messages": [{"role": "user", "content": "hi"}]},
+        )
+        response.raise_for_status()
+        return response.json()["choices"][0]["message"]["content"]
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(call, range(total)))
+    return time.perf_counter() - start
+
+async def run_async(total: int) -> float:
+    from services import llm_service
+    from services.http_client import close_http_client
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*(llm_service.get_llm_response("hi", "stub") for _ in range(total)))
+    elapsed = time.perf_counter() - start
+    await close_http_client()
+    errors = [r for r in results if r.startswith("Error")]
+    if errors:
+        print(f"  {len(errors)} errors, first: {errors[0]}")
+    return elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=400, help="Total requests per mode")
+    parser.add_argument("--delay", type=float, default=2.0, help="Stub server response delay in seconds")
+    parser.add_argument("--threads", type=int, default=40, help="Threadpool size for the blocking mode (Starlette default: 40)")
+    parser.add_argument("--connections", type=int, default=200, help="Connection pool size for the async client")
+    args = parser.parse_args()
+
+    server, port = start_stub_server(args.delay)
+    base_url = f"http://127.0.0.1:{port}"
+
+    # Must be set before services.http_client is imported
+    os.environ["OPENROUTER_BASE_URL"] = base_url
+    os.environ["HTTP2_ENABLED"] = "false"  # The stub speaks plain HTTP/1.1
+    os.environ["HTTP_MAX_CONNECTIONS"] = str(args.connections)
+    os.environ.setdefault("OPENROUTER_API_KEY", "stub")
+
+    print(f"Stub server at {base_url}, delay={args.delay}s, requests={args.requests}")
+
+    blocking = run_threadpool(base_url, args.requests, args.threads)
+    print(f"threadpool ({args.threads} threads, requests.post): {blocking:.2f}s  {args.requests / blocking:.1f} req/s")
+
+    pooled = asyncio.run(run_async(args.requests))
+    print(f"async shared client ({args.connections} connections):    {pooled:.2f}s  {args.requests / pooled:.1f} req/s")
+
+    print(f"speedup: {blocking / pooled:.1f}x")
+    server.terminate()
+
+if __name__ == "__main__":
+    main()
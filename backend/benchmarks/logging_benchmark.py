@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Caller-side cost of one request log line, as seen by the event loop.
+
+Compares the old pipeline (json.dumps in the middleware, then a
+synchronous FileHandler and StreamHandler) with the queue pipeline in
+middleware.py (the caller only enqueues; a listener thread encodes and
+writes). Both write to a temporary file and to /dev/null instead of
+stderr. The slow-sink run adds --sink-delay-ms to every write, like a
+congested disk or a blocked log collector.
+
+Usage:
+    python benchmarks/logging_benchmark.py
+    python benchmarks/logging_benchmark.py --records 50000 --sink-delay-ms 2
+"""
+
+import argparse
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+work_dir = tempfile.mkdtemp(prefix="logging_benchmark_")
+os.environ.setdefault("LOG_FILE", os.path.join(work_dir, "import.log"))
+
+from middleware import JsonFormatter, DroppingQueueHandler, LOG_QUEUE_SIZE
+
+FIELDS = {"method": "POST", "path": "/api/tts/generate", "status_code": 200, "duration_s": "0.1234"}
+
+class LegacyJsonFormatter(logging.Formatter):
+    def format(self, record):
+        return json.dumps({"timestamp": self.formatTime(record, self.datefmt), "level": record.levelname, "message": record.getMessage()})
+
+class SlowStreamHandler(logging.StreamHandler):
+    def __init__(self, stream, delay: float):
+        super().__init__(stream)
+        self.delay = delay
+
+    def emit(self, record):
+        if self.delay:
+            time.sleep(self.delay)
+        super().emit(record)
+
+def sinks(formatter: logging.Formatter, name: str, delay: float) -> list:
+    file_handler = logging.FileHandler(os.path.join(work_dir, f"{name}.log"))
+    stream_handler = SlowStreamHandler(open(os.devnull, "w"), delay)
+    for handler in (file_handler, stream_handler):
+        handler.setFormatter(formatter)
+    return [file_handler, stream_handler]
+
+def time_calls(log_one, records: int) -> tuple:
+    """(median us, p99 us) per call."""
+    timings = []
+    for _ in range(records):
+        start = time.perf_counter()
+        log_one()
+        timings.append((time.perf_counter() - start) * 1e6)
+    timings.sort()
+    return statistics.median(timings), timings[int(len(timings) * 0.99)]
+
+def run_legacy(records: int, delay: float) -> tuple:
+    logger = logging.getLogger(f"legacy_{delay}")
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    for handler in sinks(LegacyJsonFormatter(), f"legacy_{delay}", delay):
+        logger.addHandler(handler)
+    return time_calls(lambda: logger.info(json.dumps(FIELDS)), records) + (0,)
+
+def run_queue(records: int, delay: float) -> tuple:
+    logger = logging.getLogger(f"queue_{delay}")
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    handler = DroppingQueueHandler(queue.Queue(LOG_QUEUE_SIZE))
+    listener = logging.handlers.QueueListener(handler.queue, *sinks(JsonFormatter(), f"queue_{delay}", delay))
+    logger.addHandler(handler)
+    listener.start()
+    try:
+        result = time_calls(lambda: logger.info("request", extra={"fields": FIELDS}), records)
+    finally:
+        listener.stop()
+    return result + (handler.dropped,)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--records", type=int, default=20000, help="Log calls per measurement")
+    parser.add_argument("--sink-delay-ms", type=float, default=1, help="Extra latency per write in the slow-sink run")
+    args = parser.parse_args()
+
+    print(f"{'pipeline':<10}{'sink':<8}{'median us':>12}{'p99 us':>10}{'dropped':>10}")
+    for sink, delay in (("fast", 0.0), ("slow", args.sink_delay_ms / 1000)):
+        # A slow sink takes --sink-delay-ms per call on the legacy path, so fewer calls suffice
+        records = args.records if not delay else min(args.records, 1000)
+        for name, run in (("legacy", run_legacy), ("queue", run_queue)):
+            median, p99, dropped = run(records, delay)
+            print(f"{name:<10}{sink:<8}{median:>12.1f}{p99:>10.1f}{dropped:>10}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Time and peak memory of markdown-to-speech normalization on large inputs.
+
+Compares the old path (Python-Markdown renders HTML, then regex passes
+strip tags and collapse whitespace) with the single token walk in
+speech_text. Memory is the tracemalloc peak during one call. The input
+is a synthetic article with headings, lists, links, code and entities,
+or --source repeated to each size. Python-Markdown is only needed for
+the legacy column.
+
+Usage:
+    python benchmarks/markdown_normalizer_benchmark.py
+    python benchmarks/markdown_normalizer_benchmark.py --sizes 100 1000 5000 --source README.md
+"""
+
+import argparse
+import os
+import re
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.speech_text import markdown_to_speech
+
+SECTION = """## Section heading &amp; notes
+
+This paragraph has **bold**, *italic* and `inline code`, plus a [link](https://example.com/docs/page)
+and a bare URL https://www.example.org/path?q=1 in the middle of a sentence. Prices rose 5 &lt; 10 &gt; 3.
+
+- First item with some words
+- Second item that runs a little longer than the first one
+- Third item
+
+```python
+def example():
+    return "code that is not spoken"
+```
+
+> A quoted line that should be read like a normal paragraph.
+
+"""
+
+def legacy_normalize(text_md: str) -> str:
+    import markdown
+    html = markdown.markdown(text_md)
+    plain_text = re.sub(r'<[^>]+>', '', html)
+    return re.sub(r'\s+', ' ', plain_text).strip()
+
+def make_text(source: str, size: int) -> str:
+    return (source * (size // len(source) + 1))[:size]
+
+def measure(fn, text: str) -> tuple:
+    """(seconds, peak MB) of one call; timing and memory are taken in separate runs."""
+    start = time.perf_counter()
+    fn(text)
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    fn(text)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak / 1e6
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 5000], help="Input sizes in KB")
+    parser.add_argument("--source", help="Markdown file to repeat instead of the synthetic article")
+    args = parser.parse_args()
+
+    source = SECTION
+    if args.source:
+        with open(args.source, encoding="utf-8") as f:
+            source = f.read()
+
+    print(f"{'input':<10}{'legacy s':>10}{'legacy MB':>11}{'walk s':>10}{'walk MB':>10}{'speedup':>10}")
+    for size_kb in args.sizes:
+        text = make_text(source, size_kb * 1024)
+        walk_time, walk_peak = measure(markdown_to_speech, text)
+        try:
+            legacy_time, legacy_peak = measure(legacy_normalize, text)
+            legacy = f"{legacy_time:>10.2f}{legacy_peak:>11.1f}"
+            speedup = f"{legacy_time / walk_time:>10.1f}"
+        except ImportError:
+            legacy = f"{'n/a':>10}{'n/a':>11}"
+            speedup = f"{'n/a':>10}"
+        print(f"{f'{size_kb} KB':<10}{legacy}{walk_time:>10.2f}{walk_peak:>10.1f}{speedup}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Cold-start import time of the FastAPI app, with a regression guard.
+
+Runs `python -X importtime -c "import main"` in fresh interpreters,
+reports the fastest total and the top-level packages that cost the most
+(self time summed per package), and exits with status 1 when:
+
+- the fastest total exceeds --budget-ms, or
+- a library that is meant to load on first use (torch, whisper, yt_dlp,
+  the Google and Microsoft Graph SDKs, pandas, ...) is imported at startup.
+
+A throwaway keys file and DATA_DIR are used unless KEYS_FILE/DATA_DIR
+are already set, so the benchmark runs without any local setup.
+
+Usage:
+    python benchmarks/startup_benchmark.py
+    python benchmarks/startup_benchmark.py --runs 5 --budget-ms 1500 --top 20
+"""
+
+import argparse
+import os
+import re
+import subprocess
+import sys
+import tempfile
+from collections import defaultdict
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Libraries that must not be imported by `import main`
+DEFERRED = [
+    "torch", "whisper", "yt_dlp", "moviepy", "gtts", "requests", "pandas",
+    "msgraph", "azure", "msal", "googleapiclient", "google_auth_oauthlib", "fasttext",
+]
+
+IMPORT_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+
+def run_import(env: dict) -> list:
+    """(self us, cumulative us, depth, module) for every module imported by `import main`."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        sys.exit(f"import main failed:\n{result.stderr[-2000:]}")
+    rows = []
+    for line in result.stderr.splitlines():
+        match = IMPORT_LINE.match(line)
+        if match:
+            rows.append((int(match.group(1)), int(match.group(2)), len(match.group(3)), match.group(4)))
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=3, help="Fresh interpreters to start (fastest is reported)")
+    parser.add_argument("--budget-ms", type=float, default=2000, help="Fail when `import main` takes longer")
+    parser.add_argument("--top", type=int, default=15, help="Packages to list")
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    work_dir = tempfile.mkdtemp(prefix="startup_benchmark_")
+    if "KEYS_FILE" not in env:
+        env["KEYS_FILE"] = os.path.join(work_dir, "keys.csv")
+        with open(env["KEYS_FILE"], "w") as f:
+            f.write("benchmark-key\n")
+    env.setdefault("DATA_DIR", os.path.join(work_dir, "data"))
+
+    runs = [run_import(env) for _ in range(args.runs)]
+    totals = [next(cumulative for _, cumulative, _, module in rows if module == "main") / 1000 for rows in runs]
+    best = runs[totals.index(min(totals))]
+
+    per_package = defaultdict(int)
+    for self_us, _, _, module in best:
+        per_package[module.split(".")[0]] += self_us
+
+    print(f"import main: {min(totals):.0f} ms fastest, {max(totals):.0f} ms slowest over {args.runs} runs (budget {args.budget_ms:.0f} ms)")
+    print(f"{'package':<28}{'self ms':>10}")
+    for package, self_us in sorted(per_package.items(), key=lambda item: -item[1])[:args.top]:
+        print(f"{package:<28}{self_us / 1000:>10.1f}")
+
+    failures = []
+    if min(totals) > args.budget_ms:
+        failures.append(f"import main took {min(totals):.0f} ms, over the {args.budget_ms:.0f} ms budget")
+    imported = sorted(package for package in DEFERRED if package in per_package)
+    if imported:
+        failures.append(f"imported at startup but meant to load on first use: {', '.join(imported)}")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    sys.exit(1 if failures else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Wall-clock benchmark for long-form transcription.
+
+Builds a synthetic long recording (or repeats --source to the requested
+length), then times one serial Whisper pass against the chunked parallel
+mode for an increasing number of worker processes.
+
+Usage:
+    python benchmarks/stt_long_audio_benchmark.py --minutes 10
+    python benchmarks/stt_long_audio_benchmark.py --minutes 30 --source speech.mp3 --workers 1 2 4 8
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services import stt_service
+from services.audio_io import load_audio, SAMPLE_RATE
+
+def synthetic_audio(minutes: float, seed: int = 0) -> np.ndarray:
+    """Voiced bursts (harmonic tones with a syllable-rate envelope) separated by short pauses."""
+    rng = np.random.default_rng(seed)
+    parts = []
+    total = 0.0
+    while total < minutes * 60:
+        duration = rng.uniform(3, 12)
+        t = np.arange(int(duration * SAMPLE_RATE)) / SAMPLE_RATE
+        pitch = rng.uniform(100, 220)
+        voiced = sum(np.sin(2 * np.pi * pitch * k * t) / k for k in range(1, 6))
+        envelope = 0.5 + 0.5 * np.sin(2 * np.pi * rng.uniform(3, 5) * t)
+        parts.append((0.1 * voiced * envelope).astype(np.float32))
+        pause = rng.uniform(0.3, 1.0)
+        parts.append(np.zeros(int(pause * SAMPLE_RATE), dtype=np.float32))
+        total += duration + pause
+    return np.concatenate(parts)
+
+def source_audio(path: str, minutes: float) -> np.ndarray:
+    audio = load_audio(path)
+    repeats = int(np.ceil(minutes * 60 * SAMPLE_RATE / len(audio)))
+    return np.tile(audio, repeats)[: int(minutes * 60 * SAMPLE_RATE)]
+
+def start_engine(workers: int, threads: int) -> stt_service.TranscriptionEngine:
+    engine = stt_service.TranscriptionEngine(stt_service.WHISPER_MODEL, workers, max_queue=1, threads_per_worker=threads)
+    for future in engine.warm_up():
+        future.result()  # Exclude model loading from the timings
+    stt_service.engine = engine
+    return engine
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--minutes", type=float, default=10, help="Length of the test recording")
+    parser.add_argument("--source", help="Audio file to repeat instead of synthetic audio")
+    parser.add_argument("--workers", type=int, nargs="+", help="Worker counts to test (default: 1, 2, 4, ... up to the core count)")
+    parser.add_argument("--chunk-seconds", type=float, default=stt_service.LONG_FORM_CHUNK_SECONDS)
+    args = parser.parse_args()
+
+    cores = os.cpu_count() or 1
+    workers_list = args.workers or sorted({min(2 ** i, cores) for i in range(cores.bit_length() + 1)})
+    audio = source_audio(args.source, args.minutes) if args.source else synthetic_audio(args.minutes)
+    print(f"Audio: {len(audio) / SAMPLE_RATE / 60:.1f} min, model '{stt_service.WHISPER_MODEL}', {cores} cores")
+
+    # Baseline: one serial transcribe call using every core
+    engine = start_engine(1, cores)
+    start = time.perf_counter()
+    engine.submit(stt_service._transcribe_in_worker, audio).result()
+    serial = time.perf_counter() - start
+    engine.shutdown()
+    print(f"{'mode':<24}{'wall s':>10}{'speedup':>10}")
+    print(f"{'serial':<24}{serial:>10.1f}{1.0:>10.2f}")
+
+    for workers in workers_list:
+        engine = start_engine(workers, max(1, cores // workers))
+        start = time.perf_counter()
+        asyncio.run(stt_service.transcribe_array_chunked(audio, args.chunk_seconds))
+        elapsed = time.perf_counter() - start
+        engine.shutdown()
+        print(f"{f'chunked, {workers} workers':<24}{elapsed:>10.1f}{serial / elapsed:>10.2f}")
+
+if __name__ == "__main__":
+    main()
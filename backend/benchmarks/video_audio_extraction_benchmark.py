@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+CPU time and temp disk use of video audio extraction.
+
+Compares the old path (MoviePy opens the video and re-encodes the audio
+to MP3, then Whisper decodes the MP3 to 16 kHz PCM) with the single
+ffmpeg demux/resample pipe used by video_text_service.
+
+Without --source a synthetic 720p test video is generated with ffmpeg.
+MoviePy is only needed for the legacy column.
+
+Usage:
+    python benchmarks/video_audio_extraction_benchmark.py --minutes 5
+    python benchmarks/video_audio_extraction_benchmark.py --source talk.mp4
+"""
+
+import argparse
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.audio_io import load_audio
+
+def cpu_seconds() -> float:
+    """User + system CPU of this process and its finished children (ffmpeg)."""
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return own.ru_utime + own.ru_stime + children.ru_utime + children.ru_stime
+
+def make_test_video(path: str, minutes: float):
+    seconds = str(int(minutes * 60))
+    subprocess.run([
+        "ffmpeg", "-y", "-loglevel", "error",
+        "-f", "lavfi", "-i", f"testsrc=size=1280x720:rate=30:duration={seconds}",
+        "-f", "lavfi", "-i", f"sine=frequency=440:sample_rate=44100:duration={seconds}",
+        "-c:v", "libx264", "-preset", "ultrafast", "-c:a", "aac", "-shortest", path,
+    ], check=True)
+
+def legacy_extract(video_path: str) -> tuple:
+    from moviepy.editor import VideoFileClip
+
+    video = VideoFileClip(video_path)
+    temp_audio = tempfile.NamedTemporaryFile(delete=False, suffix='.mp3')
+    temp_audio.close()
+    video.audio.write_audiofile(temp_audio.name, verbose=False, logger=None)
+    video.close()
+    temp_bytes = os.path.getsize(temp_audio.name)
+    audio = load_audio(temp_audio.name)  # What whisper.load_audio did with the MP3
+    os.unlink(temp_audio.name)
+    return audio, temp_bytes
+
+def pipe_extract(video_path: str) -> tuple:
+    return load_audio(video_path), 0
+
+def measure(name: str, fn, video_path: str):
+    cpu_start, wall_start = cpu_seconds(), time.perf_counter()
+    audio, temp_bytes = fn(video_path)
+    cpu, wall = cpu_seconds() - cpu_start, time.perf_counter() - wall_start
+    print(f"{name:<22}{wall:>10.2f}{cpu:>10.2f}{temp_bytes / 1e6:>14.1f}{len(audio) / 16000:>12.1f}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--source", help="Video file to extract from")
+    parser.add_argument("--minutes", type=float, default=5, help="Length of the generated test video")
+    args = parser.parse_args()
+
+    video_path = args.source
+    generated = None
+    if not video_path:
+        generated = tempfile.NamedTemporaryFile(delete=False, suffix=".mp4").name
+        make_test_video(generated, args.minutes)
+        video_path = generated
+
+    print(f"Video: {video_path} ({os.path.getsize(video_path) / 1e6:.1f} MB)")
+    print(f"{'path':<22}{'wall s':>10}{'cpu s':>10}{'temp MB':>14}{'audio s':>12}")
+    try:
+        try:
+            measure("moviepy + mp3", legacy_extract, video_path)
+        except ImportError:
+            print(f"{'moviepy + mp3':<22}  skipped (moviepy not installed)")
+        measure("ffmpeg pcm pipe", pipe_extract, video_path)
+    finally:
+        if generated:
+            os.unlink(generated)
+
+if __name__ == "__main__":
+    main()
@@ -8,13 +8,20 @@ from auth import get_api_key
 # Load environment variables
 load_dotenv()
 
-from middleware import log_middleware
+logger = logging.getLogger(__name__)
+
+from middleware import log_middleware, UploadSizeLimitMiddleware, MetricsMiddleware
+from services.upload_service import MAX_UPLOAD_BYTES
 
 app = FastAPI(title="OrganAIzer Service", version="1.0.0")
 
 # Logging middleware
 app.middleware("http")(log_middleware)
 
+# Upload size limit, enforced while the body streams in; added before CORS
+# so its 413 still carries the CORS headers cross-origin callers need
+app.add_middleware(UploadSizeLimitMiddleware, max_bytes=MAX_UPLOAD_BYTES)
+
 # CORS middleware
 # Allowed origins for production and testing
 ALLOWED_ORIGINS = [
@@ -40,13 +47,65 @@ app.add_middleware(
     expose_headers=["Content-Length", "Content-Range", "X-Error-Message"],
 )
 
+# Prometheus request metrics; outermost, so rejected uploads are counted too
+app.add_middleware(MetricsMiddleware)
+
 from api import router as api_router
-from routers import root, tts
+from routers import root, tts, text_image
 from fastapi.responses import JSONResponse
 
 app.include_router(root.router, tags=["root"])
 app.include_router(api_router, prefix="/api", dependencies=[Depends(get_api_key)])
 app.include_router(tts.audio_router, prefix="/api/tts", tags=["tts"])
+app.include_router(text_image.image_router, prefix="/api/text-image", tags=["text-image"])
+
+from services.http_client import close_http_client
+from services import stt_service
+from services.job_service import job_queue
+from services import tts_engines, language_service, image_processing
+import asyncio
+import importlib
+
+# Load models and heavy libraries in the background once the server is up,
+# instead of on the first request that needs them
+STARTUP_WARMUP = os.getenv("STARTUP_WARMUP", "true").lower() == "true"
+# Libraries that subsystems import on first use
+WARMUP_IMPORTS = ["gtts", "yt_dlp"]
+
+def warm_up():
+    """Loads the language detector, starts model workers and imports deferred libraries."""
+    try:
+        language_service.load()
+        if stt_service.WHISPER_PRELOAD:
+            stt_service.engine.warm_up()
+        if tts_engines.TTS_ENGINE == "local":
+            tts_engines.get_engine().warm_up()
+        for module in WARMUP_IMPORTS:
+            try:
+                importlib.import_module(module)
+            except ImportError as e:
+                logger.warning(f"Warm-up could not import {module}: {str(e)}")
+        logger.info("Background warm-up finished")
+    except Exception as e:
+        logger.error(f"Background warm-up failed: {str(e)}")
+
+@app.on_event("startup")
+async def startup_event():
+    """Start draining the job queue and warm up in the background"""
+    loop = asyncio.get_running_loop()
+    job_queue.start(loop)
+    if STARTUP_WARMUP:
+        # Not awaited: the server accepts traffic while this runs
+        loop.run_in_executor(None, warm_up)
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Release shared resources"""
+    job_queue.stop()
+    await close_http_client()
+    stt_service.engine.shutdown()
+    tts_engines.shutdown_engines()
+    image_processing.shutdown()
 
 # Health check endpoint
 @app.get("/health")
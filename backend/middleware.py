@@ -1,39 +1,136 @@
 from fastapi import Request
+from fastapi.responses import JSONResponse
+import os
 import time
-import logging
+import copy
 import json
-from fastapi import Request
-import time
+import queue
+import atexit
+import random
+import logging
+import logging.handlers
+from services import metrics
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+LOG_FILE = os.getenv("LOG_FILE", "backend.log")
+# 0: every worker appends to LOG_FILE, reopening it after external rotation (logrotate).
+# Above 0: each process rotates its own backend.<pid>.log at this size, since
+# RotatingFileHandler rollovers from several processes on one file lose records
+LOG_MAX_BYTES = int(os.getenv("LOG_MAX_BYTES", "0"))
+LOG_BACKUP_COUNT = int(os.getenv("LOG_BACKUP_COUNT", "5"))
+# Level for everything except request logs (services, libraries)
+LOG_LEVEL = os.getenv("LOG_LEVEL", "WARNING").upper()
+# Records waiting for the writer thread; further records are dropped
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+# Above this many requests per second in a process (all requests count; 0 = never
+# sample), only LOG_SUCCESS_SAMPLE_RATE of fast, successful requests are logged
+LOG_SAMPLING_RPS = float(os.getenv("LOG_SAMPLING_RPS", "0"))
+LOG_SUCCESS_SAMPLE_RATE = float(os.getenv("LOG_SUCCESS_SAMPLE_RATE", "0.1"))
+LOG_SLOW_REQUEST_SECONDS = float(os.getenv("LOG_SLOW_REQUEST_SECONDS", "1.0"))
+
+def dumps(obj) -> str:
+    if orjson is not None:
+        return orjson.dumps(obj, default=str).decode()
+    return json.dumps(obj, default=str)
 
 class JsonFormatter(logging.Formatter):
     def format(self, record):
+        # Request logs carry their fields as a dict, encoded here on the writer thread
+        fields = getattr(record, "fields", None)
         log_record = {
             "timestamp": self.formatTime(record, self.datefmt),
             "level": record.levelname,
-            "message": record.getMessage()
+            "logger": record.name,
+            "message": dumps(fields) if fields is not None else record.getMessage()
         }
-        return json.dumps(log_record)
+        if record.exc_info:
+            log_record["exception"] = self.formatException(record.exc_info)
+        return dumps(log_record)
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """
+    Puts records on the in-process queue for the writer thread. Unlike
+    QueueHandler it leaves formatting to the writer, and drops records
+    when the queue is full instead of blocking the caller.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        if record.args:
+            # Resolve lazy %-arguments now, while they still hold their values
+            record = copy.copy(record)
+            record.msg = record.getMessage()
+            record.args = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+def _process_log_file(path: str = LOG_FILE) -> str:
+    """backend.log -> backend.<pid>.log"""
+    root, ext = os.path.splitext(path)
+    return f"{root}.{os.getpid()}{ext}"
+
+def _writer_handlers() -> list:
+    if LOG_MAX_BYTES > 0:
+        file_handler = logging.handlers.RotatingFileHandler(_process_log_file(), maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT, encoding="utf-8")
+    else:
+        file_handler = logging.handlers.WatchedFileHandler(LOG_FILE, encoding="utf-8")
+    stream_handler = logging.StreamHandler()
+    for handler in (file_handler, stream_handler):
+        handler.setFormatter(JsonFormatter())
+    return [file_handler, stream_handler]
+
+# Configure logging: callers only enqueue; one background thread formats and writes
+log_queue = queue.Queue(LOG_QUEUE_SIZE)
+queue_handler = DroppingQueueHandler(log_queue)
+log_listener = logging.handlers.QueueListener(log_queue, *_writer_handlers())
+log_listener.start()
+atexit.register(log_listener.stop)
 
-# Configure logging
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
+logger.addHandler(queue_handler)
+logger.propagate = False
+
+root_logger = logging.getLogger()
+root_logger.setLevel(LOG_LEVEL)
+root_logger.addHandler(queue_handler)
 
-# File handler
-file_handler = logging.FileHandler("backend.log")
-file_handler.setFormatter(JsonFormatter())
-logger.addHandler(file_handler)
+# (second, requests seen in it); only touched from the event loop thread
+_request_window = [0, 0]
 
-# Stream handler
-stream_handler = logging.StreamHandler()
-stream_handler.setFormatter(JsonFormatter())
-logger.addHandler(stream_handler)
+def success_sample_rate() -> float:
+    """
+    Counts a request, whatever its outcome, and returns the share of fast,
+    successful requests to log: 1.0 unless this process is above
+    LOG_SAMPLING_RPS.
+    """
+    if LOG_SAMPLING_RPS <= 0:
+        return 1.0
+    second = int(time.monotonic())
+    if _request_window[0] != second:
+        _request_window[0] = second
+        _request_window[1] = 0
+    _request_window[1] += 1
+    return LOG_SUCCESS_SAMPLE_RATE if _request_window[1] > LOG_SAMPLING_RPS else 1.0
 
 async def log_middleware(request: Request, call_next):
-    start_time = time.time()
+    start_time = time.perf_counter()
     
     response = await call_next(request)
     
-    process_time = time.time() - start_time
+    process_time = time.perf_counter() - start_time
     
     log_message = {
         "method": request.method,
@@ -41,6 +138,104 @@ async def log_middleware(request: Request, call_next):
         "status_code": response.status_code,
         "duration_s": f"{process_time:.4f}"
     }
-    logger.info(json.dumps(log_message))
+    # Every request counts toward the rate; errors and slow requests are always logged
+    sample_rate = success_sample_rate()
+    if response.status_code < 400 and process_time < LOG_SLOW_REQUEST_SECONDS:
+        if sample_rate < 1.0:
+            if random.random() >= sample_rate:
+                return response
+            log_message["sample_rate"] = sample_rate
+    logger.info("request", extra={"fields": log_message})
     
     return response
+
+class UploadSizeLimitMiddleware:
+    """
+    Rejects multipart uploads larger than max_bytes with 413 while the body
+    is still streaming in, before the multipart parser spools all of it.
+    """
+
+    def __init__(self, app, max_bytes: int):
+        self.app = app
+        self.max_bytes = max_bytes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        headers = dict(scope["headers"])
+        if not headers.get(b"content-type", b"").startswith(b"multipart/form-data"):
+            return await self.app(scope, receive, send)
+
+        content_length = headers.get(b"content-length")
+        if content_length and content_length.isdigit() and int(content_length) > self.max_bytes:
+            return await self._reject(scope, receive, send)
+
+        received = 0
+        response_started = False
+        rejected = False
+
+        async def limited_receive():
+            # The 413 is sent from here: an exception raised inside request.form()
+            # would be turned into a 400 by FastAPI's body parsing
+            nonlocal received, rejected
+            if rejected:
+                return {"type": "http.disconnect"}
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    rejected = True
+                    if not response_started:
+                        await self._reject(scope, receive, send)
+                    # The app sees a disconnect and stops parsing; whatever it answers is dropped
+                    return {"type": "http.disconnect"}
+            return message
+
+        async def tracking_send(message):
+            nonlocal response_started
+            if rejected:
+                return
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        await self.app(scope, limited_receive, tracking_send)
+
+    async def _reject(self, scope, receive, send):
+        logger.warning("upload too large", extra={"fields": {"path": scope["path"], "status_code": 413, "detail": "upload too large"}})
+        response = JSONResponse(status_code=413, content={"detail": f"Upload exceeds {self.max_bytes} bytes"})
+        await response(scope, receive, send)
+
+class MetricsMiddleware:
+    """
+    Request count, latency (until the last body chunk is sent) and in-flight
+    gauge per route template, so /api/tts/audio/{audio_id} is one series
+    rather than one per id. Requests that match no route share "unmatched".
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        start = time.perf_counter()
+        status_code = 500
+
+        async def tracking_send(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        metrics.HTTP_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, tracking_send)
+        finally:
+            metrics.HTTP_IN_FLIGHT.dec()
+            # The router stores the matched route in the shared scope
+            route = scope.get("route")
+            labels = (scope["method"], getattr(route, "path", "unmatched"), str(status_code))
+            metrics.HTTP_REQUESTS.labels(*labels).inc()
+            metrics.HTTP_REQUEST_SECONDS.labels(*labels).observe(time.perf_counter() - start)
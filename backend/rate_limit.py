@@ -0,0 +1,176 @@
+from fastapi import Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
+import os
+import math
+import time
+import uuid
+import sqlite3
+import logging
+import threading
+from auth import get_api_key, key_fingerprint
+from services.paths import DATA_DIR
+from services import metrics
+
+logger = logging.getLogger(__name__)
+
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
+RATE_LIMIT_DB = os.getenv("RATE_LIMIT_DB", os.path.join(DATA_DIR, "rate_limit.db"))
+# Concurrent CPU-heavy requests per API key (0 = unlimited)
+RATE_LIMIT_MAX_INFLIGHT = int(os.getenv("RATE_LIMIT_MAX_INFLIGHT", "2"))
+# In-flight slots of crashed workers are reclaimed after this many seconds
+RATE_LIMIT_LEASE_TTL = float(os.getenv("RATE_LIMIT_LEASE_TTL", "3600"))
+INFLIGHT_RETRY_AFTER = 5
+
+# Route class -> (requests per minute, burst); RATE_LIMIT_<CLASS>_PER_MINUTE=0 disables a class
+DEFAULT_LIMITS = {
+    "cpu": (10, 5),        # Transcription, TTS, image generation
+    "download": (6, 3),    # YouTube downloads
+    "llm": (60, 20),       # LLM prompts
+}
+LIMITS = {
+    route_class: (
+        float(os.getenv(f"RATE_LIMIT_{route_class.upper()}_PER_MINUTE", str(per_minute))),
+        float(os.getenv(f"RATE_LIMIT_{route_class.upper()}_BURST", str(burst))),
+    )
+    for route_class, (per_minute, burst) in DEFAULT_LIMITS.items()
+}
+
+class RateLimited(Exception):
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+class RateLimiter:
+    """
+    Token buckets per (API key, route class) and in-flight leases per key,
+    kept in SQLite so every uvicorn worker on the host shares them. Each
+    check is one IMMEDIATE transaction, which serializes the read-modify-
+    write across processes. Keys are stored as fingerprints, never raw.
+    """
+
+    def __init__(self, path: str, limits: dict, max_inflight: int, lease_ttl: float):
+        self.limits = limits
+        self.max_inflight = max_inflight
+        self.lease_ttl = lease_ttl
+        self.rejected = 0
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS buckets ("
+            "key_id TEXT NOT NULL, route_class TEXT NOT NULL, tokens REAL NOT NULL, updated_at REAL NOT NULL, "
+            "PRIMARY KEY (key_id, route_class))"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS leases (lease_id TEXT PRIMARY KEY, key_id TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS leases_key ON leases (key_id, expires_at)")
+        self.cleanup()
+
+    def _transaction(self, fn):
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                result = fn()
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+            return result
+
+    def take(self, key_id: str, route_class: str):
+        """Takes one token from the key's bucket for route_class or raises RateLimited."""
+        per_minute, burst = self.limits[route_class]
+        if per_minute <= 0:
+            return
+        rate = per_minute / 60
+
+        def take_token():
+            now = time.time()
+            row = self._conn.execute(
+                "SELECT tokens, updated_at FROM buckets WHERE key_id = ? AND route_class = ?", (key_id, route_class)
+            ).fetchone()
+            tokens = burst if row is None else min(burst, row[0] + (now - row[1]) * rate)
+            if tokens < 1:
+                return (1 - tokens) / rate
+            self._conn.execute(
+                "INSERT OR REPLACE INTO buckets (key_id, route_class, tokens, updated_at) VALUES (?, ?, ?, ?)",
+                (key_id, route_class, tokens - 1, now),
+            )
+            return None
+
+        retry_after = self._transaction(take_token)
+        if retry_after is not None:
+            self.rejected += 1
+            metrics.RATE_LIMITED.labels(route_class, "rate").inc()
+            raise RateLimited(f"Rate limit exceeded for {route_class} requests ({per_minute:g}/min)", retry_after)
+
+    def acquire(self, key_id: str, route_class: str) -> str:
+        """Takes an in-flight slot for the key and returns its lease id, or raises RateLimited."""
+        lease_id = uuid.uuid4().hex
+        if self.max_inflight <= 0:
+            return lease_id
+
+        def take_slot():
+            now = time.time()
+            self._conn.execute("DELETE FROM leases WHERE expires_at < ?", (now,))
+            inflight = self._conn.execute("SELECT COUNT(*) FROM leases WHERE key_id = ?", (key_id,)).fetchone()[0]
+            if inflight >= self.max_inflight:
+                return False
+            self._conn.execute(
+                "INSERT INTO leases (lease_id, key_id, expires_at) VALUES (?, ?, ?)", (lease_id, key_id, now + self.lease_ttl)
+            )
+            return True
+
+        if not self._transaction(take_slot):
+            self.rejected += 1
+            metrics.RATE_LIMITED.labels(route_class, "concurrency").inc()
+            raise RateLimited(f"Too many concurrent requests ({self.max_inflight} allowed per API key)", INFLIGHT_RETRY_AFTER)
+        return lease_id
+
+    def release(self, lease_id: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM leases WHERE lease_id = ?", (lease_id,))
+
+    def cleanup(self):
+        """Drops buckets that have been full for a day."""
+        with self._lock:
+            self._conn.execute("DELETE FROM buckets WHERE updated_at < ?", (time.time() - 86400,))
+
+limiter = RateLimiter(RATE_LIMIT_DB, LIMITS, RATE_LIMIT_MAX_INFLIGHT, RATE_LIMIT_LEASE_TTL) if RATE_LIMIT_ENABLED else None
+
+def _too_many_requests(api_key: str, error: RateLimited) -> HTTPException:
+    logger.warning(f"Rate limited key {key_fingerprint(api_key)}: {str(error)}")
+    return HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail=str(error),
+        headers={"Retry-After": str(max(1, math.ceil(error.retry_after)))},
+    )
+
+def rate_limit(route_class: str, concurrency: bool = False):
+    """
+    Route dependency: one token per request from the caller's bucket for
+    route_class and, with concurrency=True, an in-flight slot held until
+    the response (including a streamed body) has been sent.
+    """
+    if route_class not in DEFAULT_LIMITS:
+        raise ValueError(f"Unknown route class: {route_class}")
+
+    async def dependency(api_key: str = Depends(get_api_key)):
+        if limiter is None:
+            yield
+            return
+        key_id = key_fingerprint(api_key)
+        try:
+            await run_in_threadpool(limiter.take, key_id, route_class)
+            lease_id = await run_in_threadpool(limiter.acquire, key_id, route_class) if concurrency else None
+        except RateLimited as e:
+            raise _too_many_requests(api_key, e)
+        try:
+            yield
+        finally:
+            if lease_id:
+                await run_in_threadpool(limiter.release, lease_id)
+
+    return Depends(dependency)
@@ -0,0 +1,53 @@
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import FileResponse
+import os
+import logging
+from services.job_service import job_queue
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+def job_accepted(job_id: str) -> dict:
+    """Response body for endpoints that queue a background job."""
+    return {"job_id": job_id, "status": "queued", "status_url": f"/api/jobs/{job_id}"}
+
+# The job queue is a SQLite database shared by all workers; these are plain
+# def routes so its lock waits happen in the thread pool, not on the event loop
+@router.get("/stats")
+def stats():
+    return job_queue.stats()
+
+@router.get("/{job_id}")
+def get_job(job_id: str):
+    job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@router.get("/{job_id}/result")
+def get_job_result(job_id: str):
+    job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job["status"] != "succeeded":
+        raise HTTPException(status_code=409, detail=f"Job is {job['status']}")
+
+    result = job.get("result", {})
+    file_path = job_queue.result_file(job_id)
+    if file_path:
+        if not os.path.exists(file_path):
+            raise HTTPException(status_code=410, detail="Result file has expired")
+        return FileResponse(
+            path=file_path,
+            media_type=result.get("media_type", "application/octet-stream"),
+            filename=result.get("filename", os.path.basename(file_path))
+        )
+    return result
+
+@router.delete("/{job_id}")
+def cancel_job(job_id: str):
+    job = job_queue.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
@@ -1,14 +1,43 @@
 from fastapi import APIRouter
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
+from typing import Literal
+import logging
 from services import llm_service
+from services.sse import format_sse_event
+from rate_limit import rate_limit
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
 class LLMRequest(BaseModel):
     prompt: str
     model: str = "openrouter/auto"
+    cache: Literal["default", "refresh", "bypass"] = "default"
 
-@router.post("/llm")
-def get_llm_response(request: LLMRequest):
-    response = llm_service.get_llm_response(request.prompt, request.model)
+@router.post("/llm", dependencies=[rate_limit("llm")])
+async def get_llm_response(request: LLMRequest):
+    response = await llm_service.get_llm_response(request.prompt, request.model, request.cache)
     return {"response": response}
+
+@router.post("/llm/stream", dependencies=[rate_limit("llm")])
+async def stream_llm_response(request: LLMRequest):
+    async def event_stream():
+        try:
+            async for content in llm_service.stream_llm_response(request.prompt, request.model, request.cache):
+                yield format_sse_event({"content": content})
+            yield format_sse_event({}, event="done")
+        except Exception as e:
+            logger.error(f"LLM streaming failed: {str(e)}")
+            yield format_sse_event({"error": str(e)}, event="error")
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@router.get("/llm/cache/stats")
+async def get_cache_stats():
+    return llm_service.llm_cache.stats()
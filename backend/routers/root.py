@@ -1,4 +1,6 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends, Response
+from auth import get_api_key
+from services import metrics
 
 router = APIRouter()
 
@@ -9,3 +11,9 @@ async def root():
 @router.get("/health")
 async def health():
     return {"status": "ok"}
+
+@router.get("/metrics", dependencies=[Depends(get_api_key)])
+def prometheus_metrics():
+    """Prometheus exposition format, merged across all worker processes."""
+    body, content_type = metrics.render()
+    return Response(content=body, headers={"Content-Type": content_type})
@@ -1,9 +1,14 @@
 from fastapi import APIRouter, HTTPException, UploadFile, File, Form
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-import os
-import tempfile
 import logging
-from services.stt_service import transcribe_audio, download_audio_from_url
+from services.stt_service import transcribe_audio_async, transcribe_long_audio_async, stream_transcription, download_audio_from_url, QueueFullError, engine, transcript_cache
+from services.sse import format_sse_event
+from services.upload_service import save_upload, remove_temp_file, UploadTooLargeError
+from services.job_service import job_queue, JobContext
+from routers.jobs import job_accepted
+from rate_limit import rate_limit
 
 logger = logging.getLogger(__name__)
 
@@ -14,26 +19,27 @@ class TranscribeResponse(BaseModel):
     language: str
     segments: list = []
 
-@router.post("/transcribe", response_model=TranscribeResponse)
+@router.post("/transcribe", response_model=TranscribeResponse, dependencies=[rate_limit("cpu", concurrency=True)])
 async def transcribe(
     file: UploadFile = File(None),
-    audio_url: str = Form(None)
+    audio_url: str = Form(None),
+    long_form: bool = Form(False)
 ):
     temp_path = None
     try:
         if file:
-            # Save uploaded file to temp
-            temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=os.path.splitext(file.filename)[1])
-            temp_file.write(await file.read())
-            temp_file.close()
-            temp_path = temp_file.name
+            # Stream uploaded file to disk
+            temp_path = await save_upload(file)
         elif audio_url:
             # Download from URL
-            temp_path = download_audio_from_url(audio_url)
+            temp_path = await run_in_threadpool(download_audio_from_url, audio_url)
         else:
             raise HTTPException(status_code=400, detail="Either file or audio_url must be provided")
         
-        result = transcribe_audio(temp_path)
+        if long_form:
+            result = await transcribe_long_audio_async(temp_path)
+        else:
+            result = await transcribe_audio_async(temp_path)
         
         logger.info("Transcription successful")
         
@@ -42,9 +48,110 @@ async def transcribe(
             language=result["language"],
             segments=result["segments"]
         )
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except QueueFullError as e:
+        logger.warning(f"Transcription rejected: {str(e)}")
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "30"})
+    except Exception as e:
+        logger.error(f"Transcription failed: {str(e)}")
+        raise HTTPException(status_code=400, detail=str(e))
+    finally:
+        remove_temp_file(temp_path)
+
+@router.post("/transcribe/stream", dependencies=[rate_limit("cpu", concurrency=True)])
+async def transcribe_stream(
+    file: UploadFile = File(None),
+    audio_url: str = Form(None)
+):
+    """
+    Streams transcription results as Server-Sent Events: one `segment`
+    event per decoded segment, then a `done` event with the language.
+    """
+    temp_path = None
+    try:
+        if file:
+            # Stream uploaded file to disk
+            temp_path = await save_upload(file)
+        elif audio_url:
+            # Download from URL
+            temp_path = await run_in_threadpool(download_audio_from_url, audio_url)
+        else:
+            raise HTTPException(status_code=400, detail="Either file or audio_url must be provided")
+
+        events = stream_transcription(temp_path)
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except QueueFullError as e:
+        logger.warning(f"Transcription rejected: {str(e)}")
+        remove_temp_file(temp_path)
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "30"})
     except Exception as e:
         logger.error(f"Transcription failed: {str(e)}")
+        remove_temp_file(temp_path)
         raise HTTPException(status_code=400, detail=str(e))
+
+    async def event_stream():
+        try:
+            async for event in events:
+                event_type = event.pop("type")
+                yield format_sse_event(event, event=event_type)
+        except Exception as e:
+            logger.error(f"Streaming transcription failed: {str(e)}")
+            yield format_sse_event({"error": str(e)}, event="error")
+        finally:
+            await events.aclose()
+            remove_temp_file(temp_path)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+async def transcribe_job(params: dict, context: JobContext) -> dict:
+    temp_path = params.get("file_path")
+    try:
+        if not temp_path:
+            context.progress(0.0, "Downloading audio")
+            temp_path = await run_in_threadpool(download_audio_from_url, params["audio_url"])
+        context.progress(0.1, "Transcribing")
+        if params.get("long_form"):
+            return await transcribe_long_audio_async(temp_path)
+        return await transcribe_audio_async(temp_path)
     finally:
-        if temp_path and os.path.exists(temp_path):
-            os.unlink(temp_path)
+        if not params.get("file_path"):
+            remove_temp_file(temp_path)
+
+# A full Whisper queue is retried later instead of failing the job
+job_queue.register("stt.transcribe", transcribe_job, retry_on=(QueueFullError,))
+
+@router.post("/transcribe/jobs", status_code=202, dependencies=[rate_limit("cpu")])
+async def transcribe_as_job(
+    file: UploadFile = File(None),
+    audio_url: str = Form(None),
+    long_form: bool = Form(False)
+):
+    """Queues a transcription; poll /api/jobs/{job_id} for the result."""
+    if not file and not audio_url:
+        raise HTTPException(status_code=400, detail="Either file or audio_url must be provided")
+    try:
+        async with job_queue.prepare_job() as (job_id, work_dir):
+            params = {"audio_url": audio_url, "long_form": long_form}
+            if file:
+                # The upload must outlive this request, so it is copied into the job directory
+                params["file_path"] = await save_upload(file, passthrough=False, directory=work_dir)
+            await run_in_threadpool(job_queue.submit, "stt.transcribe", params, job_id=job_id)
+        return job_accepted(job_id)
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        # Queue and storage failures are server errors
+        logger.error(f"Failed to queue transcription: {str(e)}")
+        raise
+
+@router.get("/status")
+async def status():
+    return {**engine.stats(), "cache": transcript_cache.stats()}
@@ -1,13 +1,20 @@
 from fastapi import APIRouter, HTTPException
+from fastapi.concurrency import run_in_threadpool
+import os
 import logging
-from services.text_image_service import generate_images
+from services.text_image_service import generate_images, image_store
+from services.file_response import cached_file_response
+from services.job_service import job_queue, JobContext
+from routers.jobs import job_accepted
 from starlette.requests import Request
+from rate_limit import rate_limit
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
+image_router = APIRouter()
 
-@router.api_route("/generate", methods=["POST"])
+@router.api_route("/generate", methods=["POST"], dependencies=[rate_limit("cpu", concurrency=True)])
 async def generate(request: Request):
     try:
         # Parse form data manually
@@ -27,16 +34,19 @@ async def generate(request: Request):
             if hasattr(field_value, 'filename') and field_value.filename:
                 # Read file content
                 content = await field_value.read()
-                logger.info(f"Received uploaded image: {field_value.filename}")
+                logger.debug(f"Received uploaded image: {field_value.filename}")
                 uploaded_images.append({
                     'filename': field_value.filename,
                     'content': content
                 })
 
         # Generate images using the prompt (and potentially uploaded images)
-        images_result = generate_images(prompt, {
+        images_result = await generate_images(prompt, {
             "uploaded_images": uploaded_images,
-            "aspect_ratio": aspect_ratio
+            "aspect_ratio": aspect_ratio,
+            "output_format": form.get("output_format"),
+            "quality": form.get("quality"),
+            "delivery": form.get("delivery")
         })
 
         logger.info("Image generation successful")
@@ -45,3 +55,75 @@ async def generate(request: Request):
     except Exception as e:
         logger.error(f"Image generation failed: {str(e)}")
         raise HTTPException(status_code=400, detail=str(e))
+
+async def generate_job(params: dict, context: JobContext) -> dict:
+    uploaded_images = []
+    for image in params["uploaded_images"]:
+        with open(image["path"], "rb") as f:
+            uploaded_images.append({'filename': image["filename"], 'content': f.read()})
+
+    context.progress(0.0, "Generating images")
+    images_result = await generate_images(params["prompt"], {
+        "uploaded_images": uploaded_images,
+        "aspect_ratio": params["aspect_ratio"],
+        "output_format": params.get("output_format"),
+        "quality": params.get("quality"),
+        "delivery": params.get("delivery")
+    })
+    return {"images": images_result}
+
+job_queue.register("text_image.generate", generate_job)
+
+@router.post("/generate/jobs", status_code=202, dependencies=[rate_limit("cpu")])
+async def generate_as_job(request: Request):
+    """Queues image generation; poll /api/jobs/{job_id} for the result."""
+    try:
+        form = await request.form()
+
+        prompt = form.get("prompt")
+        if not prompt:
+            raise HTTPException(status_code=400, detail="Prompt is required")
+
+        # Uploaded images are kept in the job directory until the job runs
+        async with job_queue.prepare_job() as (job_id, work_dir):
+            uploaded_images = []
+            for index, (field_name, field_value) in enumerate(form.multi_items()):
+                if hasattr(field_value, 'filename') and field_value.filename:
+                    path = os.path.join(work_dir, f"input_{index}{os.path.splitext(field_value.filename)[1]}")
+                    with open(path, "wb") as f:
+                        f.write(await field_value.read())
+                    uploaded_images.append({'filename': field_value.filename, 'path': path})
+
+            await run_in_threadpool(job_queue.submit, "text_image.generate", {
+                "prompt": prompt,
+                "aspect_ratio": form.get("aspect_ratio", "square"),
+                "output_format": form.get("output_format"),
+                "quality": form.get("quality"),
+                "delivery": form.get("delivery"),
+                "uploaded_images": uploaded_images
+            }, job_id=job_id)
+        return job_accepted(job_id)
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        # Queue and storage failures are server errors
+        logger.error(f"Failed to queue image generation: {str(e)}")
+        raise
+
+
+@image_router.get("/images/{image_id}")
+async def get_image(image_id: str, request: Request):
+    blob = await run_in_threadpool(image_store.get, image_id)
+    if blob is None:
+        raise HTTPException(status_code=404, detail="Image not found")
+
+    return cached_file_response(
+        request,
+        path=blob["path"],
+        media_type=blob["media_type"],
+        etag=image_id,
+        filename=f"image_{image_id[:16]}{os.path.splitext(blob['path'])[1]}",
+        max_age=int(image_store.ttl)
+    )
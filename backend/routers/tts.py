@@ -1,34 +1,37 @@
 from fastapi import APIRouter, HTTPException
-from fastapi.responses import FileResponse
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
 from pydantic import BaseModel
-import os
-import uuid
+from typing import Literal, Optional
 import logging
-from services.tts_service import generate_tts
+from starlette.requests import Request
+from services.tts_service import generate_tts, stream_tts, audio_store, tts_cache
+from services.file_response import cached_file_response
+from services.tts_engines import engines, TTS_ENGINE
+from services import language_service
+from rate_limit import rate_limit
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 audio_router = APIRouter()
 
-# Simple in-memory storage for demo
-audio_files = {}
-
 class GenerateRequest(BaseModel):
     text_md: str
+    engine: Optional[Literal["gtts", "local"]] = None  # Default: TTS_ENGINE
 
 class GenerateResponse(BaseModel):
     text_normalized: str
     language: str
     audio_url: str
 
-@router.post("/generate", response_model=GenerateResponse)
+@router.post("/generate", response_model=GenerateResponse, dependencies=[rate_limit("cpu", concurrency=True)])
 async def generate_speech(request: GenerateRequest):
     try:
-        result = generate_tts(request.text_md)
+        result = await run_in_threadpool(generate_tts, request.text_md, request.engine)
         
-        audio_id = str(uuid.uuid4())
-        audio_files[audio_id] = result["audio_path"]
+        audio_id = result["audio_id"]
         
         # Assuming the API base is known, but for demo, use relative
         audio_url = f"/api/tts/audio/{audio_id}"
@@ -44,17 +47,48 @@ async def generate_speech(request: GenerateRequest):
         logger.error(f"TTS generation failed: {str(e)}")
         raise HTTPException(status_code=400, detail=str(e))
 
+@router.post("/stream", dependencies=[rate_limit("cpu", concurrency=True)])
+async def stream_speech(request: GenerateRequest):
+    """
+    Streams the MP3 while it is being synthesized, sentence chunk by
+    sentence chunk. The detected language is sent in X-Audio-Language.
+    """
+    try:
+        info, audio = await run_in_threadpool(stream_tts, request.text_md, request.engine)
+    except Exception as e:
+        logger.error(f"TTS streaming failed: {str(e)}")
+        raise HTTPException(status_code=400, detail=str(e))
+
+    headers = {"X-Audio-Language": info["language"], "Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    if info["audio_id"]:
+        headers["X-Audio-Url"] = f"/api/tts/audio/{info['audio_id']}"
+    # Starlette does not close sync iterators when the client disconnects;
+    # closing it here deletes the partial MP3 of an abandoned stream
+    return StreamingResponse(audio, media_type="audio/mpeg", headers=headers, background=BackgroundTask(audio.close))
+
+@router.get("/status")
+async def status():
+    return {
+        "default_engine": TTS_ENGINE,
+        "engines": {name: engine.stats() for name, engine in engines.items()},
+        "language_detection": language_service.stats(),
+    }
+
+@router.get("/cache/stats")
+async def cache_stats():
+    return {**tts_cache.stats(), "store": audio_store.stats()}
+
 @audio_router.get("/audio/{audio_id}")
-async def get_audio(audio_id: str):
-    if audio_id not in audio_files:
+async def get_audio(audio_id: str, request: Request):
+    blob = await run_in_threadpool(audio_store.get, audio_id)
+    if blob is None:
         raise HTTPException(status_code=404, detail="Audio not found")
     
-    file_path = audio_files[audio_id]
-    if not os.path.exists(file_path):
-        raise HTTPException(status_code=404, detail="Audio file not found")
-    
-    return FileResponse(
-        path=file_path,
-        media_type='audio/mpeg',
-        filename=f"tts_{audio_id}.mp3"
+    return cached_file_response(
+        request,
+        path=blob["path"],
+        media_type=blob["media_type"],
+        etag=audio_id,
+        filename=f"tts_{audio_id[:16]}.mp3",
+        max_age=int(audio_store.ttl)
     )
@@ -1,9 +1,13 @@
 from fastapi import APIRouter, HTTPException, UploadFile, File, Form
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
-import os
-import tempfile
 import logging
 from services.video_text_service import transcribe_video
+from services.stt_service import QueueFullError
+from services.upload_service import save_upload, remove_temp_file, UploadTooLargeError
+from services.job_service import job_queue, JobContext
+from routers.jobs import job_accepted
+from rate_limit import rate_limit
 
 logger = logging.getLogger(__name__)
 
@@ -14,7 +18,7 @@ class TranscribeResponse(BaseModel):
     language: str
     segments: list = []
 
-@router.post("/transcribe", response_model=TranscribeResponse)
+@router.post("/transcribe", response_model=TranscribeResponse, dependencies=[rate_limit("cpu", concurrency=True)])
 async def transcribe(
     file: UploadFile = File(None),
     video_url: str = Form(None)
@@ -22,18 +26,15 @@ async def transcribe(
     temp_path = None
     try:
         if file:
-            # Save uploaded file to temp
-            temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=os.path.splitext(file.filename)[1])
-            temp_file.write(await file.read())
-            temp_file.close()
-            temp_path = temp_file.name
+            # Stream uploaded file to disk
+            temp_path = await save_upload(file)
         elif video_url:
             # Use video_url directly
             pass
         else:
             raise HTTPException(status_code=400, detail="Either file or video_url must be provided")
         
-        result = transcribe_video(video_path=temp_path, video_url=video_url)
+        result = await run_in_threadpool(transcribe_video, video_path=temp_path, video_url=video_url)
         
         logger.info("Video transcription successful")
         
@@ -42,9 +43,45 @@ async def transcribe(
             language=result["language"],
             segments=result["segments"]
         )
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except QueueFullError as e:
+        logger.warning(f"Video transcription rejected: {str(e)}")
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "30"})
     except Exception as e:
         logger.error(f"Video transcription failed: {str(e)}")
         raise HTTPException(status_code=400, detail=str(e))
     finally:
-        if temp_path and os.path.exists(temp_path):
-            os.unlink(temp_path)
+        remove_temp_file(temp_path)
+
+def transcribe_job(params: dict, context: JobContext) -> dict:
+    context.progress(0.0, "Extracting audio")
+    return transcribe_video(video_path=params.get("file_path"), video_url=params.get("video_url"))
+
+# A full Whisper queue is retried later instead of failing the job
+job_queue.register("video_text.transcribe", transcribe_job, retry_on=(QueueFullError,))
+
+@router.post("/transcribe/jobs", status_code=202, dependencies=[rate_limit("cpu")])
+async def transcribe_as_job(
+    file: UploadFile = File(None),
+    video_url: str = Form(None)
+):
+    """Queues a video transcription; poll /api/jobs/{job_id} for the result."""
+    if not file and not video_url:
+        raise HTTPException(status_code=400, detail="Either file or video_url must be provided")
+    try:
+        async with job_queue.prepare_job() as (job_id, work_dir):
+            params = {"video_url": video_url}
+            if file:
+                # The upload must outlive this request, so it is copied into the job directory
+                params["file_path"] = await save_upload(file, passthrough=False, directory=work_dir)
+            await run_in_threadpool(job_queue.submit, "video_text.transcribe", params, job_id=job_id)
+        return job_accepted(job_id)
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        # Queue and storage failures are server errors
+        logger.error(f"Failed to queue video transcription: {str(e)}")
+        raise
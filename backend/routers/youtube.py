@@ -1,9 +1,13 @@
 from fastapi import APIRouter, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import FileResponse
 from pydantic import BaseModel
 import os
 import logging
 from services.youtube_service import download_youtube_video
+from services.job_service import job_queue, JobContext, JobCancelled
+from routers.jobs import job_accepted
+from rate_limit import rate_limit
 
 logger = logging.getLogger(__name__)
 
@@ -12,7 +16,7 @@ router = APIRouter()
 class DownloadRequest(BaseModel):
     url: str
 
-@router.post("/download")
+@router.post("/download", dependencies=[rate_limit("download")])
 async def download_video(request: DownloadRequest):
     try:
         file_path = download_youtube_video(request.url)
@@ -28,3 +32,25 @@ async def download_video(request: DownloadRequest):
     except Exception as e:
         logger.error(f"Download failed: {str(e)}")
         raise HTTPException(status_code=400, detail=str(e))
+
+def download_job(params: dict, context: JobContext) -> dict:
+    def on_progress(status):
+        total = status.get("total_bytes") or status.get("total_bytes_estimate")
+        if status.get("status") == "downloading" and total:
+            context.progress(0.99 * status.get("downloaded_bytes", 0) / total, "Downloading")
+
+    try:
+        file_path = download_youtube_video(params["url"], output_dir=context.work_dir, progress_hook=on_progress)
+    except Exception:
+        if context.cancelled():
+            raise JobCancelled()
+        raise
+    return {"file": file_path, "filename": os.path.basename(file_path), "media_type": "video/mp4"}
+
+job_queue.register("youtube.download", download_job)
+
+@router.post("/download/jobs", status_code=202, dependencies=[rate_limit("download")])
+async def download_video_job(request: DownloadRequest):
+    """Queues the download; fetch the file from /api/jobs/{job_id}/result."""
+    job_id = await run_in_threadpool(job_queue.submit, "youtube.download", {"url": request.url})
+    return job_accepted(job_id)
@@ -0,0 +1,55 @@
+import numpy as np
+from typing import List, Tuple
+from services.audio_io import SAMPLE_RATE
+
+FRAME_SECONDS = 0.03  # Energy is measured on 30 ms frames
+SMOOTHING_FRAMES = 10  # ~300 ms moving average, so cuts land in pauses, not between syllables
+
+def frame_energy(audio: np.ndarray, sample_rate: int = SAMPLE_RATE) -> np.ndarray:
+    """RMS energy in dBFS per frame."""
+    frame = int(sample_rate * FRAME_SECONDS)
+    usable = len(audio) - len(audio) % frame
+    if usable == 0:
+        return np.zeros(0, dtype=np.float32)
+    frames = audio[:usable].reshape(-1, frame)
+    rms = np.sqrt(np.mean(frames * frames, axis=1) + 1e-10)
+    return 20 * np.log10(rms)
+
+def split_on_silence(
+    audio: np.ndarray,
+    sample_rate: int = SAMPLE_RATE,
+    target_seconds: float = 60.0,
+    max_seconds: float = 90.0,
+    min_seconds: float = 20.0,
+) -> List[Tuple[int, int]]:
+    """
+    Splits audio into chunks of roughly `target_seconds`, cutting at the
+    quietest point between `min_seconds` and `max_seconds` into each chunk.
+    Returns (start_sample, end_sample) pairs covering the whole input.
+    """
+    total = len(audio)
+    if total <= int(max_seconds * sample_rate):
+        return [(0, total)]
+
+    frame = int(sample_rate * FRAME_SECONDS)
+    energy = frame_energy(audio, sample_rate)
+    kernel = np.ones(SMOOTHING_FRAMES) / SMOOTHING_FRAMES
+    smoothed = np.convolve(energy, kernel, mode="same")
+
+    chunks = []
+    start_frame = 0
+    total_frames = len(energy)
+    max_frames = int(max_seconds / FRAME_SECONDS)
+    min_frames = int(min_seconds / FRAME_SECONDS)
+    target_frames = int(target_seconds / FRAME_SECONDS)
+    while total_frames - start_frame > max_frames:
+        lo = start_frame + min_frames
+        hi = start_frame + max_frames
+        window = smoothed[lo:hi]
+        # Among the quietest frames (within 3 dB of the minimum), take the one closest to the target length
+        candidates = np.flatnonzero(window <= window.min() + 3.0) + lo
+        cut = int(candidates[np.argmin(np.abs(candidates - (start_frame + target_frames)))])
+        chunks.append((start_frame * frame, cut * frame))
+        start_frame = cut
+    chunks.append((start_frame * frame, total))
+    return chunks
@@ -0,0 +1,29 @@
+import subprocess
+import logging
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_RATE = 16000  # Whisper's native sample rate
+
+def load_audio(path: str, sample_rate: int = SAMPLE_RATE, http_headers: dict = None) -> np.ndarray:
+    """
+    Decodes any ffmpeg-readable audio or video file (or HTTP stream URL) to
+    mono float32 PCM in [-1, 1] in a single ffmpeg pass. Video, subtitle and
+    data streams are dropped before decoding, and the PCM is piped back
+    without a temp file.
+    """
+    cmd = ["ffmpeg", "-nostdin", "-hide_banner", "-loglevel", "error", "-threads", "0"]
+    if http_headers:
+        cmd += ["-headers", "".join(f"{name}: {value}\r\n" for name, value in http_headers.items())]
+    cmd += [
+        "-i", path,
+        "-map", "0:a:0", "-vn", "-sn", "-dn",
+        "-f", "s16le", "-ac", "1", "-acodec", "pcm_s16le", "-ar", str(sample_rate),
+        "-",
+    ]
+    try:
+        out = subprocess.run(cmd, capture_output=True, check=True).stdout
+    except subprocess.CalledProcessError as e:
+        raise Exception(f"Failed to decode audio: {e.stderr.decode(errors='ignore')[-500:]}")
+    return np.frombuffer(out, np.int16).astype(np.float32) / 32768.0
@@ -0,0 +1,198 @@
+import os
+import time
+import errno
+import shutil
+import sqlite3
+import hashlib
+import logging
+import tempfile
+import threading
+from typing import Optional
+from services.paths import DATA_DIR
+
+logger = logging.getLogger(__name__)
+
+HASH_CHUNK_BYTES = 1024 * 1024
+GC_INTERVAL = 60.0
+# A blob's access time is only rewritten when it is at least this old, so hot blobs are read without a write
+ACCESS_REFRESH_SECONDS = 60.0
+
+def hash_file(path: str) -> str:
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_BYTES), b""):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+class BlobStore:
+    """
+    Content-addressed file store: each file is named by the SHA-256 of
+    its content, under <directory>/<first two hex chars>/. A SQLite index
+    next to the files records media type, size and access times, so the
+    store survives restarts and is shared by all worker processes.
+    Blobs expire after `ttl` seconds without access; the least recently
+    used ones are dropped when the total exceeds `max_bytes`.
+    """
+
+    def __init__(self, name: str, directory: str, ttl: float, max_bytes: int):
+        self.name = name
+        self.directory = directory
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._last_gc = 0.0
+        os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(os.path.join(directory, "index.db"), check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS blobs ("
+            "hash TEXT PRIMARY KEY, ext TEXT NOT NULL, media_type TEXT NOT NULL, size INTEGER NOT NULL, "
+            "created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS blobs_accessed ON blobs (accessed_at)")
+        self._conn.commit()
+
+    def _blob_path(self, blob_hash: str, ext: str) -> str:
+        return os.path.join(self.directory, blob_hash[:2], blob_hash + ext)
+
+    def put_file(self, path: str, media_type: str, move: bool = True) -> str:
+        """Adds a file to the store and returns its hash. The source is moved unless move=False."""
+        blob_hash = hash_file(path)
+        ext = os.path.splitext(path)[1].lower()
+        target = self._blob_path(blob_hash, ext)
+        if os.path.exists(target):
+            if move:
+                os.unlink(path)
+        else:
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            if not move or not self._rename(path, target):
+                # Copy beside the target and rename, so readers never see a partial file
+                fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(target), suffix=".part")
+                try:
+                    with open(path, "rb") as src, os.fdopen(fd, "wb") as dst:
+                        shutil.copyfileobj(src, dst, HASH_CHUNK_BYTES)
+                    os.replace(temp_path, target)
+                except BaseException:
+                    os.unlink(temp_path)
+                    raise
+                if move:
+                    os.unlink(path)
+        self._index(blob_hash, ext, media_type, os.path.getsize(target))
+        return blob_hash
+
+    @staticmethod
+    def _rename(path: str, target: str) -> bool:
+        """Atomic move within one filesystem; False if the source is on another one."""
+        try:
+            os.replace(path, target)
+            return True
+        except OSError as e:
+            if e.errno == errno.EXDEV:
+                return False
+            raise
+
+    def put_bytes(self, data: bytes, media_type: str, ext: str) -> str:
+        """Adds in-memory content to the store and returns its hash."""
+        blob_hash = hashlib.sha256(data).hexdigest()
+        target = self._blob_path(blob_hash, ext)
+        if not os.path.exists(target):
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            # Write beside the target and rename, so readers never see a partial file
+            fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(target), suffix=".part")
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(temp_path, target)
+        self._index(blob_hash, ext, media_type, len(data))
+        return blob_hash
+
+    def _index(self, blob_hash: str, ext: str, media_type: str, size: int):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO blobs (hash, ext, media_type, size, created_at, accessed_at) VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(hash) DO UPDATE SET accessed_at = excluded.accessed_at",
+                (blob_hash, ext, media_type, size, now, now),
+            )
+            self._conn.commit()
+        self.gc()
+
+    def get(self, blob_hash: str) -> Optional[dict]:
+        """
+        Returns {path, media_type, size, hash} for a live blob and refreshes
+        its access time, else None. Does SQLite I/O; call it from a thread
+        when on the event loop.
+        """
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT ext, media_type, size, accessed_at FROM blobs WHERE hash = ?", (blob_hash,)
+            ).fetchone()
+            if row is None:
+                return None
+            ext, media_type, size, accessed_at = row
+            path = self._blob_path(blob_hash, ext)
+            if accessed_at + self.ttl < now or not os.path.exists(path):
+                self._remove([(blob_hash, ext)])
+                self._conn.commit()
+                return None
+            if now - accessed_at >= min(ACCESS_REFRESH_SECONDS, self.ttl / 2):
+                self._conn.execute("UPDATE blobs SET accessed_at = ? WHERE hash = ?", (now, blob_hash))
+                self._conn.commit()
+        return {"hash": blob_hash, "path": path, "media_type": media_type, "size": size}
+
+    def _remove(self, victims: list):
+        for blob_hash, ext in victims:
+            try:
+                os.unlink(self._blob_path(blob_hash, ext))
+            except FileNotFoundError:
+                pass
+        self._conn.executemany("DELETE FROM blobs WHERE hash = ?", [(blob_hash,) for blob_hash, _ in victims])
+
+    def gc(self, force: bool = False):
+        """Deletes expired blobs, then least recently used ones until under max_bytes."""
+        now = time.time()
+        if not force and now - self._last_gc < GC_INTERVAL:
+            return
+        self._last_gc = now
+        with self._lock:
+            expired = self._conn.execute("SELECT hash, ext FROM blobs WHERE accessed_at < ?", (now - self.ttl,)).fetchall()
+            self._remove(expired)
+            victims = []
+            total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM blobs").fetchone()[0]
+            if total > self.max_bytes:
+                for blob_hash, ext, size in self._conn.execute("SELECT hash, ext, size FROM blobs ORDER BY accessed_at"):
+                    victims.append((blob_hash, ext))
+                    total -= size
+                    if total <= self.max_bytes:
+                        break
+                self._remove(victims)
+            self._conn.commit()
+        removed = len(expired) + len(victims)
+        if removed:
+            self.evictions += removed
+            logger.info(f"{self.name} store removed {removed} blobs ({len(expired)} expired)")
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries, total = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM blobs").fetchone()
+        return {
+            "name": self.name,
+            "entries": entries,
+            "bytes": total,
+            "max_bytes": self.max_bytes,
+            "ttl": self.ttl,
+            "evictions": self.evictions,
+            "directory": self.directory,
+        }
+
+def blob_store_from_env(name: str, prefix: str, default_ttl: float = 7 * 86400, default_max_bytes: int = 2 * 1024 * 1024 * 1024) -> BlobStore:
+    """
+    Builds a store from <PREFIX>_STORE_* environment variables:
+    DIR (default DATA_DIR/<name>), TTL (seconds since last access), MAX_BYTES.
+    """
+    directory = os.getenv(f"{prefix}_STORE_DIR", os.path.join(DATA_DIR, name))
+    ttl = float(os.getenv(f"{prefix}_STORE_TTL", str(default_ttl)))
+    max_bytes = int(os.getenv(f"{prefix}_STORE_MAX_BYTES", str(default_max_bytes)))
+    logger.info(f"{name} store at {directory} (ttl={ttl}s, max={max_bytes} bytes)")
+    return BlobStore(name, directory, ttl, max_bytes)
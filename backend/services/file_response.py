@@ -0,0 +1,78 @@
+import os
+import re
+from typing import Optional
+from fastapi.responses import FileResponse, Response, StreamingResponse
+from starlette.requests import Request
+
+RANGE_PATTERN = re.compile(r"^bytes=(\d*)-(\d*)$")
+RANGE_CHUNK_BYTES = 256 * 1024
+
+class RangeNotSatisfiable(Exception):
+    """Raised for a Range header that does not overlap the file."""
+
+def parse_range(header: str, size: int) -> Optional[tuple]:
+    """
+    Parses a single-range `bytes=` header into inclusive (start, end).
+    Returns None when the header should be ignored (malformed or multiple
+    ranges), in which case the whole file is sent.
+    """
+    match = RANGE_PATTERN.match(header.strip())
+    if not match or (not match.group(1) and not match.group(2)):
+        return None
+    first, last = match.groups()
+    if not first:
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0:
+            raise RangeNotSatisfiable()
+        return max(0, size - length), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        raise RangeNotSatisfiable()
+    return start, end
+
+def _read_range(path: str, start: int, end: int):
+    with open(path, "rb") as f:
+        f.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = f.read(min(RANGE_CHUNK_BYTES, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+def cached_file_response(request: Request, path: str, media_type: str, etag: str, filename: str = None, max_age: int = 86400) -> Response:
+    """
+    Serves an immutable file with a strong ETag, answering If-None-Match
+    with 304 and single `Range` requests with 206, so clients can seek
+    and resume.
+    """
+    size = os.path.getsize(path)
+    headers = {
+        "ETag": f'"{etag}"',
+        "Accept-Ranges": "bytes",
+        "Cache-Control": f"public, max-age={max_age}, immutable",
+    }
+    if filename:
+        headers["Content-Disposition"] = f'inline; filename="{filename}"'
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and (if_none_match.strip() == "*" or f'"{etag}"' in if_none_match):
+        return Response(status_code=304, headers=headers)
+
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if range_header and (not if_range or if_range.strip() == f'"{etag}"'):
+        try:
+            byte_range = parse_range(range_header, size)
+        except RangeNotSatisfiable:
+            return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{size}"})
+        if byte_range:
+            start, end = byte_range
+            headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+            headers["Content-Length"] = str(end - start + 1)
+            return StreamingResponse(_read_range(path, start, end), status_code=206, media_type=media_type, headers=headers)
+
+    return FileResponse(path=path, media_type=media_type, headers=headers)
@@ -1,11 +1,6 @@
 import os
 import logging
 import datetime
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from google.auth.transport.requests import Request
-from googleapiclient.discovery import build
-from googleapiclient.errors import HttpError
 from typing import List, Dict, Any
 import base64
 from email.mime.text import MIMEText
@@ -21,6 +16,11 @@ SCOPES = [
 
 def get_credentials():
     """Gets valid user credentials from storage or initiates OAuth flow."""
+    # Google client libraries are imported on first use to keep startup fast
+    from google.oauth2.credentials import Credentials
+    from google_auth_oauthlib.flow import InstalledAppFlow
+    from google.auth.transport.requests import Request
+
     creds = None
     # The file token.json stores the user's access and refresh tokens, and is
     # created automatically when the authorization flow completes for the first
@@ -47,16 +47,19 @@ def get_credentials():
 
 def get_gmail_service():
     """Builds and returns Gmail API service."""
+    from googleapiclient.discovery import build
     creds = get_credentials()
     return build('gmail', 'v1', credentials=creds)
 
 def get_calendar_service():
     """Builds and returns Calendar API service."""
+    from googleapiclient.discovery import build
     creds = get_credentials()
     return build('calendar', 'v3', credentials=creds)
 
 def read_emails(max_results: int = 10) -> List[Dict[str, Any]]:
     """Reads the latest emails from Gmail."""
+    from googleapiclient.errors import HttpError
     try:
         service = get_gmail_service()
         results = service.users().messages().list(userId='me', maxResults=max_results).execute()
@@ -95,6 +98,7 @@ def read_emails(max_results: int = 10) -> List[Dict[str, Any]]:
 
 def send_email(to: str, subject: str, body: str) -> Dict[str, Any]:
     """Sends an email via Gmail."""
+    from googleapiclient.errors import HttpError
     try:
         service = get_gmail_service()
         message = MIMEText(body)
@@ -112,6 +116,7 @@ def send_email(to: str, subject: str, body: str) -> Dict[str, Any]:
 
 def read_calendar_events(max_results: int = 10) -> List[Dict[str, Any]]:
     """Reads upcoming calendar events."""
+    from googleapiclient.errors import HttpError
     try:
         service = get_calendar_service()
         now = datetime.datetime.utcnow().isoformat() + 'Z'  # 'Z' indicates UTC time
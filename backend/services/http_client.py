@@ -0,0 +1,56 @@
+import os
+import logging
+import httpx
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+OPENROUTER_BASE_URL = os.getenv("OPENROUTER_BASE_URL", "https://openrouter.ai/api/v1")
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "10"))
+HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "120"))
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+HTTP_MAX_KEEPALIVE = int(os.getenv("HTTP_MAX_KEEPALIVE", "20"))
+HTTP2_ENABLED = os.getenv("HTTP2_ENABLED", "true").lower() == "true"
+
+# Shared client, created on first use and closed on app shutdown
+_client = None
+
+def get_http_client() -> httpx.AsyncClient:
+    """
+    Returns the app-lifetime async HTTP client.
+    Connections are kept alive and reused across requests.
+    """
+    global _client
+    if _client is None or _client.is_closed:
+        timeout = httpx.Timeout(
+            connect=HTTP_CONNECT_TIMEOUT,
+            read=HTTP_READ_TIMEOUT,
+            write=HTTP_READ_TIMEOUT,
+            pool=HTTP_CONNECT_TIMEOUT,
+        )
+        limits = httpx.Limits(
+            max_connections=HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+        )
+        _client = httpx.AsyncClient(http2=HTTP2_ENABLED, timeout=timeout, limits=limits)
+        logger.info(f"HTTP client created (http2={HTTP2_ENABLED}, connect={HTTP_CONNECT_TIMEOUT}s, read={HTTP_READ_TIMEOUT}s)")
+    return _client
+
+async def close_http_client():
+    """Closes the shared client and its pooled connections."""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+        logger.info("HTTP client closed")
+
+def openrouter_headers() -> dict:
+    """Common request headers for OpenRouter calls."""
+    return {
+        "Authorization": f"Bearer {os.getenv('OPENROUTER_API_KEY')}",
+        "Content-Type": "application/json",
+        "HTTP-Referer": "https://organaizer.service",
+        "X-Title": "OrganAIzer Service",
+    }
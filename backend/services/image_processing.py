@@ -0,0 +1,104 @@
+import io
+import os
+import math
+import base64
+import asyncio
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+IMAGE_WORKERS = int(os.getenv("IMAGE_WORKERS", "0")) or (os.cpu_count() or 1)
+IMAGE_FORMAT = os.getenv("IMAGE_FORMAT", "webp")
+IMAGE_QUALITY = int(os.getenv("IMAGE_QUALITY", "85"))
+
+# Output format -> (Pillow format, media type, modes it can store)
+FORMATS = {
+    "webp": ("WEBP", "image/webp", ("RGB", "RGBA")),
+    "jpeg": ("JPEG", "image/jpeg", ("RGB",)),
+    "png": ("PNG", "image/png", ("RGB", "RGBA")),
+}
+
+def _encode_options(fmt: str, quality: int) -> dict:
+    if fmt == "webp":
+        return {"quality": quality, "method": 3}
+    if fmt == "jpeg":
+        return {"quality": quality}
+    # optimize=True costs several full zlib passes for a few percent of size
+    return {"compress_level": 6}
+
+def _crop_box(width: int, height: int, target_ratio: float) -> tuple:
+    """Largest centered box with the target aspect ratio."""
+    if width / height > target_ratio:
+        # Image is wider than target - crop width
+        new_width = int(height * target_ratio)
+        left = (width - new_width) // 2
+        return (left, 0, left + new_width, height)
+    # Image is taller than target - crop height
+    new_height = int(width / target_ratio)
+    top = (height - new_height) // 2
+    return (0, top, width, top + new_height)
+
+def crop_and_resize(image_bytes: bytes, width: int, height: int, fmt: str = IMAGE_FORMAT, quality: int = IMAGE_QUALITY) -> tuple:
+    """
+    Center-crops an image to width:height and resizes it to exactly that
+    size. Returns (encoded bytes, media type).
+
+    Large downscales take the fast path: JPEG sources are decoded at a
+    reduced scale via draft(), and resize() first shrinks by an integer
+    factor with reduce() before the LANCZOS pass.
+    """
+    pil_format, media_type, modes = FORMATS[fmt]
+    img = Image.open(io.BytesIO(image_bytes))
+
+    if img.format == "JPEG":
+        box = _crop_box(*img.size, width / height)
+        scale = max(width / (box[2] - box[0]), height / (box[3] - box[1]))
+        if scale < 1:
+            img.draft("RGB", (math.ceil(img.size[0] * scale), math.ceil(img.size[1] * scale)))
+
+    if img.mode not in modes:
+        has_alpha = img.mode in ("RGBA", "LA", "PA") or (img.mode == "P" and "transparency" in img.info)
+        img = img.convert("RGBA" if has_alpha and "RGBA" in modes else "RGB")
+
+    box = _crop_box(*img.size, width / height)
+    resized = img.resize((width, height), Image.Resampling.LANCZOS, box=box, reducing_gap=3.0)
+
+    buffer = io.BytesIO()
+    resized.save(buffer, format=pil_format, **_encode_options(fmt, quality))
+    return buffer.getvalue(), media_type
+
+def to_data_url(data: bytes, media_type: str) -> str:
+    return f"data:{media_type};base64,{base64.b64encode(data).decode()}"
+
+executor = None
+_executor_lock = threading.Lock()
+
+def get_executor() -> ProcessPoolExecutor:
+    global executor
+    with _executor_lock:
+        if executor is None:
+            executor = ProcessPoolExecutor(max_workers=IMAGE_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+            logger.info(f"Image processing pool started: {IMAGE_WORKERS} workers")
+        return executor
+
+async def process_image(image_bytes: bytes, width: int, height: int, fmt: str = IMAGE_FORMAT, quality: int = IMAGE_QUALITY) -> tuple:
+    """Runs crop_and_resize in the process pool, off the event loop. Returns (bytes, media type)."""
+    global executor
+    try:
+        future = get_executor().submit(crop_and_resize, image_bytes, width, height, fmt, quality)
+    except BrokenProcessPool:
+        logger.error("Image processing pool is broken, restarting it")
+        executor = None
+        future = get_executor().submit(crop_and_resize, image_bytes, width, height, fmt, quality)
+    return await asyncio.wrap_future(future)
+
+def shutdown():
+    global executor
+    if executor is not None:
+        executor.shutdown(wait=False, cancel_futures=True)
+        executor = None
@@ -0,0 +1,369 @@
+import os
+import json
+import time
+import uuid
+import shutil
+import sqlite3
+import asyncio
+import logging
+import threading
+import concurrent.futures
+from contextlib import contextmanager, asynccontextmanager
+from typing import Callable, Optional
+from services.paths import DATA_DIR
+
+logger = logging.getLogger(__name__)
+
+JOBS_DB = os.getenv("JOBS_DB", os.path.join(DATA_DIR, "jobs.db"))
+JOBS_DIR = os.getenv("JOBS_DIR", os.path.join(DATA_DIR, "jobs"))
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "0.5"))
+JOB_RESULT_TTL = float(os.getenv("JOB_RESULT_TTL", str(24 * 3600)))
+JOB_RETRY_DELAY = float(os.getenv("JOB_RETRY_DELAY", "5"))
+# Runs per job (retries and runs lost with a dead worker process included) before it is failed
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "10"))
+JOB_HEARTBEAT_INTERVAL = 10.0
+# A running job whose process has not sent a heartbeat for this long is requeued
+JOB_ORPHAN_TIMEOUT = JOB_HEARTBEAT_INTERVAL * 6
+
+class JobCancelled(Exception):
+    """Raised inside a handler when its job has been cancelled."""
+
+class _Interrupted(Exception):
+    """Raised when the queue stops under a running coroutine handler."""
+
+class JobContext:
+    """Handed to job handlers for progress reporting and cancellation checks."""
+
+    def __init__(self, queue: "JobQueue", job_id: str, work_dir: str):
+        self.queue = queue
+        self.job_id = job_id
+        self.work_dir = work_dir
+        self._last_report = 0.0
+
+    def cancelled(self) -> bool:
+        return self.queue._cancel_requested(self.job_id)
+
+    def progress(self, fraction: float, message: str = None):
+        """
+        Records progress (0..1) and raises JobCancelled if the job was
+        cancelled. Calls closer than JOB_POLL_INTERVAL apart are dropped.
+        """
+        now = time.monotonic()
+        if now - self._last_report < JOB_POLL_INTERVAL:
+            return
+        self._last_report = now
+        self.queue._update(self.job_id, progress=max(0.0, min(1.0, fraction)), message=message)
+        if self.cancelled():
+            raise JobCancelled()
+
+class JobQueue:
+    """
+    Persistent job queue in SQLite, drained by worker threads.
+    Every API process runs its own workers against the same database, so
+    jobs survive restarts and are shared across uvicorn workers. Handlers
+    may be plain functions (run on the worker thread) or coroutines (run
+    on the app's event loop).
+    """
+
+    def __init__(self, db_path: str, jobs_dir: str, workers: int, max_attempts: int = JOB_MAX_ATTEMPTS):
+        self.db_path = db_path
+        self.jobs_dir = jobs_dir
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self._handlers = {}
+        self._threads = []
+        self._stop = threading.Event()
+        self._loop = None
+        self._last_cleanup = 0.0
+        self._running = set()
+        self._running_lock = threading.Lock()
+        os.makedirs(jobs_dir, exist_ok=True)
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "id TEXT PRIMARY KEY, kind TEXT NOT NULL, status TEXT NOT NULL, "
+                "params TEXT NOT NULL, result TEXT, result_file TEXT, error TEXT, "
+                "progress REAL NOT NULL DEFAULT 0, message TEXT, "
+                "cancel_requested INTEGER NOT NULL DEFAULT 0, attempts INTEGER NOT NULL DEFAULT 0, "
+                "worker_pid INTEGER, heartbeat_at REAL, run_after REAL NOT NULL, "
+                "created_at REAL NOT NULL, started_at REAL, finished_at REAL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_queue ON jobs (status, run_after, created_at)")
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def register(self, kind: str, handler: Callable, retry_on: tuple = ()):
+        """
+        Registers handler(params, context) for a job kind. Exceptions listed
+        in retry_on put the job back in the queue instead of failing it.
+        """
+        self._handlers[kind] = (handler, retry_on)
+
+    def new_job(self) -> tuple:
+        """Reserves a job ID and its working directory for inputs and results."""
+        job_id = uuid.uuid4().hex
+        work_dir = os.path.join(self.jobs_dir, job_id)
+        os.makedirs(work_dir, exist_ok=True)
+        return job_id, work_dir
+
+    @asynccontextmanager
+    async def prepare_job(self):
+        """
+        new_job() for a job whose inputs are written before submit():
+        yields (job_id, work_dir) and removes work_dir if the block raises.
+        File system work runs on a thread, off the event loop.
+        """
+        job_id, work_dir = await asyncio.to_thread(self.new_job)
+        try:
+            yield job_id, work_dir
+        except BaseException:
+            await asyncio.to_thread(shutil.rmtree, work_dir, ignore_errors=True)
+            raise
+
+    def submit(self, kind: str, params: dict, job_id: str = None) -> str:
+        if kind not in self._handlers:
+            raise ValueError(f"Unknown job kind: {kind}")
+        if job_id is None:
+            job_id, _ = self.new_job()
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, kind, status, params, run_after, created_at) VALUES (?, ?, 'queued', ?, ?, ?)",
+                (job_id, kind, json.dumps(params), now, now),
+            )
+        logger.info(f"Job {job_id} queued ({kind})")
+        return job_id
+
+    def get(self, job_id: str) -> Optional[dict]:
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = {
+            "job_id": row["id"],
+            "kind": row["kind"],
+            "status": row["status"],
+            "progress": row["progress"],
+            "message": row["message"],
+            "error": row["error"],
+            "attempts": row["attempts"],
+            "created_at": row["created_at"],
+            "started_at": row["started_at"],
+            "finished_at": row["finished_at"],
+            "has_file": bool(row["result_file"]),
+        }
+        if row["result"] is not None:
+            job["result"] = json.loads(row["result"])
+        return job
+
+    def result_file(self, job_id: str) -> Optional[str]:
+        with self._connect() as conn:
+            row = conn.execute("SELECT result_file FROM jobs WHERE id = ? AND status = 'succeeded'", (job_id,)).fetchone()
+        return row["result_file"] if row else None
+
+    def cancel(self, job_id: str) -> Optional[dict]:
+        """Cancels a queued job immediately; a running job stops at its next progress check."""
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = 'cancelled', finished_at = ?, cancel_requested = 1 WHERE id = ? AND status = 'queued'",
+                (now, job_id),
+            )
+            conn.execute("UPDATE jobs SET cancel_requested = 1 WHERE id = ? AND status = 'running'", (job_id,))
+        logger.info(f"Job {job_id} cancellation requested")
+        return self.get(job_id)
+
+    def stats(self) -> dict:
+        with self._connect() as conn:
+            rows = conn.execute("SELECT status, COUNT(*) AS count FROM jobs GROUP BY status").fetchall()
+        return {"workers": self.workers, **{row["status"]: row["count"] for row in rows}}
+
+    def start(self, loop: asyncio.AbstractEventLoop = None):
+        """Starts the worker threads; `loop` runs coroutine handlers."""
+        self._loop = loop
+        self._stop.clear()
+        self._recover_orphans()
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._worker_loop, name=f"job-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        heartbeat = threading.Thread(target=self._heartbeat_loop, name="job-heartbeat", daemon=True)
+        heartbeat.start()
+        self._threads.append(heartbeat)
+        logger.info(f"Job queue started with {self.workers} workers ({self.db_path})")
+
+    def stop(self):
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout=5)
+        self._threads = []
+
+    def _heartbeat_loop(self):
+        """Marks this process's running jobs as alive."""
+        while not self._stop.wait(JOB_HEARTBEAT_INTERVAL):
+            with self._running_lock:
+                running = list(self._running)
+            if not running:
+                continue
+            try:
+                with self._connect() as conn:
+                    conn.executemany("UPDATE jobs SET heartbeat_at = ? WHERE id = ?", [(time.time(), job_id) for job_id in running])
+            except sqlite3.Error as e:
+                logger.error(f"Job heartbeat failed: {str(e)}")
+
+    def _recover_orphans(self):
+        """
+        Requeues running jobs whose process stopped sending heartbeats (crash
+        or restart). Jobs that have used up their attempts are failed instead,
+        so a job that kills its worker is not retried forever.
+        """
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            failed = conn.execute(
+                "UPDATE jobs SET status = 'failed', worker_pid = NULL, finished_at = ?, "
+                "error = 'Worker process stopped while running the job ' || attempts || ' times' "
+                "WHERE status = 'running' AND heartbeat_at < ? AND attempts >= ?",
+                (now, now - JOB_ORPHAN_TIMEOUT, self.max_attempts),
+            ).rowcount
+            requeued = conn.execute(
+                "UPDATE jobs SET status = 'queued', worker_pid = NULL, run_after = ? "
+                "WHERE status = 'running' AND heartbeat_at < ?",
+                (now, now - JOB_ORPHAN_TIMEOUT),
+            ).rowcount
+            conn.execute("COMMIT")
+        if requeued:
+            logger.warning(f"Requeued {requeued} jobs abandoned by a dead worker process")
+        if failed:
+            logger.error(f"Failed {failed} abandoned jobs that reached {self.max_attempts} attempts")
+
+    def _claim(self) -> Optional[sqlite3.Row]:
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT * FROM jobs WHERE status = 'queued' AND run_after <= ? ORDER BY created_at LIMIT 1", (now,)
+            ).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            conn.execute(
+                "UPDATE jobs SET status = 'running', worker_pid = ?, started_at = ?, heartbeat_at = ?, attempts = attempts + 1 WHERE id = ?",
+                (os.getpid(), now, now, row["id"]),
+            )
+            conn.execute("COMMIT")
+            return row
+
+    def _update(self, job_id: str, **fields):
+        columns = ", ".join(f"{name} = ?" for name in fields)
+        with self._connect() as conn:
+            conn.execute(f"UPDATE jobs SET {columns} WHERE id = ?", (*fields.values(), job_id))
+
+    def _cancel_requested(self, job_id: str) -> bool:
+        with self._connect() as conn:
+            row = conn.execute("SELECT cancel_requested FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return bool(row and row["cancel_requested"])
+
+    def _worker_loop(self):
+        while not self._stop.is_set():
+            try:
+                row = self._claim()
+                if row is None:
+                    self._cleanup_expired()
+                    self._stop.wait(JOB_POLL_INTERVAL)
+                    continue
+                self._run(row)
+            except Exception as e:
+                logger.error(f"Job worker error: {str(e)}")
+                self._stop.wait(JOB_POLL_INTERVAL)
+
+    def _run(self, row: sqlite3.Row):
+        job_id, kind = row["id"], row["kind"]
+        handler, retry_on = self._handlers.get(kind, (None, ()))
+        if handler is None:
+            self._update(job_id, status="failed", error=f"Unknown job kind: {kind}", finished_at=time.time())
+            return
+        context = JobContext(self, job_id, os.path.join(self.jobs_dir, job_id))
+        os.makedirs(context.work_dir, exist_ok=True)
+        logger.info(f"Job {job_id} started ({kind})")
+        with self._running_lock:
+            self._running.add(job_id)
+        try:
+            if asyncio.iscoroutinefunction(handler):
+                result = self._run_coroutine(handler(json.loads(row["params"]), context), context)
+            else:
+                result = handler(json.loads(row["params"]), context)
+            result = result or {}
+            result_file = result.pop("file", None)
+            self._update(
+                job_id, status="succeeded", progress=1.0, result=json.dumps(result),
+                result_file=result_file, finished_at=time.time(),
+            )
+            logger.info(f"Job {job_id} succeeded")
+        except (JobCancelled, concurrent.futures.CancelledError):
+            self._update(job_id, status="cancelled", finished_at=time.time())
+            logger.info(f"Job {job_id} cancelled")
+        except _Interrupted:
+            # Not the job's fault, so the run does not count as an attempt
+            self._update(job_id, status="queued", worker_pid=None, run_after=time.time(), attempts=row["attempts"])
+            logger.info(f"Job {job_id} requeued on shutdown")
+        except retry_on as e:
+            attempts = row["attempts"] + 1
+            if attempts >= self.max_attempts:
+                self._update(job_id, status="failed", error=f"Gave up after {attempts} attempts: {str(e)}", finished_at=time.time())
+                logger.error(f"Job {job_id} failed after {attempts} attempts: {str(e)}")
+            else:
+                self._update(job_id, status="queued", worker_pid=None, run_after=time.time() + JOB_RETRY_DELAY, message=str(e))
+                logger.warning(f"Job {job_id} requeued: {str(e)}")
+        except Exception as e:
+            self._update(job_id, status="failed", error=str(e), finished_at=time.time())
+            logger.error(f"Job {job_id} failed: {str(e)}")
+        finally:
+            with self._running_lock:
+                self._running.discard(job_id)
+
+    def _run_coroutine(self, coroutine, context: JobContext):
+        """Runs a coroutine handler on the app loop, cancelling it if the job is cancelled."""
+        if self._loop is None:
+            return asyncio.run(coroutine)
+        future = asyncio.run_coroutine_threadsafe(coroutine, self._loop)
+        while True:
+            try:
+                return future.result(timeout=1.0)
+            except concurrent.futures.TimeoutError:
+                if self._stop.is_set():
+                    future.cancel()
+                    raise _Interrupted()
+                if context.cancelled():
+                    future.cancel()
+                    raise JobCancelled()
+
+    def _cleanup_expired(self):
+        """Requeues orphans and deletes finished jobs and their files after JOB_RESULT_TTL."""
+        now = time.time()
+        if now - self._last_cleanup < JOB_ORPHAN_TIMEOUT:
+            return
+        self._last_cleanup = now
+        self._recover_orphans()
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT id FROM jobs WHERE status IN ('succeeded', 'failed', 'cancelled') AND finished_at < ?",
+                (now - JOB_RESULT_TTL,),
+            ).fetchall()
+            for row in rows:
+                shutil.rmtree(os.path.join(self.jobs_dir, row["id"]), ignore_errors=True)
+                conn.execute("DELETE FROM jobs WHERE id = ?", (row["id"],))
+        if rows:
+            logger.info(f"Removed {len(rows)} expired jobs")
+
+job_queue = JobQueue(JOBS_DB, JOBS_DIR, JOB_WORKERS)
@@ -0,0 +1,96 @@
+import os
+import logging
+import threading
+from services.response_cache import cache_from_env, make_key
+
+logger = logging.getLogger(__name__)
+
+# langdetect (default) or fasttext (needs the fasttext package and a lid.176 model)
+LANGUAGE_DETECTOR = os.getenv("LANGUAGE_DETECTOR", "langdetect")
+FASTTEXT_MODEL = os.getenv("FASTTEXT_MODEL", "lid.176.ftz")
+# Only this many characters, taken from a few spread-out windows, are classified
+LANGUAGE_SAMPLE_CHARS = int(os.getenv("LANGUAGE_SAMPLE_CHARS", "2000"))
+LANGUAGE_SAMPLE_WINDOWS = 4
+
+# sample hash -> language code; small values, memory only
+language_cache = cache_from_env("language", "LANGUAGE", default_memory_bytes=1024 * 1024)
+
+class LangdetectDetector:
+    """langdetect with its profiles loaded up front and a fixed seed, so results are repeatable."""
+    name = "langdetect"
+
+    def __init__(self):
+        from langdetect import DetectorFactory
+        from langdetect.detector_factory import init_factory
+        DetectorFactory.seed = 0
+        init_factory()
+
+    def detect(self, text: str) -> str:
+        from langdetect import detect
+        return detect(text)
+
+class FastTextDetector:
+    """fastText language ID (lid.176): n-gram model, roughly 100x faster than langdetect."""
+    name = "fasttext"
+
+    def __init__(self, model_path: str = FASTTEXT_MODEL):
+        import fasttext
+        self.model = fasttext.load_model(model_path)
+
+    def detect(self, text: str) -> str:
+        labels, _ = self.model.predict(text.replace("\n", " "))
+        return labels[0].replace("__label__", "")
+
+DETECTORS = {"langdetect": LangdetectDetector, "fasttext": FastTextDetector}
+
+detector = None
+_load_lock = threading.Lock()
+
+def load():
+    """Loads the configured detector; called at startup, otherwise on first use."""
+    global detector
+    with _load_lock:
+        if detector is None:
+            try:
+                detector = DETECTORS[LANGUAGE_DETECTOR]()
+            except Exception as e:
+                if LANGUAGE_DETECTOR == "langdetect":
+                    raise
+                logger.error(f"Failed to load {LANGUAGE_DETECTOR} language detector, using langdetect: {str(e)}")
+                detector = LangdetectDetector()
+            logger.info(f"Language detector loaded: {detector.name}")
+    return detector
+
+def sample_text(text: str, max_chars: int = LANGUAGE_SAMPLE_CHARS, windows: int = LANGUAGE_SAMPLE_WINDOWS) -> str:
+    """
+    Short texts are returned whole. Longer ones are reduced to `windows`
+    evenly spaced slices cut at word boundaries, so a long document costs
+    the same as a paragraph and a foreign-language preamble cannot decide
+    the result on its own.
+    """
+    if len(text) <= max_chars:
+        return text
+    width = max_chars // windows
+    step = (len(text) - width) // (windows - 1)
+    parts = []
+    for i in range(windows):
+        start = i * step
+        if start:
+            space = text.find(" ", start, start + width // 4)
+            start = space + 1 if space != -1 else start
+        parts.append(text[start:start + width].rsplit(" ", 1)[0])
+    return " ".join(parts)
+
+def detect_language(text: str) -> str:
+    """Language code of text (e.g. 'en', 'zh-cn'), cached by a hash of the classified sample."""
+    sample = sample_text(text)
+    current = detector or load()
+    key = make_key(current.name, sample)
+    language = language_cache.get(key)
+    if language is None:
+        language = current.detect(sample)
+        language_cache.set(key, language)
+    return language
+
+def stats() -> dict:
+    return {"detector": detector.name if detector else None, "cache": language_cache.stats()}
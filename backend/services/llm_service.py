@@ -1,25 +1,110 @@
 import os
-import requests
+import time
+import httpx
 from dotenv import load_dotenv
+from services.http_client import get_http_client, openrouter_headers, OPENROUTER_BASE_URL
+from services.sse import parse_sse_line, chunk_delta
+from services.response_cache import cache_from_env, make_key, normalize_prompt
+from services import metrics
 
 load_dotenv()
 
 OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY")
 MODEL = os.getenv("MODEL")
 
-def get_llm_response(prompt: str, model: str = MODEL):
+# Responses keyed on (model, normalized prompt)
+llm_cache = cache_from_env("llm", "LLM")
+
+def cache_key(prompt: str, model: str) -> str:
+    return make_key(model, normalize_prompt(prompt))
+
+async def get_llm_response(prompt: str, model: str = MODEL, cache_mode: str = "default"):
+    """
+    cache_mode: "default" reads and writes the cache, "refresh" skips the
+    read but stores the new response, "bypass" leaves the cache untouched.
+    """
+    key = cache_key(prompt, model)
+    if cache_mode == "default":
+        cached = await llm_cache.aget(key)
+        if cached is not None:
+            return cached
+    start = time.perf_counter()
+    outcome = "error"
     try:
-        response = requests.post(
-            "https://openrouter.ai/api/v1/chat/completions",
-            headers={
-                "Authorization": f"Bearer {OPENROUTER_API_KEY}",
-            },
+        client = get_http_client()
+        response = await client.post(
+            f"{OPENROUTER_BASE_URL}/chat/completions",
+            headers=openrouter_headers(),
             json={
                 "model": model,
                 "messages": [{"role": "user", "content": prompt}],
             },
         )
         response.raise_for_status()
-        return response.json()["choices"][0]["message"]["content"]
-    except requests.exceptions.RequestException as e:
+        content = response.json()["choices"][0]["message"]["content"]
+        outcome = "ok"
+    except httpx.HTTPError as e:
         return f"Error: {e}"
+    finally:
+        metrics.OPENROUTER_SECONDS.labels("llm", outcome).observe(time.perf_counter() - start)
+    if content and cache_mode != "bypass":
+        await llm_cache.aset(key, content)
+    return content
+
+async def stream_llm_response(prompt: str, model: str = MODEL, cache_mode: str = "default"):
+    """
+    Streams the completion from OpenRouter.
+    Yields content deltas as they arrive; a cached response is yielded whole.
+    """
+    key = cache_key(prompt, model)
+    if cache_mode == "default":
+        cached = await llm_cache.aget(key)
+        if cached is not None:
+            yield cached
+            return
+    parts = []
+    start = time.perf_counter()
+    first_chunk = True
+    # Set by [DONE] or a finish_reason; a stream that just stops is truncated
+    completed = False
+    outcome = "error"
+    client = get_http_client()
+    try:
+        async with client.stream(
+            "POST",
+            f"{OPENROUTER_BASE_URL}/chat/completions",
+            headers=openrouter_headers(),
+            json={
+                "model": model,
+                "messages": [{"role": "user", "content": prompt}],
+                "stream": True,
+            },
+        ) as response:
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                if line.strip() == "data: [DONE]":
+                    completed = True
+                    continue
+                chunk = parse_sse_line(line)
+                if not chunk:
+                    continue
+                if first_chunk:
+                    metrics.OPENROUTER_TTFB_SECONDS.labels("llm_stream").observe(time.perf_counter() - start)
+                    first_chunk = False
+                if "error" in chunk:
+                    # Errors after the 200 arrive as a chunk in the stream
+                    error = chunk["error"]
+                    raise Exception(f"OpenRouter stream error: {error.get('message', error) if isinstance(error, dict) else error}")
+                if chunk.get("choices") and chunk["choices"][0].get("finish_reason"):
+                    completed = True
+                content = chunk_delta(chunk).get("content")
+                if content:
+                    parts.append(content)
+                    yield content
+        outcome = "ok"
+    finally:
+        # Client disconnects end up here as "error" too
+        metrics.OPENROUTER_SECONDS.labels("llm_stream", outcome).observe(time.perf_counter() - start)
+    # Only complete, non-empty completions are stored
+    if completed and parts and cache_mode != "bypass":
+        await llm_cache.aset(key, "".join(parts))
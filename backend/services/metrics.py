@@ -0,0 +1,93 @@
+import os
+import atexit
+import shutil
+import tempfile
+import multiprocessing
+
+# Parent of the per-boot metrics directories
+METRICS_ROOT_DIR = os.getenv("METRICS_ROOT_DIR", os.path.join(tempfile.gettempdir(), "organaizer_metrics"))
+
+def _start_time(pid: int) -> str:
+    """Process start time in clock ticks since boot, so a reused pid is told apart; "" if unknown."""
+    try:
+        with open(f"/proc/{pid}/stat") as stat:
+            # Field 22; the command name (field 2) may contain spaces, so count from its closing paren
+            return stat.read().rsplit(")", 1)[1].split()[19]
+    except (OSError, IndexError):
+        return ""
+
+def _boot_name(pid: int) -> str:
+    return f"{pid}-{_start_time(pid)}"
+
+def _boot_dir() -> str:
+    """
+    Metrics directory for this server run, named after its root process:
+    the uvicorn master for `--workers` workers (spawned via multiprocessing),
+    otherwise this process. Directories left by runs whose root process is
+    gone are removed, so a restart never merges samples or live gauges of
+    dead processes.
+    """
+    parent = multiprocessing.parent_process()
+    root_pid = parent.pid if parent is not None else os.getpid()
+    current = _boot_name(root_pid)
+    os.makedirs(METRICS_ROOT_DIR, exist_ok=True)
+    for name in os.listdir(METRICS_ROOT_DIR):
+        pid = name.split("-", 1)[0]
+        if name != current and pid.isdigit() and name != _boot_name(int(pid)):
+            shutil.rmtree(os.path.join(METRICS_ROOT_DIR, name), ignore_errors=True)
+    return os.path.join(METRICS_ROOT_DIR, current)
+
+# prometheus_client runs in multiprocess mode: each process (uvicorn workers
+# and their Whisper/TTS pool workers) writes samples to its own files in this
+# directory and /metrics merges them. It must be set before prometheus_client
+# is imported. Pool workers inherit it through the environment; an explicit
+# PROMETHEUS_MULTIPROC_DIR is used as is and must be emptied by whoever sets it.
+if "PROMETHEUS_MULTIPROC_DIR" not in os.environ:
+    os.environ["PROMETHEUS_MULTIPROC_DIR"] = _boot_dir()
+METRICS_DIR = os.environ["PROMETHEUS_MULTIPROC_DIR"]
+os.makedirs(METRICS_DIR, exist_ok=True)
+
+from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram, generate_latest, CONTENT_TYPE_LATEST
+from prometheus_client import multiprocess
+
+# Requests range from cache hits to multi-minute transcriptions
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+HTTP_REQUESTS = Counter("http_requests_total", "HTTP requests", ["method", "route", "status"])
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds", "Time from request start to the end of the response body",
+    ["method", "route", "status"], buckets=DURATION_BUCKETS,
+)
+HTTP_IN_FLIGHT = Gauge("http_requests_in_flight", "Requests being served", multiprocess_mode="livesum")
+
+WHISPER_QUEUE_DEPTH = Gauge("whisper_queue_depth", "Transcriptions submitted and not finished", multiprocess_mode="livesum")
+WHISPER_INFERENCE_SECONDS = Histogram(
+    "whisper_inference_seconds", "Whisper model.transcribe time per call (one chunk for long-form)", buckets=DURATION_BUCKETS,
+)
+
+TTS_SYNTHESIS_SECONDS = Histogram("tts_synthesis_seconds", "Synthesis time per text chunk", ["engine"], buckets=DURATION_BUCKETS)
+
+OPENROUTER_TTFB_SECONDS = Histogram(
+    "openrouter_ttfb_seconds", "Time to the first streamed chunk from OpenRouter", ["operation"], buckets=DURATION_BUCKETS,
+)
+OPENROUTER_SECONDS = Histogram(
+    "openrouter_request_seconds", "Total OpenRouter request time", ["operation", "outcome"], buckets=DURATION_BUCKETS,
+)
+
+YTDLP_DOWNLOAD_BYTES = Counter("ytdlp_download_bytes_total", "Bytes downloaded by yt-dlp", ["kind"])
+YTDLP_DOWNLOAD_SECONDS = Histogram("ytdlp_download_seconds", "yt-dlp download time", ["kind", "outcome"], buckets=DURATION_BUCKETS)
+
+CACHE_LOOKUPS = Counter("cache_lookups_total", "Response cache lookups by result (memory, disk or miss)", ["cache", "result"])
+
+RATE_LIMITED = Counter("rate_limited_requests_total", "Requests rejected with 429 by the per-key limiter", ["route_class", "reason"])
+
+def render() -> tuple:
+    """(body, content type) with the samples of every live and exited process merged."""
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+@atexit.register
+def _mark_process_dead():
+    # Drops this process's live gauges (in-flight, queue depth) from the merged view
+    multiprocess.mark_process_dead(os.getpid())
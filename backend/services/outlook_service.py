@@ -1,15 +1,6 @@
 import os
 import logging
-from msgraph import GraphServiceClient
-from azure.identity import DeviceCodeCredential, ClientSecretCredential
-from msgraph.generated.models.message import Message
-from msgraph.generated.models.item_body import ItemBody
-from msgraph.generated.models.body_type import BodyType
-from msgraph.generated.models.recipient import Recipient
-from msgraph.generated.models.email_address import EmailAddress
-from msgraph.generated.users.item.send_mail.send_mail_post_request_body import SendMailPostRequestBody
 from typing import List, Dict, Any
-import asyncio
 
 logger = logging.getLogger(__name__)
 
@@ -41,9 +32,10 @@ def get_graph_client():
     if not client_id or not tenant_id:
         raise Exception("AZURE_CLIENT_ID and AZURE_TENANT_ID environment variables must be set")
 
+    # The Graph SDK takes seconds to import, so it is loaded on first use
+    from msgraph import GraphServiceClient
     # Use persistent cache for token storage
     from azure.identity import DeviceCodeCredential
-    import atexit
     from msal import SerializableTokenCache
     import json
 
@@ -124,6 +116,12 @@ async def read_emails(max_results: int = 10) -> List[Dict[str, Any]]:
 
 async def send_email(to: str, subject: str, body: str) -> Dict[str, Any]:
     """Sends an email via Outlook."""
+    from msgraph.generated.models.message import Message
+    from msgraph.generated.models.item_body import ItemBody
+    from msgraph.generated.models.body_type import BodyType
+    from msgraph.generated.models.recipient import Recipient
+    from msgraph.generated.models.email_address import EmailAddress
+    from msgraph.generated.users.item.send_mail.send_mail_post_request_body import SendMailPostRequestBody
     try:
         client = get_graph_client()
 
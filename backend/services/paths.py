@@ -0,0 +1,4 @@
+import os
+
+# Root for persistent service data (caches, stores, queues); mounted with the backend in Docker
+DATA_DIR = os.getenv("DATA_DIR", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data"))
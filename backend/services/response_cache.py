@@ -0,0 +1,317 @@
+import os
+import json
+import asyncio
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Optional
+from services import metrics
+
+logger = logging.getLogger(__name__)
+
+def make_key(*parts) -> str:
+    """Content-addressed cache key: SHA-256 over the JSON-encoded parts."""
+    payload = json.dumps(parts, sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+def normalize_prompt(prompt: str) -> str:
+    """Collapses whitespace so trivially different prompts share a key."""
+    return ' '.join(prompt.split())
+
+class MemoryCache:
+    """In-process LRU tier bounded by total value size in bytes."""
+
+    def __init__(self, max_bytes: int, ttl: float):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (value, size, expires_at)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, size, expires_at = entry
+            if expires_at < time.time():
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: str, expires_at: float = None):
+        size = len(value.encode('utf-8'))
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, size, expires_at or time.time() + self.ttl)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def delete(self, key: str):
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def _remove(self, key: str):
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self._bytes, "max_bytes": self.max_bytes, "evictions": self.evictions}
+
+class SQLiteCache:
+    """On-disk tier shared by all worker processes on the host."""
+
+    def __init__(self, path: str, max_bytes: int, ttl: float):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.evictions = 0
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("BEGIN IMMEDIATE")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, "
+            "expires_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed_at)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS entries_expires ON entries (expires_at)")
+        # Running totals kept by triggers, so eviction never has to SUM(size) the table;
+        # they live in the database because every worker process writes to it
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS totals ("
+            "id INTEGER PRIMARY KEY CHECK (id = 0), entries INTEGER NOT NULL, bytes INTEGER NOT NULL)"
+        )
+        self._conn.execute(
+            "INSERT OR IGNORE INTO totals (id, entries, bytes) "
+            "SELECT 0, COUNT(*), COALESCE(SUM(size), 0) FROM entries"
+        )
+        self._conn.execute(
+            "CREATE TRIGGER IF NOT EXISTS entries_insert AFTER INSERT ON entries BEGIN "
+            "UPDATE totals SET entries = entries + 1, bytes = bytes + NEW.size WHERE id = 0; END"
+        )
+        self._conn.execute(
+            "CREATE TRIGGER IF NOT EXISTS entries_update AFTER UPDATE OF size ON entries BEGIN "
+            "UPDATE totals SET bytes = bytes + NEW.size - OLD.size WHERE id = 0; END"
+        )
+        self._conn.execute(
+            "CREATE TRIGGER IF NOT EXISTS entries_delete AFTER DELETE ON entries BEGIN "
+            "UPDATE totals SET entries = entries - 1, bytes = bytes - OLD.size WHERE id = 0; END"
+        )
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[tuple]:
+        """Returns (value, expires_at) or None."""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT value, expires_at FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            if row[1] < now:
+                self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                self._conn.commit()
+                return None
+            self._conn.execute("UPDATE entries SET accessed_at = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            return row[0], row[1]
+
+    def set(self, key: str, value: str):
+        now = time.time()
+        size = len(value.encode('utf-8'))
+        with self._lock:
+            # An upsert rather than INSERT OR REPLACE, whose implicit delete skips the triggers
+            self._conn.execute(
+                "INSERT INTO entries (key, value, size, expires_at, accessed_at) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (key) DO UPDATE SET value = excluded.value, size = excluded.size, "
+                "expires_at = excluded.expires_at, accessed_at = excluded.accessed_at",
+                (key, value, size, now + self.ttl, now),
+            )
+            self._evict(now)
+            self._conn.commit()
+
+    def delete(self, key: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+            self._conn.commit()
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM entries")
+            self._conn.commit()
+
+    def _evict(self, now: float):
+        """Drops expired entries, then least recently used ones until under budget."""
+        self.evictions += self._conn.execute("DELETE FROM entries WHERE expires_at < ?", (now,)).rowcount
+        total = self._conn.execute("SELECT bytes FROM totals WHERE id = 0").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        freed = 0
+        victims = []
+        for key, size in self._conn.execute("SELECT key, size FROM entries ORDER BY accessed_at"):
+            victims.append((key,))
+            freed += size
+            if total - freed <= self.max_bytes:
+                break
+        self._conn.executemany("DELETE FROM entries WHERE key = ?", victims)
+        self.evictions += len(victims)
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries, total = self._conn.execute("SELECT entries, bytes FROM totals WHERE id = 0").fetchone()
+        return {"entries": entries, "bytes": total, "max_bytes": self.max_bytes, "evictions": self.evictions, "path": self.path}
+
+class ResponseCache:
+    """
+    Two-tier cache for JSON-serializable values.
+    Reads go memory first, then disk; disk hits are promoted to memory.
+    """
+
+    def __init__(self, name: str, memory: MemoryCache = None, disk: SQLiteCache = None):
+        self.name = name
+        self.memory = memory
+        self.disk = disk
+        self.hits = 0
+        self.misses = 0
+        self.memory_hits = 0
+        self.disk_hits = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.memory is not None or self.disk is not None
+
+    def get(self, key: str) -> Optional[Any]:
+        if not self.enabled:
+            return None
+        hit = self._get_memory(key)
+        if hit is None and self.disk:
+            hit = self._get_disk(key)
+        return self._record(hit)
+
+    async def aget(self, key: str) -> Optional[Any]:
+        """get() for coroutines: the disk tier is read on a worker thread, off the event loop."""
+        if not self.enabled:
+            return None
+        hit = self._get_memory(key)
+        if hit is None and self.disk:
+            hit = await asyncio.to_thread(self._get_disk, key)
+        return self._record(hit)
+
+    def set(self, key: str, value: Any):
+        if not self.enabled:
+            return
+        encoded = self._set_memory(key, value)
+        if self.disk:
+            self._set_disk(key, encoded)
+
+    async def aset(self, key: str, value: Any):
+        """set() for coroutines: the disk tier is written on a worker thread, off the event loop."""
+        if not self.enabled:
+            return
+        encoded = self._set_memory(key, value)
+        if self.disk:
+            await asyncio.to_thread(self._set_disk, key, encoded)
+
+    def _get_memory(self, key: str) -> Optional[tuple]:
+        value = self.memory.get(key) if self.memory else None
+        return ("memory", value) if value is not None else None
+
+    def _get_disk(self, key: str) -> Optional[tuple]:
+        row = self.disk.get(key)
+        if row is None:
+            return None
+        value, expires_at = row
+        if self.memory:
+            self.memory.set(key, value, expires_at)
+        return "disk", value
+
+    def _record(self, hit: Optional[tuple]) -> Optional[Any]:
+        """Counts a lookup by the tier that answered it and decodes the value."""
+        if hit is None:
+            self.misses += 1
+            metrics.CACHE_LOOKUPS.labels(self.name, "miss").inc()
+            return None
+        tier, value = hit
+        self.hits += 1
+        if tier == "memory":
+            self.memory_hits += 1
+        else:
+            self.disk_hits += 1
+        metrics.CACHE_LOOKUPS.labels(self.name, tier).inc()
+        return json.loads(value)
+
+    def _set_memory(self, key: str, value: Any) -> str:
+        encoded = json.dumps(value, ensure_ascii=False)
+        if self.memory:
+            self.memory.set(key, encoded)
+        return encoded
+
+    def _set_disk(self, key: str, encoded: str):
+        try:
+            self.disk.set(key, encoded)
+        except sqlite3.Error as e:
+            logger.error(f"{self.name} cache write failed: {str(e)}")
+
+    def delete(self, key: str):
+        if self.memory:
+            self.memory.delete(key)
+        if self.disk:
+            self.disk.delete(key)
+
+    def clear(self):
+        if self.memory:
+            self.memory.clear()
+        if self.disk:
+            self.disk.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "name": self.name,
+            "enabled": self.enabled,
+            "hits": self.hits,
+            "misses": self.misses,
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "memory": self.memory.stats() if self.memory else None,
+            "disk": self.disk.stats() if self.disk else None,
+        }
+
+def cache_from_env(name: str, prefix: str, default_ttl: float = 86400, default_memory_bytes: int = 64 * 1024 * 1024, default_db: str = None) -> ResponseCache:
+    """
+    Builds a cache from <PREFIX>_CACHE_* environment variables:
+    ENABLED, TTL (seconds), MEMORY_BYTES, DB (SQLite path, enables the disk tier), DISK_BYTES.
+    """
+    if os.getenv(f"{prefix}_CACHE_ENABLED", "true").lower() != "true":
+        logger.info(f"{name} cache disabled")
+        return ResponseCache(name)
+    ttl = float(os.getenv(f"{prefix}_CACHE_TTL", str(default_ttl)))
+    memory_bytes = int(os.getenv(f"{prefix}_CACHE_MEMORY_BYTES", str(default_memory_bytes)))
+    memory = MemoryCache(memory_bytes, ttl) if memory_bytes > 0 else None
+    disk = None
+    db_path = os.getenv(f"{prefix}_CACHE_DB", default_db or "")
+    if db_path:
+        disk_bytes = int(os.getenv(f"{prefix}_CACHE_DISK_BYTES", str(1024 * 1024 * 1024)))
+        disk = SQLiteCache(db_path, disk_bytes, ttl)
+    logger.info(f"{name} cache enabled (ttl={ttl}s, memory={memory_bytes} bytes, disk={db_path or 'off'})")
+    return ResponseCache(name, memory, disk)
@@ -0,0 +1,136 @@
+import io
+import os
+import re
+from urllib.parse import urlparse
+from markdown_it import MarkdownIt
+from markdown_it.common.utils import normalizeReference
+
+# What to do with fenced/indented code blocks: skip, announce ("Code block.") or read
+TTS_CODE_BLOCKS = os.getenv("TTS_CODE_BLOCKS", "skip")
+# How to speak URLs (autolinks and bare URLs; link text is always read): domain, skip or read
+TTS_URLS = os.getenv("TTS_URLS", "domain")
+
+BARE_URL = re.compile(r'\b(?:https?://|www\.)[^\s<>()]+[^\s<>().,;:!?\'"]')
+REFERENCE_DEFINITION = re.compile(r'^ {0,3}\[((?:[^\]\\\n]|\\.){1,999})\]:', re.MULTILINE)
+FENCE = re.compile(r' {0,3}(`{3,}|~{3,})')
+SENTENCE_PUNCTUATION = ".!?:;…。！？"
+# Documents are parsed in sections of about this size, split at safe blank lines
+SECTION_CHARS = 32 * 1024
+
+parser = MarkdownIt("commonmark").enable(["table", "strikethrough"])
+
+def speak_url(url: str, policy: str) -> str:
+    if policy == "read":
+        return url
+    if policy == "domain":
+        host = urlparse(url if "://" in url else f"http://{url}").hostname or ""
+        return host[4:] if host.startswith("www.") else host
+    return ""
+
+def _inline_text(children: list, url_policy: str) -> str:
+    parts = []
+    in_autolink = False
+    for token in children:
+        if token.type in ("text", "text_special"):
+            if in_autolink:
+                parts.append(speak_url(token.content, url_policy))
+            else:
+                parts.append(BARE_URL.sub(lambda match: speak_url(match.group(0), url_policy), token.content))
+        elif token.type == "code_inline":
+            parts.append(token.content)
+        elif token.type == "image":
+            parts.append(token.content)  # Alt text
+        elif token.type in ("softbreak", "hardbreak"):
+            parts.append(" ")
+        elif token.type == "link_open":
+            in_autolink = token.markup == "autolink"
+        elif token.type == "link_close":
+            in_autolink = False
+    return "".join(parts)
+
+def _sections(text_md: str, target_chars: int = SECTION_CHARS):
+    """
+    Yields the document in pieces that parse the same on their own: a cut
+    is only made before an unindented line that follows a blank line,
+    outside fenced code and HTML comments. Newlines are normalized on the way.
+    """
+    section = []
+    size = 0
+    fence = None
+    in_comment = False
+    previous_blank = False
+    for line in io.StringIO(text_md, newline=None):
+        if size >= target_chars and previous_blank and not fence and not in_comment and line[:1] not in (" ", "\t", "\n"):
+            yield "".join(section)
+            section = []
+            size = 0
+        section.append(line)
+        size += len(line)
+        previous_blank = not line.strip()
+
+        match = FENCE.match(line)
+        if fence:
+            if match and match.group(1).startswith(fence):
+                fence = None
+        elif match:
+            fence = match.group(1)
+        elif in_comment:
+            # Still open unless this line closes it (and does not open another one)
+            in_comment = "-->" not in line or line.rfind("<!--") > line.rfind("-->")
+        elif "<!--" in line:
+            in_comment = line.rfind("<!--") > line.rfind("-->")
+    if section:
+        yield "".join(section)
+
+def _references(text_md: str) -> dict:
+    """
+    Collects reference link labels up front, so [text][label] resolves in
+    every section. Only the label matters for speech, not the target.
+    """
+    return {
+        normalizeReference(match.group(1)): {"title": "", "href": "", "map": None}
+        for match in REFERENCE_DEFINITION.finditer(text_md)
+    }
+
+def _end_sentence(text: str) -> str:
+    """Adds a period to blocks like headings and list items, so TTS pauses after them."""
+    return text if text[-1] in SENTENCE_PUNCTUATION else text + "."
+
+def _speak_blocks(tokens: list, env: dict, blocks: list, code_policy: str, url_policy: str):
+    for token in tokens:
+        if token.type == "inline":
+            children = []
+            parser.inline.parse(token.content, parser, env, children)
+            text = " ".join(_inline_text(children, url_policy).split())
+        elif token.type in ("fence", "code_block"):
+            if code_policy == "read":
+                text = " ".join(token.content.split())
+            elif code_policy == "announce":
+                text = "Code block."
+            else:
+                continue
+        else:
+            # Raw HTML blocks (including script and style bodies) are not spoken
+            continue
+        if text:
+            blocks.append(_end_sentence(text))
+
+def markdown_to_speech(text_md: str, code_policy: str = TTS_CODE_BLOCKS, url_policy: str = TTS_URLS) -> str:
+    """
+    Converts markdown to speech-ready plain text in one walk over the
+    markdown-it token stream: entities come out decoded, raw HTML is
+    dropped, every block ends in punctuation, and code blocks and URLs
+    follow the given policies.
+
+    The document is block-parsed in sections (see _sections), and each
+    block's inline tokens are parsed when it is reached and dropped right
+    after. Whitespace is collapsed per block, so memory stays close to
+    the size of the output instead of a token tree for the whole input.
+    """
+    env = {"references": _references(text_md)}
+    blocks = []
+    for section in _sections(text_md):
+        tokens = []
+        parser.block.parse(section.replace("\0", "\ufffd"), parser, env, tokens)
+        _speak_blocks(tokens, env, blocks, code_policy, url_policy)
+    return " ".join(blocks)
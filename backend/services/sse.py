@@ -0,0 +1,31 @@
+import json
+from typing import Optional, Union
+
+def parse_sse_line(line: Union[str, bytes]) -> Optional[dict]:
+    """
+    Parses one line of an OpenAI-style Server-Sent Events stream.
+    Returns the decoded JSON chunk, or None for blank lines, comments,
+    the [DONE] marker and malformed payloads.
+    """
+    if isinstance(line, bytes):
+        line = line.decode('utf-8')
+    if not line.startswith('data: '):
+        return None
+    data_str = line[6:]
+    if data_str == '[DONE]':
+        return None
+    try:
+        return json.loads(data_str)
+    except json.JSONDecodeError:
+        return None
+
+def chunk_delta(chunk: dict) -> dict:
+    """Returns the delta of the first choice of a streamed chunk."""
+    if chunk.get("choices"):
+        return chunk["choices"][0].get("delta", {})
+    return {}
+
+def format_sse_event(data: dict, event: str = None) -> str:
+    """Serializes a payload as an SSE event for a StreamingResponse."""
+    message = f"event: {event}\n" if event else ""
+    return message + f"data: {json.dumps(data)}\n\n"
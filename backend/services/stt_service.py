@@ -1,81 +1,427 @@
-import whisper
-import requests
 import tempfile
 import os
+import hashlib
+import asyncio
 import logging
+import threading
+import multiprocessing
+from collections import Counter
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor, Future
+from concurrent.futures.process import BrokenProcessPool
+from services.audio_io import load_audio, SAMPLE_RATE
+from services.audio_chunking import split_on_silence
+from services.response_cache import cache_from_env, make_key
+from services.paths import DATA_DIR
+from services.upload_service import UPLOAD_CHUNK_BYTES
+from services import metrics
+import numpy as np
 
 logger = logging.getLogger(__name__)
 
-# Load Whisper model (will be loaded on first use)
+WHISPER_MODEL = os.getenv("WHISPER_MODEL", "base")  # Use base model for speed
+WHISPER_THREADS_PER_WORKER = int(os.getenv("WHISPER_THREADS_PER_WORKER", "2"))
+WHISPER_WORKERS = int(os.getenv("WHISPER_WORKERS", "0")) or max(1, (os.cpu_count() or 1) // WHISPER_THREADS_PER_WORKER)
+WHISPER_MAX_QUEUE = int(os.getenv("WHISPER_MAX_QUEUE", "16"))
+WHISPER_PRELOAD = os.getenv("WHISPER_PRELOAD", "true").lower() == "true"
+LONG_FORM_CHUNK_SECONDS = float(os.getenv("LONG_FORM_CHUNK_SECONDS", "60"))
+STREAM_CHUNK_SECONDS = float(os.getenv("STREAM_CHUNK_SECONDS", "30"))
+
+# Finished transcripts, persisted on disk and shared by all workers
+transcript_cache = cache_from_env(
+    "transcript", "TRANSCRIPT",
+    default_ttl=30 * 86400,
+    default_memory_bytes=16 * 1024 * 1024,
+    default_db=os.path.join(DATA_DIR, "transcript_cache.db"),
+)
+
+class QueueFullError(Exception):
+    """Raised when the transcription queue is at capacity."""
+
+# Whisper model of the current worker process (loaded by the pool initializer)
 model = None
 
-def get_whisper_model():
-    """Lazy load Whisper model"""
+def _init_worker(model_name: str, threads: int):
+    """Loads one model replica per worker process."""
     global model
-    if model is None:
-        logger.info("Loading Whisper model (this may take a moment on first use)...")
-        model = whisper.load_model("base")  # Use base model for speed
-        logger.info("Whisper model loaded successfully")
-    return model
+    import torch
+    import whisper
+    torch.set_num_threads(threads)
+    logger.info(f"Loading Whisper model '{model_name}' in worker {os.getpid()}...")
+    model = whisper.load_model(model_name)
+    logger.info(f"Whisper model loaded in worker {os.getpid()}")
+
+def _worker_ready() -> int:
+    return os.getpid()
+
+def format_segments(segments) -> list:
+    """Formats Whisper segments for the API response."""
+    formatted = []
+    for segment in segments:
+        formatted.append({
+            "start": segment.get('start', 0),
+            "end": segment.get('end', 0),
+            "text": segment.get('text', '').strip()
+        })
+    return formatted
+
+def _transcribe_in_worker(audio, options: dict = None) -> dict:
+    """Runs inside a worker process. `audio` is a file path or a 16 kHz float32 array."""
+    with metrics.WHISPER_INFERENCE_SECONDS.time():
+        result = model.transcribe(audio, **(options or {}))
+    return {
+        "text": result['text'].strip(),
+        "language": result.get('language', 'unknown'),
+        "segments": format_segments(result.get('segments', []))
+    }
+
+class TranscriptionEngine:
+    """
+    Bounded process pool with one Whisper replica per worker.
+    At most `workers + max_queue` transcriptions are accepted at a time;
+    further submissions raise QueueFullError.
+    """
+
+    def __init__(self, model_name: str, workers: int, max_queue: int, threads_per_worker: int = 1):
+        self.model_name = model_name
+        self.workers = workers
+        self.max_queue = max_queue
+        self.threads_per_worker = threads_per_worker
+        self._executor = None
+        self._pending = 0
+        self._lock = threading.Lock()
+        # Background warm-up and requests may create the pool concurrently
+        self._executor_lock = threading.Lock()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._executor_lock:
+            if self._executor is None:
+                # spawn keeps torch state out of the forked children
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker,
+                    initargs=(self.model_name, self.threads_per_worker),
+                )
+                logger.info(f"Transcription pool started: {self.workers} workers, model '{self.model_name}'")
+            return self._executor
+
+    @property
+    def capacity(self) -> int:
+        return self.workers + self.max_queue
+
+    @property
+    def queue_depth(self) -> int:
+        """Submitted transcriptions that are not finished yet."""
+        return self._pending
+
+    def release(self, _future=None):
+        with self._lock:
+            self._pending -= 1
+            metrics.WHISPER_QUEUE_DEPTH.set(self._pending)
+
+    def check_capacity(self):
+        """Raises QueueFullError if no queue slot is free right now, without taking one."""
+        if self._pending >= self.capacity:
+            raise QueueFullError(f"Transcription queue is full ({self._pending} pending)")
+
+    def acquire(self):
+        """Takes one queue slot or raises QueueFullError."""
+        with self._lock:
+            if self._pending >= self.capacity:
+                raise QueueFullError(f"Transcription queue is full ({self._pending} pending)")
+            self._pending += 1
+            metrics.WHISPER_QUEUE_DEPTH.set(self._pending)
+
+    @contextmanager
+    def reserve(self):
+        """Holds one queue slot for a request that fans out into several tasks."""
+        self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
+
+    def submit_unbounded(self, fn, *args) -> Future:
+        """Submits to the pool without queue accounting; callers must hold a reservation."""
+        executor = self._get_executor()
+        try:
+            return executor.submit(fn, *args)
+        except BrokenProcessPool:
+            # A worker died (e.g. OOM); start a fresh pool unless another thread already has
+            logger.error("Transcription pool is broken, restarting it")
+            with self._executor_lock:
+                if self._executor is executor:
+                    self._executor = None
+            return self._get_executor().submit(fn, *args)
+
+    def submit(self, fn, *args) -> Future:
+        self.acquire()
+        try:
+            future = self.submit_unbounded(fn, *args)
+        except Exception:
+            self.release()
+            raise
+        future.add_done_callback(self.release)
+        return future
+
+    async def run(self, fn, *args):
+        """Awaits a pool task without blocking the event loop."""
+        return await asyncio.wrap_future(self.submit(fn, *args))
+
+    def warm_up(self) -> list:
+        """Starts every worker so the models load before the first request."""
+        executor = self._get_executor()
+        return [executor.submit(_worker_ready) for _ in range(self.workers)]
+
+    def shutdown(self):
+        with self._executor_lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> dict:
+        return {
+            "model": self.model_name,
+            "workers": self.workers,
+            "queue_depth": self.queue_depth,
+            "capacity": self.capacity,
+        }
+
+engine = TranscriptionEngine(WHISPER_MODEL, WHISPER_WORKERS, WHISPER_MAX_QUEUE, WHISPER_THREADS_PER_WORKER)
+
+FALLBACK_PREFIX = "Whisper transcription failed"
+
+def is_fallback_result(result: dict) -> bool:
+    return result["text"].startswith(FALLBACK_PREFIX)
+
+def _fallback_result(audio_path: str, error: Exception) -> dict:
+    """Fallback to basic file info if Whisper fails."""
+    try:
+        file_size = os.path.getsize(audio_path) if os.path.exists(audio_path) else 0
+        file_ext = os.path.splitext(audio_path)[1].lower()
+        return _fallback_text_result(f"{FALLBACK_PREFIX}: {str(error)}. Audio file info: {file_ext}, {file_size} bytes.")
+    except:
+        raise Exception(f"Failed to transcribe audio: {str(error)}")
+
+def _fallback_text_result(fallback_text: str) -> dict:
+    return {
+        "text": fallback_text,
+        "language": "unknown",
+        "segments": []
+    }
+
+def fallback_for_pcm(audio, error: Exception) -> dict:
+    """Fallback for audio that was decoded in memory rather than read from a file."""
+    return _fallback_text_result(f"{FALLBACK_PREFIX}: {str(error)}. Audio info: {len(audio) / SAMPLE_RATE:.1f}s of decoded PCM.")
+
+def audio_cache_key(audio, mode: str) -> str:
+    """Transcript cache key: SHA-256 of the decoded PCM plus model and mode."""
+    digest = hashlib.sha256(np.ascontiguousarray(audio).data).hexdigest()
+    return make_key("audio", digest, WHISPER_MODEL, mode)
+
+def video_cache_key(video_id: str) -> str:
+    """Transcript cache key for a canonical video ID (e.g. youtube:<id>)."""
+    return make_key("video", video_id, WHISPER_MODEL, "standard")
+
+def transcribe_pcm(audio) -> dict:
+    """
+    Transcribes decoded 16 kHz mono PCM through the transcript cache.
+    Blocks the calling thread; raises on failure.
+    """
+    key = audio_cache_key(audio, "standard")
+    cached = transcript_cache.get(key)
+    if cached is not None:
+        logger.info("Transcript cache hit")
+        return cached
+    result = engine.submit(_transcribe_in_worker, audio).result()
+    logger.info(f"Whisper transcription completed - Language: {result['language']}, Text length: {len(result['text'])}")
+    transcript_cache.set(key, result)
+    return result
 
 def transcribe_audio(audio_path: str) -> dict:
     """
     Transcribes audio file using OpenAI Whisper.
     Returns transcription with text, language, and segments.
+    Blocks the calling thread; use transcribe_audio_async from the event loop.
     """
+    logger.info(f"Starting Whisper transcription for: {audio_path}")
     try:
-        logger.info(f"Starting Whisper transcription for: {audio_path}")
-
-        # Get Whisper model
-        whisper_model = get_whisper_model()
-
-        # Transcribe audio
-        result = whisper_model.transcribe(audio_path)
+        return transcribe_pcm(load_audio(audio_path))
+    except QueueFullError:
+        raise
+    except Exception as e:
+        logger.error(f"Whisper transcription failed: {str(e)}")
+        return _fallback_result(audio_path, e)
 
+async def transcribe_audio_async(audio_path: str) -> dict:
+    """
+    Transcribes audio file in the worker pool without blocking the event loop.
+    The queue slot is taken before the file is decoded, so waiting requests
+    do not each hold their PCM. Raises QueueFullError when the pool is saturated.
+    """
+    logger.info(f"Starting Whisper transcription for: {audio_path}")
+    try:
+        with engine.reserve():
+            audio = await asyncio.to_thread(load_audio, audio_path)
+            key = audio_cache_key(audio, "standard")
+            cached = await transcript_cache.aget(key)
+            if cached is not None:
+                logger.info("Transcript cache hit")
+                return cached
+            result = await asyncio.wrap_future(engine.submit_unbounded(_transcribe_in_worker, audio))
         logger.info(f"Whisper transcription completed - Language: {result['language']}, Text length: {len(result['text'])}")
+        await transcript_cache.aset(key, result)
+        return result
+    except QueueFullError:
+        raise
+    except Exception as e:
+        logger.error(f"Whisper transcription failed: {str(e)}")
+        return _fallback_result(audio_path, e)
 
-        # Format segments for response
-        segments = []
-        for segment in result.get('segments', []):
+def stitch_chunk_results(results: list, offsets: list) -> dict:
+    """
+    Merges per-chunk transcriptions into one result.
+    Segment timestamps are shifted by each chunk's start offset in seconds;
+    the language is the one detected for the most speech.
+    """
+    text_parts = []
+    segments = []
+    language_weight = Counter()
+    for result, offset in zip(results, offsets):
+        if result["text"]:
+            text_parts.append(result["text"])
+        for segment in result["segments"]:
             segments.append({
-                "start": segment.get('start', 0),
-                "end": segment.get('end', 0),
-                "text": segment.get('text', '').strip()
+                "start": round(segment["start"] + offset, 3),
+                "end": round(segment["end"] + offset, 3),
+                "text": segment["text"]
             })
+        language_weight[result["language"]] += len(result["text"])
+    language = language_weight.most_common(1)[0][0] if language_weight else "unknown"
+    return {
+        "text": " ".join(text_parts),
+        "language": language,
+        "segments": segments
+    }
 
-        return {
-            "text": result['text'].strip(),
-            "language": result.get('language', 'unknown'),
-            "segments": segments
-        }
+def _split_chunks(audio, chunk_seconds: float) -> list:
+    return split_on_silence(audio, target_seconds=chunk_seconds, max_seconds=chunk_seconds * 1.5, min_seconds=chunk_seconds / 3)
+
+def _schedule_chunks(audio, chunks: list) -> list:
+    """Starts one task per chunk, keeping at most one chunk per worker in flight."""
+    semaphore = asyncio.Semaphore(engine.workers)
 
+    async def transcribe_chunk(start: int, end: int) -> dict:
+        async with semaphore:
+            return await asyncio.wrap_future(engine.submit_unbounded(_transcribe_in_worker, audio[start:end]))
+
+    return [asyncio.ensure_future(transcribe_chunk(start, end)) for start, end in chunks]
+
+async def transcribe_array_chunked(audio, chunk_seconds: float = LONG_FORM_CHUNK_SECONDS) -> dict:
+    """
+    Splits decoded audio on silence and transcribes the chunks in parallel
+    across the worker pool. Holds a single queue slot for the whole request.
+    """
+    with engine.reserve():
+        return await _transcribe_chunks(audio, chunk_seconds)
+
+async def _transcribe_chunks(audio, chunk_seconds: float) -> dict:
+    """transcribe_array_chunked for callers that already hold a queue slot."""
+    chunks = _split_chunks(audio, chunk_seconds)
+    logger.info(f"Long-form transcription: {len(audio) / SAMPLE_RATE:.1f}s of audio in {len(chunks)} chunks")
+    results = await asyncio.gather(*_schedule_chunks(audio, chunks))
+    return stitch_chunk_results(results, [start / SAMPLE_RATE for start, _ in chunks])
+
+async def transcribe_long_audio_async(audio_path: str) -> dict:
+    """
+    Long-form mode for transcribe_audio_async: decodes once, splits on
+    silence and transcribes the chunks in parallel. Like the standard mode
+    it decodes only once it holds a queue slot.
+    Raises QueueFullError when the pool is saturated.
+    """
+    logger.info(f"Starting long-form Whisper transcription for: {audio_path}")
+    try:
+        with engine.reserve():
+            audio = await asyncio.to_thread(load_audio, audio_path)
+            key = audio_cache_key(audio, f"chunked-{LONG_FORM_CHUNK_SECONDS}")
+            cached = await transcript_cache.aget(key)
+            if cached is not None:
+                logger.info("Transcript cache hit")
+                return cached
+            result = await _transcribe_chunks(audio, LONG_FORM_CHUNK_SECONDS)
+        logger.info(f"Whisper transcription completed - Language: {result['language']}, Text length: {len(result['text'])}")
+        await transcript_cache.aset(key, result)
+        return result
+    except QueueFullError:
+        raise
     except Exception as e:
         logger.error(f"Whisper transcription failed: {str(e)}")
-        # Fallback to basic file info if Whisper fails
-        try:
-            file_size = os.path.getsize(audio_path) if os.path.exists(audio_path) else 0
-            file_ext = os.path.splitext(audio_path)[1].lower()
-            fallback_text = f"Whisper transcription failed: {str(e)}. Audio file info: {file_ext}, {file_size} bytes."
-
-            return {
-                "text": fallback_text,
-                "language": "unknown",
-                "segments": []
-            }
-        except:
-            raise Exception(f"Failed to transcribe audio: {str(e)}")
+        return _fallback_result(audio_path, e)
+
+def stream_transcription(audio_path: str, chunk_seconds: float = STREAM_CHUNK_SECONDS):
+    """
+    Returns an async generator of transcription events for audio_path:
+    {"type": "segment", "start", "end", "text"} for each segment as soon as
+    its chunk is decoded, then {"type": "done", "language", "text"}.
+    A full queue raises QueueFullError here rather than mid-stream. The
+    slot itself is taken when iteration starts and released in the
+    generator's finally, so a stream that never starts holds nothing.
+    """
+    engine.check_capacity()
+    return _segment_stream(audio_path, chunk_seconds)
+
+async def _segment_stream(audio_path: str, chunk_seconds: float):
+    engine.acquire()
+    tasks = []
+    try:
+        logger.info(f"Starting streaming Whisper transcription for: {audio_path}")
+        audio = await asyncio.to_thread(load_audio, audio_path)
+        key = audio_cache_key(audio, f"chunked-{chunk_seconds}")
+        cached = await transcript_cache.aget(key)
+        if cached is not None:
+            logger.info("Transcript cache hit")
+            for segment in cached["segments"]:
+                yield {"type": "segment", **segment}
+            yield {"type": "done", "language": cached["language"], "text": cached["text"]}
+            return
+        chunks = _split_chunks(audio, chunk_seconds)
+        tasks = _schedule_chunks(audio, chunks)
+        results = []
+        for (start, _), task in zip(chunks, tasks):
+            result = await task
+            results.append(result)
+            offset = start / SAMPLE_RATE
+            for segment in result["segments"]:
+                yield {
+                    "type": "segment",
+                    "start": round(segment["start"] + offset, 3),
+                    "end": round(segment["end"] + offset, 3),
+                    "text": segment["text"]
+                }
+        summary = stitch_chunk_results(results, [start / SAMPLE_RATE for start, _ in chunks])
+        logger.info(f"Whisper transcription completed - Language: {summary['language']}, Text length: {len(summary['text'])}")
+        await transcript_cache.aset(key, summary)
+        yield {"type": "done", "language": summary["language"], "text": summary["text"]}
+    finally:
+        # Client went away or a chunk failed: drop the chunks that have not started
+        for task in tasks:
+            task.cancel()
+        engine.release()
 
 def download_audio_from_url(url: str) -> str:
     """
     Downloads audio from URL and returns temp file path.
     """
+    import requests
     try:
-        response = requests.get(url)
-        response.raise_for_status()
-        
-        temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.mp3')
-        temp_file.write(response.content)
-        temp_file.close()
+        with requests.get(url, stream=True, timeout=(10, 300)) as response:
+            response.raise_for_status()
+            
+            # Stream to disk so large files never sit in memory
+            with tempfile.NamedTemporaryFile(delete=False, suffix='.mp3') as temp_file:
+                for chunk in response.iter_content(chunk_size=UPLOAD_CHUNK_BYTES):
+                    temp_file.write(chunk)
         
         logger.info(f"Downloaded audio from URL: {url}")
         return temp_file.name
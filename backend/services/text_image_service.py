@@ -1,9 +1,12 @@
 import logging
 import os
+import time
 import base64
+import asyncio
 from typing import List, Dict
+from urllib.parse import unquote_to_bytes
 from dotenv import load_dotenv
-from PIL import Image, ImageDraw, ImageFont
+from fastapi.concurrency import run_in_threadpool
 import io
 
 # Load environment variables
@@ -11,8 +14,20 @@ load_dotenv()
 
 logger = logging.getLogger(__name__)
 
-import requests
-import json
+from services.sse import parse_sse_line, chunk_delta
+from services.http_client import get_http_client, openrouter_headers, OPENROUTER_BASE_URL
+from services.image_processing import crop_and_resize, process_image, to_data_url, IMAGE_FORMAT, IMAGE_QUALITY, FORMATS
+from services.blob_store import blob_store_from_env
+from services import metrics
+
+IMAGE_MODEL = os.getenv("IMAGE_MODEL", "google/gemini-2.5-flash-image-preview")
+IMAGE_FETCH_TIMEOUT = float(os.getenv("IMAGE_FETCH_TIMEOUT", "30"))
+# How generated images are returned: "url" (stored, served from /api/text-image/images) or "inline" (data URLs)
+IMAGE_DELIVERY = os.getenv("IMAGE_DELIVERY", "url")
+DELIVERY_MODES = ("url", "inline")
+IMAGE_EXTENSIONS = {"image/webp": ".webp", "image/jpeg": ".jpg", "image/png": ".png"}
+
+image_store = blob_store_from_env("images", "IMAGE")
 
 # Aspect ratio configurations
 ASPECT_RATIOS = {
@@ -23,10 +38,11 @@ ASPECT_RATIOS = {
     "tall": {"width": 1024, "height": 1792, "description": "tall 9:16 aspect ratio, mobile/story format"}
 }
 
-def generate_images(prompt: str, options: dict = None) -> List[Dict[str, str]]:
+async def generate_images(prompt: str, options: dict = None) -> List[Dict[str, str]]:
     """
     Generates images from text prompt (and optional image) using OpenRouter API with fallback.
-    Returns list of image dicts with url and id.
+    Returns list of image dicts with url and id. The url points at the
+    image store unless options["delivery"] is "inline" (data URLs).
     """
     try:
         logger.info(f"Generating images for prompt: {prompt}")
@@ -34,6 +50,16 @@ def generate_images(prompt: str, options: dict = None) -> List[Dict[str, str]]:
         # Extract options
         uploaded_images = options.get("uploaded_images") if options else None
         aspect_ratio = options.get("aspect_ratio", "square") if options else "square"
+        output_format = (options.get("output_format") if options else None) or IMAGE_FORMAT
+        if output_format not in FORMATS:
+            output_format = IMAGE_FORMAT
+        try:
+            quality = max(1, min(100, int(options.get("quality") or IMAGE_QUALITY)))
+        except (AttributeError, TypeError, ValueError):
+            quality = IMAGE_QUALITY
+        delivery = (options.get("delivery") if options else None) or IMAGE_DELIVERY
+        if delivery not in DELIVERY_MODES:
+            delivery = IMAGE_DELIVERY
         
         # Get aspect ratio config
         ratio_config = ASPECT_RATIOS.get(aspect_ratio, ASPECT_RATIOS["square"])
@@ -43,39 +69,91 @@ def generate_images(prompt: str, options: dict = None) -> List[Dict[str, str]]:
         enhanced_prompt = f"{prompt}\n\nIMPORTANT: Generate this image in {ratio_config['description']}. The image dimensions should be approximately {ratio_config['width']}x{ratio_config['height']} pixels."
         
         # Try OpenRouter first
-        result = generate_with_openrouter(enhanced_prompt, uploaded_images, ratio_config)
+        result = await generate_with_openrouter(enhanced_prompt, uploaded_images, ratio_config, output_format, quality, delivery)
         if result:
             return result
 
         # Fallback: programmatic images
         logger.warning("OpenRouter API failed, using programmatic fallback")
-        return create_fallback_images(prompt, ratio_config)
+        return await run_in_threadpool(create_fallback_images, prompt, ratio_config, delivery)
 
     except Exception as e:
         logger.error(f"Image generation failed: {str(e)}")
-        return create_fallback_images(prompt, ASPECT_RATIOS.get("square"))
+        return await run_in_threadpool(create_fallback_images, prompt, ASPECT_RATIOS.get("square"), IMAGE_DELIVERY)
+
+def deliver_image(data: bytes, media_type: str, delivery: str = IMAGE_DELIVERY) -> str:
+    """
+    URL for an encoded image: a data URL for inline delivery, otherwise
+    the image is written to image_store and served by hash.
+    """
+    if delivery == "inline":
+        return to_data_url(data, media_type)
+    image_id = image_store.put_bytes(data, media_type, IMAGE_EXTENSIONS.get(media_type, ""))
+    return f"/api/text-image/images/{image_id}"
+
+def decode_data_url(url: str) -> bytes:
+    """Returns the payload of a data: URL (base64 or percent-encoded)."""
+    header, _, data = url.partition(",")
+    if header.endswith(";base64"):
+        return base64.b64decode(data)
+    return unquote_to_bytes(data)
+
+async def fetch_image(url: str) -> bytes:
+    """Image bytes for a generated image URL; inline data: URLs are decoded without a request."""
+    if url.startswith("data:"):
+        return decode_data_url(url)
+    client = get_http_client()
+    response = await client.get(url, timeout=IMAGE_FETCH_TIMEOUT)
+    response.raise_for_status()
+    return response.content
+
+async def prepare_image(img_url: str, index: int, prompt: str, ratio_config: dict, output_format: str = IMAGE_FORMAT, quality: int = IMAGE_QUALITY, delivery: str = IMAGE_DELIVERY) -> Dict[str, str]:
+    """
+    Fetches, crops and delivers one generated image. If that fails, the
+    unprocessed image is used: a data: URL is stored as-is in url mode
+    (raising if it cannot be), any other URL is returned directly.
+    """
+    image = {"id": f"openrouter_img_{index}_{hash(prompt)}", "description": prompt}
+    try:
+        image_bytes = await fetch_image(img_url)
+        # Resize/crop to desired aspect ratio
+        data, media_type = await process_image_async(image_bytes, ratio_config, output_format, quality)
+        image["url"] = await run_in_threadpool(deliver_image, data, media_type, delivery)
+        image["media_type"] = media_type
+        logger.debug(f"Successfully extracted and processed image {index} from stream")
+    except Exception as fetch_error:
+        logger.error(f"Failed to fetch generated image: {fetch_error}")
+        if delivery == "inline" or not img_url.startswith("data:"):
+            # Fallback: use the URL directly
+            image["url"] = img_url
+        else:
+            # A data: URL can be megabytes; url mode must not inline it
+            media_type = img_url[5:].partition(",")[0].split(";")[0]
+            if media_type not in IMAGE_EXTENSIONS:
+                raise ValueError(f"Unsupported generated image type: {media_type}")
+            image["url"] = await run_in_threadpool(deliver_image, decode_data_url(img_url), media_type, delivery)
+            image["media_type"] = media_type
+    return image
 
-def generate_with_openrouter(prompt: str, uploaded_images: List[Dict] = None, ratio_config: dict = None) -> List[Dict[str, str]]:
+async def generate_with_openrouter(prompt: str, uploaded_images: List[Dict] = None, ratio_config: dict = None, output_format: str = IMAGE_FORMAT, quality: int = IMAGE_QUALITY, delivery: str = IMAGE_DELIVERY) -> List[Dict[str, str]]:
     """
     Generate images using OpenRouter API with Gemini 2.5 Flash Image Preview.
     Supports text-to-image and image-to-image editing.
+    The SSE stream is read on the shared async client, and each image is
+    fetched and processed concurrently as soon as its URL arrives.
     Returns list of image dicts or None if failed.
     """
+    tasks = []
+    start = None
+    first_chunk = True
+    finished = False
     try:
         api_key = os.getenv('OPENROUTER_API_KEY')
         if not api_key:
             logger.warning("OPENROUTER_API_KEY not found")
             return None
 
-        logger.info("Attempting image generation with OpenRouter (Gemini 2.5 Flash Image Preview)...")
-        
-        url = "https://openrouter.ai/api/v1/chat/completions"
-        headers = {
-            "Authorization": f"Bearer {api_key}",
-            "Content-Type": "application/json",
-            "HTTP-Referer": "https://organaizer.service",
-            "X-Title": "OrganAIzer Service"
-        }
+        logger.info(f"Attempting image generation with OpenRouter ({IMAGE_MODEL})...")
         
         # Construct messages payload
         content = [{"type": "text", "text": prompt}]
@@ -106,7 +184,7 @@ def generate_with_openrouter(prompt: str, uploaded_images: List[Dict] = None, ra
             logger.info(f"Included {len(uploaded_images)} uploaded images in request")
 
         payload = {
-            "model": "google/gemini-2.5-flash-image-preview",
+            "model": IMAGE_MODEL,
             "messages": [
                 {
                     "role": "user",
@@ -118,138 +196,105 @@ def generate_with_openrouter(prompt: str, uploaded_images: List[Dict] = None, ra
         }
         
         # Make the streaming request
-        response = requests.post(url, headers=headers, json=payload, stream=True)
-        response.raise_for_status()
-        
-        images = []
-        
-        # Process the streaming response
-        for line in response.iter_lines():
-            if line:
-                line = line.decode('utf-8')
-                if line.startswith('data: '):
-                    data_str = line[6:]
-                    if data_str != '[DONE]':
-                        try:
-                            chunk = json.loads(data_str)
-                            if chunk.get("choices"):
-                                delta = chunk["choices"][0].get("delta", {})
-                                if delta.get("images"):
-                                    for image_item in delta["images"]:
-                                        if "image_url" in image_item and "url" in image_item["image_url"]:
-                                            img_url = image_item["image_url"]["url"]
-                                            
-                                            # Process the image URL (download and convert to base64)
-                                            try:
-                                                img_response = requests.get(img_url, timeout=30)
-                                                if img_response.status_code == 200:
-                                                    # Resize/crop to desired aspect ratio
-                                                    processed_img = process_image_aspect_ratio(img_response.content, ratio_config)
-                                                    images.append({
-                                                        "url": processed_img,
-                                                        "id": f"openrouter_img_{len(images)}_{hash(prompt)}",
-                                                        "description": prompt
-                                                    })
-                                                    logger.info(f"Successfully extracted and processed image from stream")
-                                            except Exception as fetch_error:
-                                                logger.error(f"Failed to fetch generated image: {fetch_error}")
-                                                # Fallback: use the URL directly
-                                                images.append({
-                                                    "url": img_url,
-                                                    "id": f"openrouter_img_{len(images)}_{hash(prompt)}",
-                                                    "description": prompt
-                                                })
-                        except json.JSONDecodeError:
-                            continue
+        client = get_http_client()
+        start = time.perf_counter()
+        async with client.stream(
+            "POST",
+            f"{OPENROUTER_BASE_URL}/chat/completions",
+            headers=openrouter_headers(),
+            json=payload,
+        ) as response:
+            response.raise_for_status()
+
+            # Process the streaming response
+            async for line in response.aiter_lines():
+                chunk = parse_sse_line(line)
+                if not chunk:
+                    continue
+                if first_chunk:
+                    metrics.OPENROUTER_TTFB_SECONDS.labels("image").observe(time.perf_counter() - start)
+                    first_chunk = False
+                delta = chunk_delta(chunk)
+                for image_item in delta.get("images") or []:
+                    if "image_url" in image_item and "url" in image_item["image_url"]:
+                        img_url = image_item["image_url"]["url"]
+                        # Start fetching while the rest of the stream arrives
+                        tasks.append(asyncio.create_task(prepare_image(img_url, len(tasks), prompt, ratio_config, output_format, quality, delivery)))
+        finished = True
+        metrics.OPENROUTER_SECONDS.labels("image", "ok").observe(time.perf_counter() - start)
         
+        images = await asyncio.gather(*tasks)
         if images:
             logger.info(f"Successfully generated {len(images)} images using OpenRouter")
-            return images
+            return list(images)
             
         logger.warning("No images found in the OpenRouter response stream")
         return None
 
     except Exception as e:
         logger.error(f"OpenRouter generation error: {str(e)}")
+        if start is not None and not finished:
+            metrics.OPENROUTER_SECONDS.labels("image", "error").observe(time.perf_counter() - start)
         return None
+    finally:
+        # Only unfinished fetches are affected (error or client disconnect)
+        for task in tasks:
+            task.cancel()
 
 
-def process_image_aspect_ratio(image_bytes: bytes, ratio_config: dict) -> str:
+def process_image_aspect_ratio(image_bytes: bytes, ratio_config: dict, output_format: str = IMAGE_FORMAT, quality: int = IMAGE_QUALITY) -> str:
     """
     Process an image to match the desired aspect ratio.
     Uses center crop to maintain the most important parts of the image.
-    Returns base64 data URL.
+    Runs in the calling thread; the request path uses process_image_async.
+    Returns data URL.
     """
     try:
         if ratio_config is None:
             ratio_config = ASPECT_RATIOS["square"]
-            
-        # Open the image
-        img = Image.open(io.BytesIO(image_bytes))
-        original_width, original_height = img.size
-        
-        # Calculate target dimensions
-        target_width = ratio_config["width"]
-        target_height = ratio_config["height"]
-        target_ratio = target_width / target_height
-        original_ratio = original_width / original_height
-        
-        logger.info(f"Processing image: {original_width}x{original_height} -> {target_width}x{target_height}")
-        
-        # Determine crop dimensions to match target aspect ratio
-        if original_ratio > target_ratio:
-            # Image is wider than target - crop width
-            new_width = int(original_height * target_ratio)
-            new_height = original_height
-            left = (original_width - new_width) // 2
-            top = 0
-        else:
-            # Image is taller than target - crop height
-            new_width = original_width
-            new_height = int(original_width / target_ratio)
-            left = 0
-            top = (original_height - new_height) // 2
-        
-        # Crop to aspect ratio
-        right = left + new_width
-        bottom = top + new_height
-        img_cropped = img.crop((left, top, right, bottom))
-        
-        # Resize to target dimensions
-        img_resized = img_cropped.resize((target_width, target_height), Image.Resampling.LANCZOS)
-        
-        # Convert to base64
-        buffer = io.BytesIO()
-        img_resized.save(buffer, format='PNG', optimize=True)
-        img_b64 = base64.b64encode(buffer.getvalue()).decode()
-        
-        logger.info(f"Image processed successfully to {target_width}x{target_height}")
-        return f"data:image/png;base64,{img_b64}"
-        
+        data, media_type = crop_and_resize(image_bytes, ratio_config["width"], ratio_config["height"], output_format, quality)
+        return to_data_url(data, media_type)
     except Exception as e:
         logger.error(f"Failed to process image aspect ratio: {str(e)}")
         # Return original image as fallback
-        img_b64 = base64.b64encode(image_bytes).decode()
-        return f"data:image/png;base64,{img_b64}"
+        return to_data_url(image_bytes, "image/png")
 
+async def process_image_async(image_bytes: bytes, ratio_config: dict, output_format: str = IMAGE_FORMAT, quality: int = IMAGE_QUALITY) -> tuple:
+    """
+    Crops and resizes on the image process pool.
+    Returns (encoded bytes, media type).
+    """
+    try:
+        if ratio_config is None:
+            ratio_config = ASPECT_RATIOS["square"]
+        data, media_type = await process_image(image_bytes, ratio_config["width"], ratio_config["height"], output_format, quality)
+        logger.debug(f"Image processed to {ratio_config['width']}x{ratio_config['height']} {output_format} ({len(data)} bytes)")
+        return data, media_type
+    except Exception as e:
+        logger.error(f"Failed to process image aspect ratio: {str(e)}")
+        # Return original image as fallback
+        return image_bytes, "image/png"
 
-def create_fallback_images(prompt: str, ratio_config: dict = None) -> List[Dict[str, str]]:
+
+def create_fallback_images(prompt: str, ratio_config: dict = None, delivery: str = IMAGE_DELIVERY) -> List[Dict[str, str]]:
     """Creates fallback images when API fails"""
     if ratio_config is None:
         ratio_config = ASPECT_RATIOS["square"]
     images = []
     for i in range(2):
-        image_url = create_simple_fallback_image(i + 1, prompt, ratio_config)
+        image_data = create_simple_fallback_image(i + 1, prompt, ratio_config)
         images.append({
-            "url": image_url,
+            "url": deliver_image(image_data, "image/png", delivery),
+            "media_type": "image/png",
             "id": f"fallback_img_{i + 1}",
             "description": f"Fallback image generated for prompt: {prompt}"
         })
     return images
 
 
-def create_simple_fallback_image(image_number: int, prompt: str, ratio_config: dict = None) -> str:
-    """Creates a simple colored image as fallback"""
+def create_simple_fallback_image(image_number: int, prompt: str, ratio_config: dict = None) -> bytes:
+    """Creates a simple colored image as fallback. Returns PNG bytes."""
+    from PIL import Image, ImageDraw, ImageFont
     try:
         if ratio_config is None:
             ratio_config = ASPECT_RATIOS["square"]
@@ -319,14 +364,11 @@ def create_simple_fallback_image(image_number: int, prompt: str, ratio_config: d
         draw.rectangle([x-10, y-5, x+text_width+10, y+text_height+5], fill='white')
         draw.text((x, y), prompt_text, fill='black', font=font)
 
-        # Convert to base64 data URL
         buffer = io.BytesIO()
         image.save(buffer, format='PNG')
-        image_data = base64.b64encode(buffer.getvalue()).decode()
-
-        return f"data:image/png;base64,{image_data}"
+        return buffer.getvalue()
 
     except Exception as e:
         logger.error(f"Failed to create fallback image: {str(e)}")
-        # Return a data URL for a 1x1 transparent pixel as last resort
-        return "data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mNkYPhfDwAChwGA60e6kgAAAABJRU5ErkJggg=="
+        # Return a 1x1 transparent pixel as last resort
+        return base64.b64decode("iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mNkYPhfDwAChwGA60e6kgAAAABJRU5ErkJggg==")
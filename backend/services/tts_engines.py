@@ -0,0 +1,260 @@
+import io
+import os
+import shutil
+import logging
+import subprocess
+import threading
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, Future
+from concurrent.futures.process import BrokenProcessPool
+from services.paths import DATA_DIR
+from services import metrics
+
+logger = logging.getLogger(__name__)
+
+TTS_ENGINE = os.getenv("TTS_ENGINE", "gtts")
+TTS_PARALLEL_CHUNKS = int(os.getenv("TTS_PARALLEL_CHUNKS", "4"))
+TTS_SYNTHESIS_THREADS = int(os.getenv("TTS_SYNTHESIS_THREADS", "16"))
+
+# Local engine: Piper voices (lang=model name, files in PIPER_VOICE_DIR) with espeak-ng for other languages
+LOCAL_TTS_WORKERS = int(os.getenv("LOCAL_TTS_WORKERS", "0")) or max(1, (os.cpu_count() or 1) // 2)
+LOCAL_TTS_BITRATE = os.getenv("LOCAL_TTS_BITRATE", "64k")
+PIPER_VOICE_DIR = os.getenv("PIPER_VOICE_DIR", os.path.join(DATA_DIR, "piper_voices"))
+PIPER_VOICES = dict(
+    entry.split("=", 1) for entry in os.getenv("PIPER_VOICES", "").split(",") if "=" in entry
+)
+ESPEAK_BINARY = os.getenv("ESPEAK_BINARY", "espeak-ng")
+
+# Map detected language to gTTS supported language
+# gTTS supports many languages, but we need to map them properly
+LANG_MAP = {
+    'en': 'en',
+    'es': 'es',
+    'fr': 'fr',
+    'de': 'de',
+    'it': 'it',
+    'pt': 'pt',
+    'ru': 'ru',
+    'ja': 'ja',
+    'ko': 'ko',
+    'zh': 'zh-cn',
+    'ar': 'ar',
+    'hi': 'hi',
+    'nl': 'nl'
+}
+
+class TTSEngine:
+    """
+    Synthesizes one text chunk to MP3 bytes. Engines run chunks on their
+    own pool; `parallel` is how many chunks of one document may be in
+    flight at once.
+    """
+    name = ""
+    parallel = 1
+
+    def language(self, detected: str) -> str:
+        """Engine language code for a detected language."""
+        raise NotImplementedError
+
+    def voice(self, lang: str) -> dict:
+        """Voice settings for lang; part of the cache key."""
+        raise NotImplementedError
+
+    def submit(self, text: str, lang: str) -> Future:
+        raise NotImplementedError
+
+    def warm_up(self):
+        pass
+
+    def shutdown(self):
+        pass
+
+    def stats(self) -> dict:
+        return {"engine": self.name, "parallel": self.parallel}
+
+def _gtts_synthesize(text: str, lang: str, options: dict) -> bytes:
+    from gtts import gTTS
+    buffer = io.BytesIO()
+    with metrics.TTS_SYNTHESIS_SECONDS.labels("gtts").time():
+        gTTS(text=text, lang=lang, **options).write_to_fp(buffer)
+    return buffer.getvalue()
+
+class GTTSEngine(TTSEngine):
+    """Google Translate TTS; network-bound, so chunks run on a thread pool."""
+    name = "gtts"
+
+    # gTTS voice settings; part of the cache key
+    VOICE_OPTIONS = {"slow": False}
+
+    def __init__(self, threads: int = TTS_SYNTHESIS_THREADS, parallel: int = TTS_PARALLEL_CHUNKS):
+        self.threads = threads
+        self.parallel = parallel
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def language(self, detected: str) -> str:
+        # Default to English if language not supported
+        return LANG_MAP.get(detected[:2], 'en')
+
+    def voice(self, lang: str) -> dict:
+        return self.VOICE_OPTIONS
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.threads, thread_name_prefix="gtts")
+            return self._executor
+
+    def submit(self, text: str, lang: str) -> Future:
+        return self._get_executor().submit(_gtts_synthesize, text, lang, self.VOICE_OPTIONS)
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+# Piper voices loaded in the current local TTS worker process
+voices = {}
+
+def _init_local_worker(voice_dir: str, voice_names: dict):
+    """Loads every configured Piper voice once per worker process."""
+    for lang in voice_names:
+        try:
+            _piper_voice(lang, voice_dir, voice_names)
+        except Exception as e:
+            logger.error(f"Failed to load Piper voice for '{lang}': {str(e)}")
+
+def _local_worker_ready() -> int:
+    return os.getpid()
+
+def _piper_voice(lang: str, voice_dir: str, voice_names: dict):
+    if lang not in voices:
+        from piper.voice import PiperVoice
+        model_path = os.path.join(voice_dir, f"{voice_names[lang]}.onnx")
+        logger.info(f"Loading Piper voice {model_path} in worker {os.getpid()}")
+        voices[lang] = PiperVoice.load(model_path)
+    return voices[lang]
+
+def _encode_mp3(pcm_or_wav: bytes, input_args: list, bitrate: str) -> bytes:
+    """Encodes raw PCM or WAV from memory to MP3 without ID3/Xing headers, so chunks concatenate cleanly."""
+    cmd = [
+        "ffmpeg", "-nostdin", "-hide_banner", "-loglevel", "error", *input_args, "-i", "-",
+        "-f", "mp3", "-b:a", bitrate, "-id3v2_version", "0", "-write_xing", "0", "-",
+    ]
+    try:
+        return subprocess.run(cmd, input=pcm_or_wav, capture_output=True, check=True).stdout
+    except subprocess.CalledProcessError as e:
+        raise Exception(f"Failed to encode speech: {e.stderr.decode(errors='ignore')[-500:]}")
+
+def _local_synthesize(text: str, lang: str, voice_dir: str, voice_names: dict, bitrate: str) -> bytes:
+    with metrics.TTS_SYNTHESIS_SECONDS.labels("local").time():
+        return _local_synthesize_mp3(text, lang, voice_dir, voice_names, bitrate)
+
+def _local_synthesize_mp3(text: str, lang: str, voice_dir: str, voice_names: dict, bitrate: str) -> bytes:
+    if lang in voice_names:
+        voice = _piper_voice(lang, voice_dir, voice_names)
+        if hasattr(voice, "synthesize_stream_raw"):
+            pcm = b"".join(voice.synthesize_stream_raw(text))
+        else:
+            pcm = b"".join(chunk.audio_int16_bytes for chunk in voice.synthesize(text))
+        sample_rate = voice.config.sample_rate
+        return _encode_mp3(pcm, ["-f", "s16le", "-ar", str(sample_rate), "-ac", "1"], bitrate)
+
+    try:
+        # Text goes in on stdin, never as an argument, so a chunk starting with "-" is not parsed as an option
+        wav = subprocess.run([ESPEAK_BINARY, "-v", lang, "--stdout"], input=text.encode("utf-8"), capture_output=True, check=True).stdout
+    except subprocess.CalledProcessError as e:
+        raise Exception(f"Failed to synthesize speech with {ESPEAK_BINARY}: {e.stderr.decode(errors='ignore')[-500:]}")
+    return _encode_mp3(wav, ["-f", "wav"], bitrate)
+
+class LocalTTSEngine(TTSEngine):
+    """
+    Offline CPU synthesis in a process pool. Languages with a Piper voice
+    in PIPER_VOICES use Piper, whose models stay loaded in every worker;
+    everything else goes through espeak-ng.
+    """
+    name = "local"
+
+    def __init__(self, workers: int = LOCAL_TTS_WORKERS, voice_dir: str = PIPER_VOICE_DIR, voice_names: dict = None, bitrate: str = LOCAL_TTS_BITRATE):
+        self.workers = workers
+        self.parallel = workers
+        self.voice_dir = voice_dir
+        self.voice_names = PIPER_VOICES if voice_names is None else voice_names
+        self.bitrate = bitrate
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_local_worker,
+                    initargs=(self.voice_dir, self.voice_names),
+                )
+                logger.info(f"Local TTS pool started: {self.workers} workers, Piper voices {sorted(self.voice_names) or 'none'}")
+            return self._executor
+
+    def language(self, detected: str) -> str:
+        return detected[:2] or 'en'
+
+    def voice(self, lang: str) -> dict:
+        if lang in self.voice_names:
+            return {"piper": self.voice_names[lang], "bitrate": self.bitrate}
+        return {"espeak": lang, "bitrate": self.bitrate}
+
+    def submit(self, text: str, lang: str) -> Future:
+        args = (_local_synthesize, text, lang, self.voice_dir, self.voice_names, self.bitrate)
+        executor = self._get_executor()
+        try:
+            return executor.submit(*args)
+        except BrokenProcessPool:
+            logger.error("Local TTS pool is broken, restarting it")
+            with self._lock:
+                if self._executor is executor:
+                    self._executor = None
+            return self._get_executor().submit(*args)
+
+    def warm_up(self) -> list:
+        """Starts every worker so the voices load before the first request."""
+        executor = self._get_executor()
+        return [executor.submit(_local_worker_ready) for _ in range(self.workers)]
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> dict:
+        return {
+            **super().stats(),
+            "workers": self.workers,
+            "piper_voices": self.voice_names,
+            "espeak": shutil.which(ESPEAK_BINARY) is not None,
+        }
+
+ENGINE_TYPES = {"gtts": GTTSEngine, "local": LocalTTSEngine}
+engines = {}
+# Engines are created from threadpool and job worker threads; a second
+# LocalTTSEngine would start a process pool that is never shut down
+engines_lock = threading.Lock()
+
+def get_engine(name: str = None) -> TTSEngine:
+    """Returns the shared engine `name` (default TTS_ENGINE), creating it on first use."""
+    name = name or TTS_ENGINE
+    if name not in ENGINE_TYPES:
+        raise ValueError(f"Unknown TTS engine: {name}")
+    engine = engines.get(name)
+    if engine is None:
+        with engines_lock:
+            engine = engines.get(name)
+            if engine is None:
+                engine = engines[name] = ENGINE_TYPES[name]()
+    return engine
+
+def shutdown_engines():
+    for engine in engines.values():
+        engine.shutdown()
@@ -1,80 +1,215 @@
-import markdown
 import re
-from gtts import gTTS
-from langdetect import detect
 import tempfile
 import os
 import logging
+from collections import deque
+from services.blob_store import blob_store_from_env
+from services.response_cache import cache_from_env, make_key
+from services.paths import DATA_DIR
+from services.tts_engines import get_engine, TTSEngine
+from services.language_service import detect_language
+from services.speech_text import markdown_to_speech
 
 logger = logging.getLogger(__name__)
 
+# Generated MP3s, named by content hash and shared by all workers
+audio_store = blob_store_from_env("tts_audio", "TTS_AUDIO")
+
+# (engine, normalized text, language, voice) -> audio_id in audio_store
+tts_cache = cache_from_env(
+    "tts", "TTS",
+    default_ttl=7 * 24 * 3600,
+    default_memory_bytes=4 * 1024 * 1024,
+    default_db=os.path.join(DATA_DIR, "tts_cache.db"),
+)
+
+# Text is synthesized in sentence-aligned chunks of up to TTS_CHUNK_CHARS
+TTS_CHUNK_CHARS = int(os.getenv("TTS_CHUNK_CHARS", "400"))
+
+SENTENCE_END = re.compile(r'(?<=[.!?;:\u3002\uff01\uff1f])\s+')
+
+def tts_cache_key(engine_name: str, normalized_text: str, tts_lang: str, voice: dict) -> str:
+    return make_key(engine_name, normalized_text, tts_lang, voice)
+
 def normalize_markdown(text_md: str) -> str:
     """
-    Converts markdown to plain text by stripping formatting.
+    Converts markdown to plain text for speech (see speech_text for the
+    code block and URL policies).
+    """
+    return markdown_to_speech(text_md)
+
+def split_sentences(text: str, max_chars: int = TTS_CHUNK_CHARS) -> list:
+    """
+    Packs whole sentences into chunks of up to max_chars, so every chunk
+    ends at a natural pause. Sentences longer than max_chars are split
+    at the last space before the limit.
     """
-    # Convert markdown to HTML, then strip HTML tags
-    html = markdown.markdown(text_md)
-    # Simple HTML tag removal
-    plain_text = re.sub(r'<[^>]+>', '', html)
-    # Clean up extra whitespace
-    plain_text = re.sub(r'\s+', ' ', plain_text).strip()
-    return plain_text
-
-def generate_tts(text_md: str) -> dict:
+    chunks = []
+    current = ""
+    for sentence in SENTENCE_END.split(text):
+        while len(sentence) > max_chars:
+            cut = sentence.rfind(" ", 0, max_chars)
+            if cut <= 0:
+                cut = max_chars
+            if current:
+                chunks.append(current)
+                current = ""
+            chunks.append(sentence[:cut].strip())
+            sentence = sentence[cut:].strip()
+        if current and len(current) + 1 + len(sentence) > max_chars:
+            chunks.append(current)
+            current = sentence
+        else:
+            current = f"{current} {sentence}" if current else sentence
+    if current:
+        chunks.append(current)
+    return [chunk for chunk in chunks if chunk]
+
+def strip_id3(data: bytes) -> bytes:
+    """Drops a leading ID3v2 tag so MP3 chunks can be concatenated frame to frame."""
+    if len(data) >= 10 and data[:3] == b"ID3":
+        size = (data[6] << 21) | (data[7] << 14) | (data[8] << 7) | data[9]
+        return data[10 + size:]
+    return data
+
+def synthesize_chunks(chunks: list, engine: TTSEngine, tts_lang: str):
     """
-    Generates TTS from markdown text using Google Text-to-Speech.
-    Returns dict with normalized_text, language, audio_path
+    Yields the MP3 bytes of each chunk in order while up to
+    engine.parallel chunks are synthesized concurrently. Pending work is
+    cancelled if the consumer stops early.
     """
+    pending = deque()
+    next_chunk = 0
+    done = 0
     try:
-        normalized_text = normalize_markdown(text_md)
-        if not normalized_text:
-            raise ValueError("No text content found")
-
-        language = detect(normalized_text)
-
-        logger.info(f"Generating TTS for language: {language}")
-
-        # Map detected language to gTTS supported language
-        # gTTS supports many languages, but we need to map them properly
-        lang_map = {
-            'en': 'en',
-            'es': 'es',
-            'fr': 'fr',
-            'de': 'de',
-            'it': 'it',
-            'pt': 'pt',
-            'ru': 'ru',
-            'ja': 'ja',
-            'ko': 'ko',
-            'zh': 'zh-cn',
-            'ar': 'ar',
-            'hi': 'hi',
-            'nl': 'nl'
-        }
-
-        # Default to English if language not supported
-        tts_lang = lang_map.get(language[:2], 'en')
-
-        # Create TTS object
-        tts = gTTS(text=normalized_text, lang=tts_lang, slow=False)
-
-        # Save to temporary file
-        temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.mp3')
-        temp_file.close()  # Close so gTTS can write to it
+        while done < len(chunks):
+            while next_chunk < len(chunks) and len(pending) < engine.parallel:
+                pending.append(engine.submit(chunks[next_chunk], tts_lang))
+                next_chunk += 1
+            data = pending.popleft().result()
+            # Only the first chunk keeps its header, so the result is one MP3 stream
+            yield data if done == 0 else strip_id3(data)
+            done += 1
+    finally:
+        for future in pending:
+            future.cancel()
+
+def prepare_tts(text_md: str, engine_name: str = None) -> dict:
+    """
+    Normalizes the markdown, picks the engine (default TTS_ENGINE) and its
+    language; shared by generate_tts and stream_tts.
+    """
+    engine = get_engine(engine_name)
+    normalized_text = normalize_markdown(text_md)
+    if not normalized_text:
+        raise ValueError("No text content found")
 
-        tts.save(temp_file.name)
+    language = detect_language(normalized_text)
+    tts_lang = engine.language(language)
+    return {
+        "text_normalized": normalized_text,
+        "language": language,
+        "engine": engine,
+        "tts_lang": tts_lang,
+        "key": tts_cache_key(engine.name, normalized_text, tts_lang, engine.voice(tts_lang)),
+    }
 
-        # Verify file was created and has content
-        if not os.path.exists(temp_file.name) or os.path.getsize(temp_file.name) == 0:
-            raise Exception("TTS file was not created or is empty")
+def cached_audio(key: str):
+    """audio_store record ({hash, path, ...}) for a cache key whose audio is still stored, else None."""
+    cached = tts_cache.get(key)
+    if cached:
+        return audio_store.get(cached["audio_id"])
+    return None
 
-        logger.info(f"TTS generated: {temp_file.name} (size: {os.path.getsize(temp_file.name)} bytes)")
+def _store_audio(path: str, key: str) -> str:
+    if os.path.getsize(path) == 0:
+        os.unlink(path)
+        raise Exception("TTS file was not created or is empty")
+    logger.info(f"TTS generated: {path} (size: {os.path.getsize(path)} bytes)")
+    audio_id = audio_store.put_file(path, "audio/mpeg")
+    tts_cache.set(key, {"audio_id": audio_id})
+    return audio_id
 
-        return {
-            "text_normalized": normalized_text,
-            "language": language,
-            "audio_path": temp_file.name
-        }
+def generate_tts(text_md: str, engine_name: str = None) -> dict:
+    """
+    Generates TTS from markdown text with the given engine (see tts_engines).
+    Sentence chunks are synthesized in parallel and their MP3 frames
+    concatenated in order. The MP3 is moved into audio_store; repeated
+    text is answered from tts_cache without synthesis.
+    Returns dict with normalized_text, language, audio_id
+    """
+    try:
+        prepared = prepare_tts(text_md, engine_name)
+        result = {"text_normalized": prepared["text_normalized"], "language": prepared["language"]}
+
+        blob = cached_audio(prepared["key"])
+        if blob:
+            logger.info(f"TTS cache hit: {blob['hash']}")
+            return {**result, "audio_id": blob["hash"]}
+
+        chunks = split_sentences(prepared["text_normalized"])
+        logger.info(f"Generating TTS for language: {prepared['language']} ({len(chunks)} chunks, {prepared['engine'].name})")
+
+        temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.mp3')
+        try:
+            with temp_file:
+                for data in synthesize_chunks(chunks, prepared["engine"], prepared["tts_lang"]):
+                    temp_file.write(data)
+        except BaseException:
+            os.unlink(temp_file.name)
+            raise
+
+        return {**result, "audio_id": _store_audio(temp_file.name, prepared["key"])}
     except Exception as e:
         logger.error(f"TTS generation failed: {str(e)}")
         raise Exception(f"Failed to generate TTS: {str(e)}")
+
+def stream_tts(text_md: str, engine_name: str = None) -> tuple:
+    """
+    Like generate_tts, but returns (info, audio_iterator) right away: the
+    iterator yields MP3 bytes as each chunk finishes, so playback can
+    start after the first sentence. A completely streamed document is
+    stored and cached like generate_tts output; info["audio_id"] is set
+    only on a cache hit.
+
+    The iterator is a generator: call its close() once the response has
+    ended, so a stream abandoned by the client deletes its partial file.
+    """
+    prepared = prepare_tts(text_md, engine_name)
+    info = {"text_normalized": prepared["text_normalized"], "language": prepared["language"], "audio_id": None}
+
+    blob = cached_audio(prepared["key"])
+    if blob:
+        try:
+            # Opened now: an open file stays readable even if GC removes the blob meanwhile
+            audio_file = open(blob["path"], "rb")
+        except FileNotFoundError:
+            audio_file = None
+        if audio_file:
+            logger.info(f"TTS cache hit: {blob['hash']}")
+            info["audio_id"] = blob["hash"]
+            return info, _read_file(audio_file)
+
+    chunks = split_sentences(prepared["text_normalized"])
+    logger.info(f"Streaming TTS for language: {prepared['language']} ({len(chunks)} chunks, {prepared['engine'].name})")
+    return info, _stream_and_store(chunks, prepared["engine"], prepared["tts_lang"], prepared["key"])
+
+def _read_file(audio_file, chunk_bytes: int = 64 * 1024):
+    with audio_file:
+        for chunk in iter(lambda: audio_file.read(chunk_bytes), b""):
+            yield chunk
+
+def _stream_and_store(chunks: list, engine: TTSEngine, tts_lang: str, key: str):
+    temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.mp3')
+    try:
+        with temp_file:
+            for data in synthesize_chunks(chunks, engine, tts_lang):
+                temp_file.write(data)
+                yield data
+    except BaseException as e:
+        # Client disconnects land here as GeneratorExit, from close()
+        os.unlink(temp_file.name)
+        if isinstance(e, Exception):
+            logger.error(f"TTS streaming failed: {str(e)}")
+        raise
+    _store_audio(temp_file.name, key)
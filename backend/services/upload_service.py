@@ -0,0 +1,85 @@
+import os
+import tempfile
+import logging
+from fastapi import UploadFile
+from fastapi.concurrency import run_in_threadpool
+
+logger = logging.getLogger(__name__)
+
+UPLOAD_CHUNK_BYTES = int(os.getenv("UPLOAD_CHUNK_BYTES", str(1024 * 1024)))
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(4 * 1024 * 1024 * 1024)))
+UPLOAD_DIR = os.getenv("UPLOAD_DIR") or None  # None: system temp dir
+# Hand uploads that are already spooled to disk straight to the decoder instead of copying them
+UPLOAD_PASSTHROUGH = os.getenv("UPLOAD_PASSTHROUGH", "true").lower() == "true" and os.path.isdir("/proc/self/fd")
+
+PASSTHROUGH_PREFIX = "/proc/"
+
+class UploadTooLargeError(Exception):
+    """Raised when an upload exceeds MAX_UPLOAD_BYTES."""
+
+def _spooled_fd(upload: UploadFile):
+    """File descriptor of the multipart spool file, if it has been rolled over to disk."""
+    spool = upload.file
+    # A SpooledTemporaryFile only has a name once it is backed by a real file;
+    # fileno() on an in-memory one would force the rollover
+    if getattr(spool, "name", None) is None:
+        return None
+    try:
+        return spool.fileno()
+    except (AttributeError, OSError):
+        return None
+
+def _sendfile_copy(in_fd: int, out_fd: int, size: int):
+    """Copies inside the kernel, so the upload never passes through Python buffers."""
+    offset = 0
+    while offset < size:
+        sent = os.sendfile(out_fd, in_fd, offset, min(UPLOAD_CHUNK_BYTES * 64, size - offset))
+        if sent == 0:
+            break
+        offset += sent
+
+async def save_upload(upload: UploadFile, max_bytes: int = MAX_UPLOAD_BYTES, passthrough: bool = UPLOAD_PASSTHROUGH, directory: str = UPLOAD_DIR) -> str:
+    """
+    Makes an uploaded file available on disk and returns its path.
+
+    Uploads the multipart parser has already spooled to disk are either
+    passed through as a /proc fd path (valid until the request finishes)
+    or copied with sendfile. Small in-memory uploads are written out in
+    UPLOAD_CHUNK_BYTES pieces. Peak memory stays at one chunk regardless
+    of the file size. Raises UploadTooLargeError above max_bytes.
+    Release the path with remove_temp_file().
+    """
+    in_fd = _spooled_fd(upload)
+    if in_fd is not None:
+        size = os.fstat(in_fd).st_size
+        if size > max_bytes:
+            raise UploadTooLargeError(f"Upload exceeds {max_bytes} bytes")
+        if passthrough:
+            logger.info(f"Passing spooled upload through: {upload.filename} ({size} bytes)")
+            return f"{PASSTHROUGH_PREFIX}{os.getpid()}/fd/{in_fd}"
+
+    fd, path = tempfile.mkstemp(suffix=os.path.splitext(upload.filename or "")[1], dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as out:
+            if in_fd is not None:
+                await run_in_threadpool(_sendfile_copy, in_fd, out.fileno(), size)
+            else:
+                written = 0
+                await upload.seek(0)
+                while True:
+                    chunk = await upload.read(UPLOAD_CHUNK_BYTES)
+                    if not chunk:
+                        break
+                    written += len(chunk)
+                    if written > max_bytes:
+                        raise UploadTooLargeError(f"Upload exceeds {max_bytes} bytes")
+                    out.write(chunk)
+    except BaseException:
+        os.unlink(path)
+        raise
+    return path
+
+def remove_temp_file(path: str):
+    """Deletes a temp file from save_upload or a download; passthrough paths are left alone."""
+    if path and not path.startswith(PASSTHROUGH_PREFIX) and os.path.exists(path):
+        os.unlink(path)
@@ -1,55 +1,82 @@
-from moviepy.editor import VideoFileClip
-import tempfile
 import os
+import shutil
 import logging
-from services.stt_service import transcribe_audio
-from services.youtube_service import download_youtube_video
+import numpy as np
+from services.audio_io import load_audio, SAMPLE_RATE
+from services.stt_service import transcribe_pcm, fallback_for_pcm, QueueFullError, transcript_cache, video_cache_key, is_fallback_result
+from services.youtube_service import download_youtube_audio, resolve_youtube_audio_stream, canonical_video_id
 
 logger = logging.getLogger(__name__)
 
-def extract_audio_from_video(video_path: str) -> str:
+# Pipe the remote audio stream straight into ffmpeg instead of downloading it first
+YOUTUBE_AUDIO_STREAMING = os.getenv("YOUTUBE_AUDIO_STREAMING", "true").lower() == "true"
+
+def extract_audio_from_video(video_path: str) -> np.ndarray:
     """
-    Extracts audio from video file and returns audio file path.
+    Demuxes the audio track and resamples it to 16 kHz mono PCM in one
+    ffmpeg pass. The video stream is never decoded and no intermediate
+    audio file is written.
     """
     try:
-        video = VideoFileClip(video_path)
-        audio = video.audio
-        
-        temp_audio = tempfile.NamedTemporaryFile(delete=False, suffix='.mp3')
-        audio.write_audiofile(temp_audio.name, verbose=False, logger=None)
-        temp_audio.close()
-        
-        video.close()
-        
-        logger.info(f"Audio extracted: {temp_audio.name}")
-        return temp_audio.name
+        audio = load_audio(video_path)
+        logger.info(f"Audio extracted: {len(audio) / SAMPLE_RATE:.1f}s from {video_path}")
+        return audio
     except Exception as e:
         logger.error(f"Audio extraction failed: {str(e)}")
         raise Exception(f"Failed to extract audio: {str(e)}")
 
+def fetch_url_audio(video_url: str) -> np.ndarray:
+    """
+    Fetches only the audio of a YouTube (or other yt-dlp supported) URL as PCM.
+    Streams it through ffmpeg when possible, otherwise downloads the audio
+    track to a temp file.
+    """
+    if YOUTUBE_AUDIO_STREAMING:
+        try:
+            stream_url, headers = resolve_youtube_audio_stream(video_url)
+            return load_audio(stream_url, http_headers=headers)
+        except Exception as e:
+            logger.warning(f"Audio streaming failed, falling back to download: {str(e)}")
+    temp_audio_path = download_youtube_audio(video_url)
+    try:
+        return extract_audio_from_video(temp_audio_path)
+    finally:
+        # Clean up the download directory
+        shutil.rmtree(os.path.dirname(temp_audio_path), ignore_errors=True)
+
 def transcribe_video(video_path: str = None, video_url: str = None) -> dict:
     """
     Transcribes video from file or YouTube URL.
     """
-    temp_video_path = None
-    temp_audio_path = None
+    video_id = None
     try:
         if video_path:
-            temp_audio_path = extract_audio_from_video(video_path)
+            audio = extract_audio_from_video(video_path)
         elif video_url:
-            temp_video_path = download_youtube_video(video_url)
-            temp_audio_path = extract_audio_from_video(temp_video_path)
+            video_id = canonical_video_id(video_url)
+            if video_id:
+                cached = transcript_cache.get(video_cache_key(video_id))
+                if cached is not None:
+                    logger.info(f"Transcript cache hit for {video_id}")
+                    return cached
+            audio = fetch_url_audio(video_url)
         else:
             raise ValueError("Either video_path or video_url must be provided")
         
-        result = transcribe_audio(temp_audio_path)
+        try:
+            result = transcribe_pcm(audio)
+        except QueueFullError:
+            raise
+        except Exception as e:
+            logger.error(f"Whisper transcription failed: {str(e)}")
+            result = fallback_for_pcm(audio, e)
+        
+        if video_id and not is_fallback_result(result):
+            transcript_cache.set(video_cache_key(video_id), result)
         
         return result
+    except QueueFullError:
+        raise
     except Exception as e:
         logger.error(f"Video transcription failed: {str(e)}")
         raise Exception(f"Failed to transcribe video: {str(e)}")
-    finally:
-        # Clean up temp files
-        for path in [temp_video_path, temp_audio_path]:
-            if path and os.path.exists(path):
-                os.unlink(path)
@@ -1,51 +1,130 @@
-import yt_dlp
 import os
+import re
+import time
 import tempfile
 import logging
+from services import metrics
 
 logger = logging.getLogger(__name__)
 
-def download_youtube_video(url: str) -> str:
+# Single-file audio formats only, so ffmpeg can read the stream URL directly
+AUDIO_FORMAT = 'bestaudio[protocol^=http]/bestaudio/best'
+
+YOUTUBE_ID_PATTERN = re.compile(
+    r'(?:youtube(?:-nocookie)?\.com/(?:watch\?(?:.*&)?v=|embed/|shorts/|live/|v/)|youtu\.be/)([A-Za-z0-9_-]{11})'
+)
+
+def canonical_video_id(url: str):
+    """
+    Returns a stable ID like 'youtube:<id>' for YouTube URLs, so different
+    URL spellings of the same video share cache entries. None otherwise.
+    """
+    match = YOUTUBE_ID_PATTERN.search(url)
+    if match:
+        return f"youtube:{match.group(1)}"
+    return None
+
+def build_ydl_opts(temp_dir: str, format_spec: str) -> dict:
+    """yt-dlp options with anti-detection measures."""
+    return {
+        'outtmpl': os.path.join(temp_dir, '%(title)s.%(ext)s'),
+        'format': format_spec,
+        # Anti-detection options
+        'user_agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+        'referer': 'https://www.youtube.com/',
+        'http_headers': {
+            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+            'Accept-Language': 'en-us,en;q=0.5',
+            'Sec-Fetch-Mode': 'navigate',
+        },
+        # Additional options
+        'geo_bypass': True,
+        'extract_flat': False,
+        'sleep_interval': 1,
+        'max_sleep_interval': 5,
+        # Disable some features that might trigger detection
+        'no_check_certificate': True,
+        'ignoreerrors': False,
+        'quiet': False,
+        'no_warnings': False,
+    }
+
+def youtube_dl(ydl_opts: dict):
+    """A YoutubeDL instance. yt-dlp loads hundreds of extractors, so it is imported on first use."""
+    import yt_dlp
+    return yt_dlp.YoutubeDL(ydl_opts)
+
+def run_download(url: str, ydl_opts: dict, kind: str) -> str:
+    """Downloads with yt-dlp, records time and size under kind, and returns the file path."""
+    start = time.perf_counter()
+    outcome = "error"
+    try:
+        with youtube_dl(ydl_opts) as ydl:
+            info = ydl.extract_info(url, download=True)
+            filename = ydl.prepare_filename(info)
+        outcome = "ok"
+    finally:
+        metrics.YTDLP_DOWNLOAD_SECONDS.labels(kind, outcome).observe(time.perf_counter() - start)
+    if os.path.exists(filename):
+        metrics.YTDLP_DOWNLOAD_BYTES.labels(kind).inc(os.path.getsize(filename))
+    return filename
+
+def download_youtube_video(url: str, output_dir: str = None, progress_hook=None) -> str:
     """
     Downloads a YouTube video from the given URL and returns the file path.
+    Without output_dir the file goes to a new temporary directory;
+    progress_hook is passed to yt-dlp as a progress hook.
     """
     try:
         # Create a temporary directory
-        temp_dir = tempfile.mkdtemp()
+        temp_dir = output_dir or tempfile.mkdtemp()
 
-        # Configure yt-dlp options with anti-detection measures
-        ydl_opts = {
-            'outtmpl': os.path.join(temp_dir, '%(title)s.%(ext)s'),
-            'format': 'best[height<=720]',  # Best available up to 720p
-            # Anti-detection options
-            'user_agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-            'referer': 'https://www.youtube.com/',
-            'http_headers': {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-                'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
-                'Accept-Language': 'en-us,en;q=0.5',
-                'Sec-Fetch-Mode': 'navigate',
-            },
-            # Additional options
-            'geo_bypass': True,
-            'extract_flat': False,
-            'sleep_interval': 1,
-            'max_sleep_interval': 5,
-            # Disable some features that might trigger detection
-            'no_check_certificate': True,
-            'ignoreerrors': False,
-            'quiet': False,
-            'no_warnings': False,
-        }
+        ydl_opts = build_ydl_opts(temp_dir, 'best[height<=720]')  # Best available up to 720p
+        if progress_hook:
+            ydl_opts['progress_hooks'] = [progress_hook]
 
         logger.info(f"Starting download for URL: {url}")
 
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            info = ydl.extract_info(url, download=True)
-            filename = ydl.prepare_filename(info)
+        filename = run_download(url, ydl_opts, "video")
 
         logger.info(f"Download completed: {filename}")
         return filename
     except Exception as e:
         logger.error(f"Error downloading video: {str(e)}")
         raise Exception(f"Failed to download video: {str(e)}")
+
+def download_youtube_audio(url: str) -> str:
+    """
+    Downloads only the best audio stream (no picture) and returns the file path.
+    """
+    try:
+        temp_dir = tempfile.mkdtemp()
+        ydl_opts = build_ydl_opts(temp_dir, AUDIO_FORMAT)
+
+        logger.info(f"Starting audio download for URL: {url}")
+
+        filename = run_download(url, ydl_opts, "audio")
+
+        logger.info(f"Audio download completed: {filename}")
+        return filename
+    except Exception as e:
+        logger.error(f"Error downloading audio: {str(e)}")
+        raise Exception(f"Failed to download audio: {str(e)}")
+
+def resolve_youtube_audio_stream(url: str) -> tuple:
+    """
+    Resolves the direct media URL of the best audio stream without
+    downloading it. Returns (stream_url, http_headers) for ffmpeg to read.
+    """
+    try:
+        ydl_opts = build_ydl_opts(tempfile.gettempdir(), AUDIO_FORMAT)
+        with youtube_dl(ydl_opts) as ydl:
+            info = ydl.extract_info(url, download=False)
+        if not info.get('url'):
+            raise Exception("No direct audio stream URL available")
+        logger.info(f"Resolved audio stream for {url}: {info.get('format_id')} ({info.get('acodec')})")
+        return info['url'], info.get('http_headers', {})
+    except Exception as e:
+        logger.error(f"Error resolving audio stream: {str(e)}")
+        raise Exception(f"Failed to resolve audio stream: {str(e)}")
@@ -0,0 +1,19 @@
+import os
+import sys
+import tempfile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+# Keep test runs away from the service's log file, metrics and data directories
+_test_dir = tempfile.mkdtemp(prefix="organaizer_tests_")
+os.environ.setdefault("LOG_FILE", os.path.join(_test_dir, "backend.log"))
+os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", os.path.join(_test_dir, "metrics"))
+os.environ.setdefault("DATA_DIR", os.path.join(_test_dir, "data"))
+
+# API key accepted by auth.get_api_key in tests
+TEST_API_KEY = "test-key"
+_keys_file = os.path.join(_test_dir, "keys.csv")
+with open(_keys_file, "w") as f:
+    f.write(f"{TEST_API_KEY}\n")
+os.environ.setdefault("KEYS_FILE", _keys_file)
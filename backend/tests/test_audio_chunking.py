@@ -0,0 +1,82 @@
+import numpy as np
+
+from services.audio_chunking import FRAME_SECONDS, frame_energy, split_on_silence
+
+# A low rate keeps the synthetic signals small; 30 samples per frame
+RATE = 1000
+FRAME = int(RATE * FRAME_SECONDS)
+
+def tone(seconds: float, amplitude: float = 0.5) -> np.ndarray:
+    t = np.arange(int(seconds * RATE), dtype=np.float32) / RATE
+    return (amplitude * np.sin(2 * np.pi * 50 * t)).astype(np.float32)
+
+def silence(seconds: float) -> np.ndarray:
+    return np.zeros(int(seconds * RATE), dtype=np.float32)
+
+def split(audio: np.ndarray) -> list:
+    return split_on_silence(audio, RATE, target_seconds=60, max_seconds=90, min_seconds=20)
+
+def assert_tiles(chunks: list, total: int):
+    """Chunks cover the input in order, without gaps or overlap."""
+    assert chunks[0][0] == 0
+    assert chunks[-1][1] == total
+    for (_, end), (start, _) in zip(chunks, chunks[1:]):
+        assert end == start
+    for start, end in chunks:
+        assert start < end
+
+def test_frame_energy():
+    energy = frame_energy(np.concatenate([silence(0.3), tone(0.3, 1.0)]), RATE)
+    assert len(energy) == 20
+    assert energy[:10].max() < -90
+    assert abs(energy[10:].mean() - 20 * np.log10(1 / np.sqrt(2))) < 0.5
+    assert len(frame_energy(silence(0.01), RATE)) == 0
+
+def test_short_audio_is_one_chunk():
+    audio = tone(90)
+    assert split(audio) == [(0, len(audio))]
+
+def test_all_silence_is_cut_at_the_target_length():
+    audio = silence(300)
+    chunks = split(audio)
+    assert_tiles(chunks, len(audio))
+    for start, end in chunks[:-1]:
+        assert abs((end - start) / RATE - 60) <= FRAME_SECONDS
+
+def test_cuts_land_in_pauses():
+    # Speech with pauses at 45 s and 130 s
+    audio = np.concatenate([tone(44), silence(2), tone(83), silence(2), tone(71)])
+    chunks = split(audio)
+    assert_tiles(chunks, len(audio))
+    assert len(chunks) == 3
+    assert 44 * RATE <= chunks[0][1] <= 46 * RATE
+    assert 129 * RATE <= chunks[1][1] <= 131 * RATE
+
+def test_no_silence_never_exceeds_the_max_length():
+    audio = (np.random.default_rng(0).uniform(-0.5, 0.5, 400 * RATE)).astype(np.float32)
+    chunks = split(audio)
+    assert_tiles(chunks, len(audio))
+    for start, end in chunks:
+        assert (end - start) / RATE <= 90
+    for start, end in chunks[:-1]:
+        assert (end - start) / RATE >= 20
+
+def test_fading_audio_is_cut_near_the_max_length():
+    # 0.5 dB quieter every second: the quietest point of every window is near its end
+    t = np.arange(200 * RATE, dtype=np.float32) / RATE
+    audio = (10 ** (-0.5 * t / 20) * np.sin(2 * np.pi * 50 * t)).astype(np.float32)
+    chunks = split(audio)
+    assert_tiles(chunks, len(audio))
+    assert len(chunks) == 3
+    for start, end in chunks[:-1]:
+        assert 80 <= (end - start) / RATE <= 90
+
+def test_chunk_boundaries_are_frame_aligned_and_within_limits():
+    rng = np.random.default_rng(0)
+    audio = np.concatenate([tone(rng.uniform(5, 40)) if i % 2 == 0 else silence(rng.uniform(0.3, 2)) for i in range(40)])
+    chunks = split(audio)
+    assert_tiles(chunks, len(audio))
+    for start, end in chunks[:-1]:
+        assert end % FRAME == 0
+        assert 20 <= (end - start) / RATE <= 90
+    assert (chunks[-1][1] - chunks[-1][0]) / RATE <= 90 + FRAME_SECONDS
@@ -0,0 +1,166 @@
+import hashlib
+import os
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from starlette.requests import Request
+
+from services import blob_store
+from services.blob_store import BlobStore
+from services.file_response import RangeNotSatisfiable, cached_file_response, parse_range
+
+class Clock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def time(self) -> float:
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(blob_store.time, "time", clock.time)
+    return clock
+
+def make_store(tmp_path, ttl: float = 3600, max_bytes: int = 1024 * 1024) -> BlobStore:
+    return BlobStore("test", str(tmp_path / "blobs"), ttl, max_bytes)
+
+def test_put_bytes_and_put_file_are_content_addressed(tmp_path):
+    store = make_store(tmp_path)
+    blob_hash = store.put_bytes(b"hello", "text/plain", ".txt")
+    assert blob_hash == hashlib.sha256(b"hello").hexdigest()
+
+    source = tmp_path / "hello.txt"
+    source.write_bytes(b"hello")
+    assert store.put_file(str(source), "text/plain") == blob_hash
+    assert not source.exists()
+
+    blob = store.get(blob_hash)
+    assert blob["media_type"] == "text/plain"
+    assert blob["size"] == 5
+    with open(blob["path"], "rb") as f:
+        assert f.read() == b"hello"
+    assert store.stats()["entries"] == 1
+
+def test_put_file_can_copy(tmp_path):
+    store = make_store(tmp_path)
+    source = tmp_path / "data.bin"
+    source.write_bytes(b"data")
+    store.put_file(str(source), "application/octet-stream", move=False)
+    assert source.exists()
+
+def test_gc_evicts_least_recently_used_first(tmp_path, clock):
+    store = make_store(tmp_path, max_bytes=300)
+    hashes = []
+    for i in range(3):
+        hashes.append(store.put_bytes(bytes([i]) * 100, "application/octet-stream", ".bin"))
+        clock.now += blob_store.ACCESS_REFRESH_SECONDS
+    # Reading the oldest blob makes the second one least recently used
+    assert store.get(hashes[0])
+
+    clock.now += 1
+    store.put_bytes(b"x" * 100, "application/octet-stream", ".bin")
+    store.gc(force=True)
+    assert store.get(hashes[1]) is None
+    assert store.get(hashes[0]) and store.get(hashes[2])
+    assert store.evictions == 1
+    assert store.stats()["bytes"] == 300
+
+def test_expired_blobs_are_removed(tmp_path, clock):
+    store = make_store(tmp_path, ttl=100)
+    blob_hash = store.put_bytes(b"old", "text/plain", ".txt")
+    path = store.get(blob_hash)["path"]
+    clock.now += 101
+    assert store.get(blob_hash) is None
+    assert not os.path.exists(path)
+
+    store.put_bytes(b"other", "text/plain", ".txt")
+    clock.now += 101
+    store.gc(force=True)
+    assert store.stats()["entries"] == 0
+
+def test_blob_without_index_entry_is_not_served_until_added_again(tmp_path):
+    store = make_store(tmp_path)
+    blob_hash = store.put_bytes(b"orphan", "text/plain", ".txt")
+    path = store.get(blob_hash)["path"]
+    store._conn.execute("DELETE FROM blobs")
+    store._conn.commit()
+
+    assert os.path.exists(path)
+    assert store.get(blob_hash) is None
+    assert store.put_bytes(b"orphan", "text/plain", ".txt") == blob_hash
+    assert store.get(blob_hash)["path"] == path
+
+def test_index_entry_without_file_is_dropped(tmp_path):
+    store = make_store(tmp_path)
+    blob_hash = store.put_bytes(b"gone", "text/plain", ".txt")
+    os.unlink(store.get(blob_hash)["path"])
+    assert store.get(blob_hash) is None
+    assert store.stats()["entries"] == 0
+
+def test_parse_range():
+    assert parse_range("bytes=0-9", 100) == (0, 9)
+    assert parse_range("bytes=90-", 100) == (90, 99)
+    assert parse_range("bytes=90-500", 100) == (90, 99)
+    # Suffix ranges: the last N bytes, at most the whole file
+    assert parse_range("bytes=-10", 100) == (90, 99)
+    assert parse_range("bytes=-500", 100) == (0, 99)
+    # Ignored: malformed or multiple ranges
+    assert parse_range("bytes=-", 100) is None
+    assert parse_range("items=0-9", 100) is None
+    assert parse_range("bytes=0-1,5-6", 100) is None
+
+@pytest.mark.parametrize("header", ["bytes=100-", "bytes=100-200", "bytes=50-10", "bytes=-0"])
+def test_parse_range_unsatisfiable(header):
+    with pytest.raises(RangeNotSatisfiable):
+        parse_range(header, 100)
+
+CONTENT = bytes(range(256)) * 4
+ETAG = "abc123"
+
+@pytest.fixture
+def client(tmp_path):
+    path = tmp_path / "file.bin"
+    path.write_bytes(CONTENT)
+    app = FastAPI()
+
+    @app.get("/file")
+    def get_file(request: Request):
+        return cached_file_response(request, str(path), "application/octet-stream", ETAG, filename="file.bin")
+
+    return TestClient(app)
+
+def test_full_response_has_cache_headers(client):
+    response = client.get("/file")
+    assert response.status_code == 200
+    assert response.content == CONTENT
+    assert response.headers["etag"] == f'"{ETAG}"'
+    assert response.headers["accept-ranges"] == "bytes"
+    assert 'filename="file.bin"' in response.headers["content-disposition"]
+
+def test_matching_etag_answers_304(client):
+    response = client.get("/file", headers={"If-None-Match": f'"other", "{ETAG}"'})
+    assert response.status_code == 304
+    assert response.content == b""
+    assert client.get("/file", headers={"If-None-Match": '"other"'}).status_code == 200
+
+def test_range_requests(client):
+    response = client.get("/file", headers={"Range": "bytes=10-19"})
+    assert response.status_code == 206
+    assert response.content == CONTENT[10:20]
+    assert response.headers["content-range"] == f"bytes 10-19/{len(CONTENT)}"
+
+    response = client.get("/file", headers={"Range": "bytes=-24"})
+    assert response.status_code == 206
+    assert response.content == CONTENT[-24:]
+
+def test_unsatisfiable_range_answers_416(client):
+    response = client.get("/file", headers={"Range": f"bytes={len(CONTENT)}-"})
+    assert response.status_code == 416
+    assert response.headers["content-range"] == f"bytes */{len(CONTENT)}"
+
+def test_stale_if_range_sends_the_whole_file(client):
+    response = client.get("/file", headers={"Range": "bytes=0-9", "If-Range": '"old"'})
+    assert response.status_code == 200
+    assert response.content == CONTENT
@@ -0,0 +1,155 @@
+import os
+import time
+import asyncio
+import sqlite3
+
+import pytest
+from fastapi.testclient import TestClient
+
+from services import job_service
+from services.job_service import JobQueue
+
+class Retryable(Exception):
+    pass
+
+@pytest.fixture
+def queue(monkeypatch, tmp_path):
+    monkeypatch.setattr(job_service, "JOB_POLL_INTERVAL", 0.01)
+    monkeypatch.setattr(job_service, "JOB_RETRY_DELAY", 0)
+    queue = JobQueue(str(tmp_path / "jobs.db"), str(tmp_path / "jobs"), workers=1, max_attempts=3)
+    yield queue
+    queue.stop()
+
+def wait_for(queue: JobQueue, job_id: str, statuses=("succeeded", "failed", "cancelled"), timeout: float = 5.0) -> dict:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = queue.get(job_id)
+        if job["status"] in statuses:
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"Job {job_id} stuck in {queue.get(job_id)['status']}")
+
+def test_job_succeeds_with_result(queue):
+    queue.register("double", lambda params, context: {"value": params["value"] * 2})
+    queue.start()
+    job_id = queue.submit("double", {"value": 21})
+    job = wait_for(queue, job_id)
+    assert job["status"] == "succeeded"
+    assert job["result"] == {"value": 42}
+    assert job["progress"] == 1.0
+    assert job["attempts"] == 1
+
+def test_coroutine_handler_runs(queue):
+    async def handler(params, context):
+        return {"echo": params["text"]}
+
+    queue.register("echo", handler)
+    queue.start()
+    job = wait_for(queue, queue.submit("echo", {"text": "hi"}))
+    assert job["result"] == {"echo": "hi"}
+
+def test_job_failure_is_recorded(queue):
+    def handler(params, context):
+        raise ValueError("bad input")
+
+    queue.register("broken", handler)
+    queue.start()
+    job = wait_for(queue, queue.submit("broken", {}))
+    assert job["status"] == "failed"
+    assert job["error"] == "bad input"
+
+def test_queued_job_can_be_cancelled(queue):
+    calls = []
+    queue.register("noop", lambda params, context: calls.append(1))
+    job_id = queue.submit("noop", {})
+    assert queue.cancel(job_id)["status"] == "cancelled"
+    queue.start()
+    time.sleep(0.1)
+    assert queue.get(job_id)["status"] == "cancelled"
+    assert calls == []
+
+def test_unknown_kind_is_rejected(queue):
+    with pytest.raises(ValueError):
+        queue.submit("missing", {})
+
+def test_retryable_error_is_retried_until_success(queue):
+    attempts = []
+
+    def handler(params, context):
+        attempts.append(1)
+        if len(attempts) < 2:
+            raise Retryable("queue full")
+        return {"ok": True}
+
+    queue.register("flaky", handler, retry_on=(Retryable,))
+    queue.start()
+    job = wait_for(queue, queue.submit("flaky", {}))
+    assert job["status"] == "succeeded"
+    assert job["attempts"] == 2
+
+def test_retries_stop_at_max_attempts(queue):
+    def handler(params, context):
+        raise Retryable("queue full")
+
+    queue.register("always_full", handler, retry_on=(Retryable,))
+    queue.start()
+    job = wait_for(queue, queue.submit("always_full", {}))
+    assert job["status"] == "failed"
+    assert job["attempts"] == 3
+    assert job["error"].startswith("Gave up after 3 attempts")
+
+def abandon(queue: JobQueue, job_id: str, attempts: int):
+    """Marks a job as running in a worker process that stopped sending heartbeats."""
+    stale = time.time() - job_service.JOB_ORPHAN_TIMEOUT - 1
+    queue._update(job_id, status="running", worker_pid=999999, heartbeat_at=stale, attempts=attempts)
+
+def test_orphaned_job_is_requeued_and_finished(queue):
+    queue.register("double", lambda params, context: {"value": params["value"] * 2})
+    job_id = queue.submit("double", {"value": 2})
+    abandon(queue, job_id, attempts=1)
+    queue.start()
+    job = wait_for(queue, job_id)
+    assert job["status"] == "succeeded"
+    assert job["attempts"] == 2
+
+def test_orphan_at_max_attempts_is_failed(queue):
+    queue.register("crashes", lambda params, context: {})
+    job_id = queue.submit("crashes", {})
+    abandon(queue, job_id, attempts=3)
+    queue.start()
+    job = wait_for(queue, job_id)
+    assert job["status"] == "failed"
+    assert "3 times" in job["error"]
+
+def test_recent_running_job_is_not_recovered(queue):
+    queue.register("noop", lambda params, context: {})
+    job_id = queue.submit("noop", {})
+    queue._update(job_id, status="running", worker_pid=999999, heartbeat_at=time.time(), attempts=1)
+    queue._recover_orphans()
+    assert queue.get(job_id)["status"] == "running"
+
+def test_prepare_job_removes_work_dir_on_error(queue):
+    async def prepare():
+        async with queue.prepare_job() as (job_id, work_dir):
+            open(os.path.join(work_dir, "input.bin"), "wb").close()
+            raise RuntimeError(job_id, work_dir)
+
+    with pytest.raises(RuntimeError) as error:
+        asyncio.run(prepare())
+    job_id, work_dir = error.value.args
+    assert not os.path.exists(work_dir)
+    assert queue.get(job_id) is None
+
+def test_queue_failure_is_a_server_error(monkeypatch):
+    import main
+    from conftest import TEST_API_KEY
+
+    def submit(*args, **kwargs):
+        raise sqlite3.OperationalError("database is locked")
+
+    monkeypatch.setattr(job_service.job_queue, "submit", submit)
+    client = TestClient(main.app, headers={"X-API-Key": TEST_API_KEY}, raise_server_exceptions=False)
+    response = client.post("/api/stt/transcribe/jobs", files={"file": ("audio.mp3", b"abc", "audio/mpeg")})
+    assert response.status_code == 500
+    response = client.post("/api/stt/transcribe/jobs", data={"long_form": "false"})
+    assert response.status_code == 400
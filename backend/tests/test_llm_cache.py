@@ -0,0 +1,104 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from services import llm_service
+from services.response_cache import MemoryCache, ResponseCache, SQLiteCache
+
+class FakeOpenRouter:
+    """Answers chat completions with a counter, streamed or not."""
+
+    def __init__(self, stream_lines=None):
+        self.calls = 0
+        self.stream_lines = stream_lines
+
+    def handler(self, request: httpx.Request) -> httpx.Response:
+        self.calls += 1
+        if json.loads(request.content).get("stream"):
+            lines = self.stream_lines or [
+                f'data: {json.dumps({"choices": [{"delta": {"content": "answer "}}]})}',
+                f'data: {json.dumps({"choices": [{"delta": {"content": str(self.calls)}, "finish_reason": "stop"}]})}',
+                "data: [DONE]",
+            ]
+            return httpx.Response(200, text="\n\n".join(lines) + "\n\n")
+        return httpx.Response(200, json={"choices": [{"message": {"content": f"answer {self.calls}"}}]})
+
+@pytest.fixture
+def upstream(monkeypatch, tmp_path):
+    cache = ResponseCache("llm", MemoryCache(1024 * 1024, 60), SQLiteCache(str(tmp_path / "llm.sqlite3"), 1024 * 1024, 60))
+    monkeypatch.setattr(llm_service, "llm_cache", cache)
+    fake = FakeOpenRouter()
+    monkeypatch.setattr(llm_service, "get_http_client", lambda: httpx.AsyncClient(transport=httpx.MockTransport(fake.handler)))
+    return fake
+
+def ask(prompt: str, cache_mode: str = "default") -> str:
+    return asyncio.run(llm_service.get_llm_response(prompt, "model", cache_mode))
+
+def ask_stream(prompt: str, cache_mode: str = "default") -> str:
+    async def collect():
+        return "".join([part async for part in llm_service.stream_llm_response(prompt, "model", cache_mode)])
+    return asyncio.run(collect())
+
+def test_default_mode_reads_and_writes(upstream):
+    assert ask("What is  the answer?") == "answer 1"
+    # Whitespace differences share the cache entry
+    assert ask("What is the answer?") == "answer 1"
+    assert upstream.calls == 1
+
+def test_refresh_skips_read_but_stores(upstream):
+    assert ask("question") == "answer 1"
+    assert ask("question", "refresh") == "answer 2"
+    assert ask("question") == "answer 2"
+    assert upstream.calls == 2
+
+def test_bypass_leaves_cache_untouched(upstream):
+    assert ask("question") == "answer 1"
+    assert ask("question", "bypass") == "answer 2"
+    assert ask("question") == "answer 1"
+    assert ask("other", "bypass") == "answer 3"
+    assert ask("other") == "answer 4"
+    assert upstream.calls == 4
+
+def test_disk_tier_survives_memory_loss(upstream):
+    assert ask("question") == "answer 1"
+    llm_service.llm_cache.memory.clear()
+    assert ask("question") == "answer 1"
+    assert llm_service.llm_cache.disk_hits == 1
+    assert upstream.calls == 1
+
+def test_complete_stream_is_cached(upstream):
+    assert ask_stream("question") == "answer 1"
+    assert ask_stream("question") == "answer 1"
+    assert ask("question") == "answer 1"
+    assert upstream.calls == 1
+
+def test_truncated_stream_is_not_cached(upstream):
+    upstream.stream_lines = [f'data: {json.dumps({"choices": [{"delta": {"content": "partial"}}]})}']
+    assert ask_stream("question") == "partial"
+    assert llm_service.llm_cache.get(llm_service.cache_key("question", "model")) is None
+
+def test_stream_error_chunk_raises_and_is_not_cached(upstream):
+    upstream.stream_lines = [
+        f'data: {json.dumps({"choices": [{"delta": {"content": "partial"}}]})}',
+        f'data: {json.dumps({"error": {"message": "provider failed"}, "choices": [{"delta": {}, "finish_reason": "error"}]})}',
+        "data: [DONE]",
+    ]
+    with pytest.raises(Exception, match="provider failed"):
+        ask_stream("question")
+    assert llm_service.llm_cache.get(llm_service.cache_key("question", "model")) is None
+
+def test_sqlite_totals_track_writes_and_eviction(tmp_path):
+    disk = SQLiteCache(str(tmp_path / "cache.sqlite3"), 100, 60)
+    disk.set("a", "x" * 40)
+    disk.set("b", "x" * 40)
+    disk.set("a", "x" * 10)
+    assert disk.stats()["bytes"] == 50
+    disk.set("c", "x" * 60)
+    # "b" is the least recently used entry and is evicted to stay under 100 bytes
+    assert disk.get("b") is None
+    stats = disk.stats()
+    assert (stats["entries"], stats["bytes"]) == (2, 70)
+    # A second connection sees the same totals
+    assert SQLiteCache(disk.path, 100, 60).stats()["bytes"] == 70
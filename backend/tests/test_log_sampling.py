@@ -0,0 +1,43 @@
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+
+import middleware
+
+def make_client(monkeypatch, logged: list) -> TestClient:
+    monkeypatch.setattr(middleware, "LOG_SAMPLING_RPS", 2)
+    monkeypatch.setattr(middleware, "LOG_SUCCESS_SAMPLE_RATE", 0.1)
+    monkeypatch.setattr(middleware, "_request_window", [0, 0])
+    monkeypatch.setattr(middleware.time, "monotonic", lambda: 100.0)
+    monkeypatch.setattr(middleware.random, "random", lambda: 0.5)
+    monkeypatch.setattr(middleware.logger, "info", lambda message, extra: logged.append(extra["fields"]))
+
+    app = FastAPI()
+    app.middleware("http")(middleware.log_middleware)
+
+    @app.get("/ok")
+    def ok():
+        return {}
+
+    @app.get("/fail")
+    def fail():
+        raise HTTPException(status_code=500)
+
+    return TestClient(app)
+
+def test_errors_count_toward_the_sampling_rate(monkeypatch):
+    logged = []
+    client = make_client(monkeypatch, logged)
+    client.get("/fail")
+    client.get("/fail")
+    client.get("/ok")
+    # The third request of the second is above LOG_SAMPLING_RPS, so the success is sampled out
+    assert [entry["status_code"] for entry in logged] == [500, 500]
+
+def test_requests_below_the_rate_are_all_logged(monkeypatch):
+    logged = []
+    client = make_client(monkeypatch, logged)
+    client.get("/ok")
+    client.get("/fail")
+    client.get("/fail")
+    assert [entry["status_code"] for entry in logged] == [200, 500, 500]
+    assert "sample_rate" not in logged[0]
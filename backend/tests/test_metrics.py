@@ -0,0 +1,69 @@
+import os
+import multiprocessing
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from services import metrics
+from middleware import MetricsMiddleware
+
+def sample(body: str, line_prefix: str) -> float:
+    """Value of the first exposition line starting with line_prefix."""
+    for line in body.splitlines():
+        if line.startswith(line_prefix):
+            return float(line.rsplit(" ", 1)[1])
+    raise AssertionError(f"No sample {line_prefix!r} in output")
+
+def rendered() -> str:
+    body, content_type = metrics.render()
+    assert content_type.startswith("text/plain")
+    return body.decode()
+
+def _record_in_child():
+    from services import metrics
+    metrics.CACHE_LOOKUPS.labels("test_child", "miss").inc(3)
+    metrics.TTS_SYNTHESIS_SECONDS.labels("test_child").observe(0.2)
+
+def test_samples_from_other_processes_are_merged():
+    metrics.CACHE_LOOKUPS.labels("test_child", "miss").inc(2)
+    child = multiprocessing.get_context("spawn").Process(target=_record_in_child)
+    child.start()
+    child.join(30)
+    assert child.exitcode == 0
+    body = rendered()
+    assert sample(body, 'cache_lookups_total{cache="test_child",result="miss"}') == 5
+    assert sample(body, 'tts_synthesis_seconds_count{engine="test_child"}') == 1
+    assert sample(body, 'tts_synthesis_seconds_bucket{engine="test_child",le="0.25"}') == 1
+
+def test_requests_are_labelled_by_route_template():
+    app = FastAPI()
+
+    @app.get("/items/{item_id}")
+    async def item(item_id: str):
+        return {"id": item_id}
+
+    app.add_middleware(MetricsMiddleware)
+    client = TestClient(app)
+    for item_id in ("a", "b", "c"):
+        assert client.get(f"/items/{item_id}").status_code == 200
+    assert client.get("/missing").status_code == 404
+
+    body = rendered()
+    assert sample(body, 'http_requests_total{method="GET",route="/items/{item_id}",status="200"}') == 3
+    assert sample(body, 'http_requests_total{method="GET",route="unmatched",status="404"}') == 1
+    assert 'route="/items/a"' not in body
+    assert sample(body, "http_requests_in_flight ") == 0
+
+def test_boot_directories_of_dead_runs_are_removed(tmp_path, monkeypatch):
+    monkeypatch.setattr(metrics, "METRICS_ROOT_DIR", str(tmp_path))
+    stale_pid = tmp_path / "999999999-1"
+    reused_pid = tmp_path / f"{os.getpid()}-0"
+    for directory in (stale_pid, reused_pid):
+        directory.mkdir()
+        (directory / "counter_1.db").write_bytes(b"")
+    current = metrics._boot_dir()
+    os.makedirs(current, exist_ok=True)
+    assert os.listdir(tmp_path) == [os.path.basename(current)]
+    # A second process of the same run keeps the directory
+    assert metrics._boot_dir() == current
+    assert os.path.isdir(current)
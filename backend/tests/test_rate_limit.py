@@ -0,0 +1,97 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import rate_limit
+from rate_limit import RateLimited, RateLimiter
+
+class Clock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(rate_limit.time, "time", clock)
+    return clock
+
+def make_limiter(tmp_path, limits=None, max_inflight: int = 2, lease_ttl: float = 3600) -> RateLimiter:
+    return RateLimiter(str(tmp_path / "rate_limit.db"), limits or {"cpu": (60, 3), "llm": (0, 0)}, max_inflight, lease_ttl)
+
+def test_burst_then_rejected_with_retry_after(tmp_path, clock):
+    limiter = make_limiter(tmp_path)
+    for _ in range(3):
+        limiter.take("key", "cpu")
+    with pytest.raises(RateLimited) as error:
+        limiter.take("key", "cpu")
+    # 60/min refills one token per second
+    assert error.value.retry_after == pytest.approx(1.0)
+    assert limiter.rejected == 1
+
+def test_tokens_refill_over_time(tmp_path, clock):
+    limiter = make_limiter(tmp_path)
+    for _ in range(3):
+        limiter.take("key", "cpu")
+    clock.now += 2
+    limiter.take("key", "cpu")
+    limiter.take("key", "cpu")
+    with pytest.raises(RateLimited):
+        limiter.take("key", "cpu")
+
+def test_buckets_are_per_key(tmp_path, clock):
+    limiter = make_limiter(tmp_path)
+    for _ in range(3):
+        limiter.take("a", "cpu")
+    limiter.take("b", "cpu")
+
+def test_zero_rate_disables_class(tmp_path, clock):
+    limiter = make_limiter(tmp_path)
+    for _ in range(100):
+        limiter.take("key", "llm")
+
+def test_buckets_are_shared_through_the_database(tmp_path, clock):
+    first, second = make_limiter(tmp_path), make_limiter(tmp_path)
+    first.take("key", "cpu")
+    first.take("key", "cpu")
+    second.take("key", "cpu")
+    with pytest.raises(RateLimited):
+        second.take("key", "cpu")
+
+def test_inflight_slots_are_limited_and_released(tmp_path, clock):
+    limiter = make_limiter(tmp_path, max_inflight=2)
+    first = limiter.acquire("key", "cpu")
+    limiter.acquire("key", "cpu")
+    with pytest.raises(RateLimited):
+        limiter.acquire("key", "cpu")
+    limiter.acquire("other", "cpu")
+    limiter.release(first)
+    limiter.acquire("key", "cpu")
+
+def test_expired_leases_are_reclaimed(tmp_path, clock):
+    limiter = make_limiter(tmp_path, max_inflight=1, lease_ttl=60)
+    limiter.acquire("key", "cpu")
+    with pytest.raises(RateLimited):
+        limiter.acquire("key", "cpu")
+    clock.now += 61
+    limiter.acquire("key", "cpu")
+
+def test_route_dependency_answers_429(tmp_path, monkeypatch):
+    limiter = make_limiter(tmp_path, limits={"cpu": (60, 2), "download": (0, 0), "llm": (0, 0)}, max_inflight=1)
+    monkeypatch.setattr(rate_limit, "limiter", limiter)
+    app = FastAPI()
+
+    @app.post("/work", dependencies=[rate_limit.rate_limit("cpu", concurrency=True)])
+    async def work():
+        return {"ok": True}
+
+    client = TestClient(app, headers={"X-API-Key": "test-key"})
+    assert client.post("/work").status_code == 200
+    # The in-flight slot is released once the response has been sent
+    assert client.post("/work").status_code == 200
+    response = client.post("/work")
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) >= 1
+    assert TestClient(app, headers={"X-API-Key": "wrong"}).post("/work").status_code == 401
@@ -0,0 +1,93 @@
+from services import speech_text
+from services.speech_text import SECTION_CHARS, _sections, markdown_to_speech
+from services.tts_service import split_sentences
+
+def speak_whole(text_md: str, code_policy: str = "skip", url_policy: str = "domain") -> str:
+    """markdown_to_speech without sections: the whole document in one block parse."""
+    env = {}
+    tokens = []
+    speech_text.parser.block.parse(text_md.replace("\r\n", "\n"), speech_text.parser, env, tokens)
+    blocks = []
+    speech_text._speak_blocks(tokens, env, blocks, code_policy, url_policy)
+    return " ".join(blocks)
+
+def long_document() -> str:
+    """A document well above SECTION_CHARS with constructs that must not be cut."""
+    parts = []
+    for i in range(200):
+        parts.append(f"## Heading {i}\n\nParagraph {i} with a [reference link][ref{i % 3}] and &amp; entity.\n")
+        parts.append("```\ncode line\n\nstill code after a blank line\n```\n")
+        parts.append("<!-- comment\n\nhidden text inside the comment\n-->\n")
+        parts.append("- item one\n\n  continued item\n- item two\n")
+        parts.append("| a | b |\n|---|---|\n| 1 | 2 |\n")
+        parts.append("Lorem ipsum dolor sit amet. " * 8 + "\n")
+    parts.append("\n".join(f"[ref{i}]: https://example.com/{i}" for i in range(3)))
+    return "\n".join(parts)
+
+def test_sections_rejoin_to_the_document_and_cut_only_at_safe_lines():
+    text = long_document()
+    sections = list(_sections(text, 512))
+    assert len(sections) > 10
+    assert "".join(sections) == text
+    for section in sections[1:]:
+        # Every section starts at an unindented line
+        assert section[:1] not in (" ", "\t", "\n")
+    for section in sections:
+        assert section.count("```") % 2 == 0
+        assert section.count("<!--") == section.count("-->")
+
+def test_long_document_speaks_the_same_as_one_parse():
+    text = long_document()
+    assert len(text) > 2 * SECTION_CHARS
+    assert len(list(_sections(text))) > 1
+    assert markdown_to_speech(text) == speak_whole(text)
+
+def test_sections_normalize_newlines():
+    assert "".join(_sections("a\r\nb\rc\n")) == "a\nb\nc\n"
+
+def test_reference_links_resolve_across_sections():
+    text = "See [the docs][docs].\n\n" + "Filler sentence here.\n\n" * 4000 + "[docs]: https://example.com/docs\n"
+    assert len(list(_sections(text))) > 1
+    speech = markdown_to_speech(text)
+    assert speech.startswith("See the docs.")
+    assert "[docs]" not in speech
+    assert "example.com" not in speech
+
+def test_html_comments_and_blocks_are_not_spoken():
+    text = "Before.\n\n<!-- hidden\n\nstill hidden\n-->\n\n<div>\nmarkup\n</div>\n\nAfter."
+    assert markdown_to_speech(text) == "Before. After."
+
+def test_tables_are_read_cell_by_cell():
+    text = "| Name | Age |\n|------|-----|\n| Ann | 30 |\n"
+    assert markdown_to_speech(text) == "Name. Age. Ann. 30."
+
+def test_entities_are_decoded():
+    assert markdown_to_speech("Fish &amp; chips &copy; &#35;1") == "Fish & chips © #1."
+
+def test_blocks_end_in_punctuation():
+    assert markdown_to_speech("# Title\n\n- one\n- two?\n\nDone!") == "Title. one. two? Done!"
+
+def test_code_block_and_url_policies():
+    text = "Visit https://www.example.com/page now.\n\n```\nprint(1)\n```\n"
+    assert markdown_to_speech(text, "skip", "domain") == "Visit example.com now."
+    assert markdown_to_speech(text, "announce", "skip") == "Visit now. Code block."
+    assert markdown_to_speech(text, "read", "read") == "Visit https://www.example.com/page now. print(1)."
+
+def test_split_sentences_packs_whole_sentences():
+    text = "One two. Three four! Five six? Seven eight."
+    assert split_sentences(text, 20) == ["One two. Three four!", "Five six?", "Seven eight."]
+    assert split_sentences(text, 1000) == [text]
+
+def test_split_sentences_cuts_long_sentences_at_spaces():
+    sentence = " ".join(["word"] * 30) + "."
+    chunks = split_sentences(f"Short. {sentence}", 40)
+    assert chunks[0] == "Short."
+    assert all(len(chunk) <= 40 for chunk in chunks)
+    assert " ".join(chunks[1:]) == sentence
+
+def test_split_sentences_cuts_words_longer_than_the_limit():
+    assert split_sentences("x" * 25, 10) == ["x" * 10, "x" * 10, "x" * 5]
+
+def test_split_sentences_handles_cjk_punctuation_and_empty_text():
+    assert split_sentences("你好。 再见！ 谢谢？", 4) == ["你好。", "再见！", "谢谢？"]
+    assert split_sentences("", 10) == []
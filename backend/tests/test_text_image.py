@@ -0,0 +1,43 @@
+import asyncio
+import base64
+
+import pytest
+
+from services import text_image_service
+from services.blob_store import BlobStore
+
+RATIO = text_image_service.ASPECT_RATIOS["square"]
+
+@pytest.fixture
+def image_store(monkeypatch, tmp_path):
+    store = BlobStore("images_test", str(tmp_path / "images"), 3600, 1024 * 1024)
+    monkeypatch.setattr(text_image_service, "image_store", store)
+
+    async def broken_processing(*args):
+        raise OSError("cannot identify image file")
+    monkeypatch.setattr(text_image_service, "process_image_async", broken_processing)
+    return store
+
+def prepare(img_url: str, delivery: str) -> dict:
+    return asyncio.run(text_image_service.prepare_image(img_url, 0, "prompt", RATIO, delivery=delivery))
+
+def data_url(data: bytes, media_type: str) -> str:
+    return f"data:{media_type};base64,{base64.b64encode(data).decode()}"
+
+def test_failed_data_url_is_stored_in_url_mode(image_store):
+    image = prepare(data_url(b"raw png", "image/png"), "url")
+    assert image["url"].startswith("/api/text-image/images/")
+    assert image["media_type"] == "image/png"
+    blob = image_store.get(image["url"].rsplit("/", 1)[1])
+    assert blob["path"].endswith(".png")
+    with open(blob["path"], "rb") as f:
+        assert f.read() == b"raw png"
+
+def test_failed_data_url_is_kept_inline_in_inline_mode(image_store):
+    url = data_url(b"raw png", "image/png")
+    assert prepare(url, "inline")["url"] == url
+    assert image_store.stats()["entries"] == 0
+
+def test_failed_data_url_of_unknown_type_raises_in_url_mode(image_store):
+    with pytest.raises(ValueError):
+        prepare(data_url(b"<html>", "text/html"), "url")
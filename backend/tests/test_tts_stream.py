@@ -0,0 +1,73 @@
+import os
+import tempfile
+from concurrent.futures import Future
+
+import pytest
+
+from services import tts_service
+from services.blob_store import BlobStore
+from services.response_cache import MemoryCache, ResponseCache, SQLiteCache
+from services.tts_engines import TTSEngine
+
+class FakeEngine(TTSEngine):
+    """Answers every chunk with its text as bytes."""
+    name = "fake"
+    parallel = 2
+
+    def language(self, detected: str) -> str:
+        return "en"
+
+    def voice(self, lang: str) -> dict:
+        return {}
+
+    def submit(self, text: str, lang: str) -> Future:
+        future = Future()
+        future.set_result(text.encode())
+        return future
+
+TEXT = " ".join(f"Sentence number {i} is here." for i in range(40))
+
+@pytest.fixture
+def store(monkeypatch, tmp_path):
+    audio_store = BlobStore("tts_test", str(tmp_path / "audio"), 3600, 1024 * 1024)
+    monkeypatch.setattr(tts_service, "audio_store", audio_store)
+    monkeypatch.setattr(tts_service, "tts_cache", ResponseCache("tts", MemoryCache(1024 * 1024, 60), SQLiteCache(str(tmp_path / "tts.sqlite3"), 1024 * 1024, 60)))
+    monkeypatch.setattr(tts_service, "get_engine", lambda name: FakeEngine())
+    monkeypatch.setattr(tts_service, "detect_language", lambda text: "en")
+    temp_dir = tmp_path / "temp"
+    temp_dir.mkdir()
+    monkeypatch.setattr(tempfile, "tempdir", str(temp_dir))
+    return audio_store, temp_dir
+
+def test_complete_stream_is_stored_and_then_served_from_cache(store):
+    audio_store, temp_dir = store
+    info, audio = tts_service.stream_tts(TEXT)
+    streamed = b"".join(audio)
+    assert info["audio_id"] is None
+    assert os.listdir(temp_dir) == []
+
+    info, audio = tts_service.stream_tts(TEXT)
+    assert info["audio_id"]
+    assert b"".join(audio) == streamed
+
+def test_closing_an_abandoned_stream_deletes_the_partial_file(store):
+    audio_store, temp_dir = store
+    info, audio = tts_service.stream_tts(TEXT)
+    next(audio)
+    assert len(os.listdir(temp_dir)) == 1
+
+    audio.close()
+    assert os.listdir(temp_dir) == []
+    assert audio_store.stats()["entries"] == 0
+
+def test_cache_hit_with_evicted_blob_falls_through_to_synthesis(store):
+    audio_store, temp_dir = store
+    info, audio = tts_service.stream_tts(TEXT)
+    streamed = b"".join(audio)
+    # The cache entry outlives the blob file, as when another worker's GC removed it
+    audio_id = tts_service.tts_cache.get(tts_service.prepare_tts(TEXT)["key"])["audio_id"]
+    os.unlink(audio_store.get(audio_id)["path"])
+
+    info, audio = tts_service.stream_tts(TEXT)
+    assert info["audio_id"] is None
+    assert b"".join(audio) == streamed
@@ -0,0 +1,65 @@
+from fastapi import FastAPI, File, UploadFile
+from fastapi.testclient import TestClient
+
+from middleware import UploadSizeLimitMiddleware
+
+MAX_BYTES = 64 * 1024
+BOUNDARY = "testboundary"
+
+def make_client() -> TestClient:
+    app = FastAPI()
+
+    @app.post("/upload")
+    async def upload(file: UploadFile = File(...)):
+        return {"size": len(await file.read())}
+
+    app.add_middleware(UploadSizeLimitMiddleware, max_bytes=MAX_BYTES)
+    return TestClient(app)
+
+def multipart_body(payload: bytes) -> bytes:
+    return (
+        f"--{BOUNDARY}\r\n"
+        'Content-Disposition: form-data; name="file"; filename="audio.mp3"\r\n'
+        "Content-Type: audio/mpeg\r\n\r\n"
+    ).encode() + payload + f"\r\n--{BOUNDARY}--\r\n".encode()
+
+def chunks(body: bytes, size: int = 8 * 1024):
+    for start in range(0, len(body), size):
+        yield body[start:start + size]
+
+HEADERS = {"Content-Type": f"multipart/form-data; boundary={BOUNDARY}"}
+
+def test_small_upload_passes():
+    response = make_client().post("/upload", content=multipart_body(b"x" * 1000), headers=HEADERS)
+    assert response.status_code == 200
+    assert response.json() == {"size": 1000}
+
+def test_content_length_over_limit_is_rejected():
+    response = make_client().post("/upload", content=multipart_body(b"x" * (MAX_BYTES + 1)), headers=HEADERS)
+    assert response.status_code == 413
+
+def test_chunked_upload_under_limit_passes():
+    response = make_client().post("/upload", content=chunks(multipart_body(b"x" * 1000)), headers=HEADERS)
+    assert response.status_code == 200
+    assert response.json() == {"size": 1000}
+
+def test_chunked_upload_over_limit_is_rejected():
+    body = multipart_body(b"x" * (MAX_BYTES * 4))
+    response = make_client().post("/upload", content=chunks(body), headers=HEADERS)
+    assert response.status_code == 413
+    assert response.json() == {"detail": f"Upload exceeds {MAX_BYTES} bytes"}
+
+def test_413_carries_cors_headers_in_the_app(monkeypatch):
+    import main
+    from conftest import TEST_API_KEY
+
+    limit = next(m for m in main.app.user_middleware if m.cls is UploadSizeLimitMiddleware)
+    monkeypatch.setitem(limit.options, "max_bytes", MAX_BYTES)
+    # Rebuild the middleware stack with the lowered limit, and again after the test
+    monkeypatch.setattr(main.app, "middleware_stack", None)
+    origin = main.ALLOWED_ORIGINS[0]
+    client = TestClient(main.app, headers={"Origin": origin, "X-API-Key": TEST_API_KEY})
+    for content in (multipart_body(b"x" * (MAX_BYTES * 4)), chunks(multipart_body(b"x" * (MAX_BYTES * 4)))):
+        response = client.post("/api/stt/transcribe", content=content, headers=HEADERS)
+        assert response.status_code == 413
+        assert response.headers["access-control-allow-origin"] == origin
@@ -23,7 +23,7 @@ const TextToImage = () => {
   const [uploadedImages, setUploadedImages] = useState<File[]>([]);
   const [loading, setLoading] = useState(false);
   const [error, setError] = useState('');
-  const [images, setImages] = useState<{ url: string; id: string; description?: string }[]>([]);
+  const [images, setImages] = useState<{ url: string; id: string; description?: string; media_type?: string }[]>([]);
 
   const handleImageUpload = (e: React.ChangeEvent<HTMLInputElement>) => {
     const files = Array.from(e.target.files || []);
@@ -191,7 +191,7 @@ const TextToImage = () => {
                     </div>
                   )}
                   <button
-                    onClick={() => handleDownload(img.url, `generated-image-${index + 1}.png`)}
+                    onClick={() => handleDownload(img.url, `generated-image-${index + 1}.${(img.media_type || 'image/png').split('/')[1]}`)}
                     className="w-full bg-green-600 text-white py-2 px-4 rounded-lg hover:bg-green-700 transition-colors flex items-center justify-center space-x-2"
                   >
                     <svg className="w-4 h-4" fill="none" stroke="currentColor" viewBox="0 0 24 24">
@@ -532,7 +532,11 @@ async function handleTextToImage() {
     // Handle different response formats
     let imageData = null;
     if (data.images && data.images.length > 0) {
-      imageData = data.images[0];
+      imageData = data.images[0].url || data.images[0];
+      // Stored images come back as paths on the API server
+      if (imageData.startsWith('/')) {
+        imageData = `${settings.apiUrl}${imageData}`;
+      }
     } else if (data.image) {
       imageData = data.image;
     } else if (data.url) {